@@ -29,6 +29,14 @@ interface PythonServiceResponse<T> {
   error?: string;
 }
 
+// Backbone filter applied to a network before stats or analytics
+interface BackboneOptions {
+  method: 'disparity' | 'threshold' | 'top_k';
+  alpha?: number;
+  min_weight?: number;
+  k?: number;
+}
+
 class PythonMLService {
   private client: AxiosInstance;
 
@@ -212,11 +220,16 @@ class PythonMLService {
 
   /**
    * Build hashtag co-occurrence network
+   * options.stats limits the computed stats fields (an empty array skips them)
    */
-  async buildHashtagNetwork(posts: any[]): Promise<PythonServiceResponse<any>> {
+  async buildHashtagNetwork(
+    posts: any[],
+    options: { stats?: string[]; stats_sample_size?: number; backbone?: BackboneOptions } = {}
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/network/hashtag-network', {
         posts,
+        ...options,
       });
       return response.data;
     } catch (error: any) {
@@ -231,10 +244,14 @@ class PythonMLService {
   /**
    * Build mention network
    */
-  async buildMentionNetwork(posts: any[]): Promise<PythonServiceResponse<any>> {
+  async buildMentionNetwork(
+    posts: any[],
+    options: { stats?: string[]; stats_sample_size?: number; backbone?: BackboneOptions } = {}
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/network/mention-network', {
         posts,
+        ...options,
       });
       return response.data;
     } catch (error: any) {
@@ -246,13 +263,180 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Build hashtag and mention networks (and optionally the author-hashtag network)
+   * from one upload and one pass over the posts
+   */
+  async buildNetworks(
+    posts: any[],
+    options: {
+      include_author_hashtag?: boolean;
+      stats?: Record<string, string[]>;
+      stats_sample_size?: number;
+      backbone?: BackboneOptions;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/network/build', {
+        posts,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Network build error:', error);
+      return {
+        success: false,
+        error: error.message || 'Network build failed',
+      };
+    }
+  }
+
+  /**
+   * Sliding-window network analytics over timestamped posts.
+   * The service streams NDJSON records (meta, one per window, summary); they are returned parsed, in order.
+   */
+  async analyzeTemporalNetwork(
+    posts: any[],
+    options: {
+      window?: string | number;
+      step?: string | number;
+      graph_type?: 'hashtag_cooccurrence' | 'mention_network' | 'author_hashtag';
+      timestamp_field?: string;
+      top_k?: number;
+      include_communities?: boolean;
+      stats?: string[];
+      seed?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any[]>> {
+    try {
+      const response = await this.client.post(
+        '/api/network/temporal',
+        { posts, ...options },
+        { responseType: 'text' }
+      );
+      const records = String(response.data)
+        .split('\n')
+        .filter((line) => line.trim())
+        .map((line) => JSON.parse(line));
+      const failure = records.find((record) => record.type === 'error');
+      if (failure) {
+        return { success: false, error: failure.error };
+      }
+      return { success: true, data: records };
+    } catch (error: any) {
+      console.error('Temporal network error:', error);
+      return {
+        success: false,
+        error: error.message || 'Temporal network analysis failed',
+      };
+    }
+  }
+
+  /**
+   * Append posts to (and expire posts from) a persistent named network
+   */
+  async updateNamedNetwork(
+    name: string,
+    posts: any[],
+    expiredPosts: any[] = [],
+    graphType: 'hashtag_cooccurrence' | 'mention_network' | 'author_hashtag' = 'hashtag_cooccurrence'
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post(`/api/network/graphs/${encodeURIComponent(name)}/posts`, {
+        posts,
+        expired_posts: expiredPosts,
+        graph_type: graphType,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Named network update error:', error);
+      return {
+        success: false,
+        error: error.message || 'Named network update failed',
+      };
+    }
+  }
+
+  /**
+   * Get a snapshot of a named network
+   */
+  async getNamedNetwork(name: string): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.get(`/api/network/graphs/${encodeURIComponent(name)}`);
+      return response.data;
+    } catch (error: any) {
+      console.error('Named network snapshot error:', error);
+      return {
+        success: false,
+        error: error.message || 'Named network snapshot failed',
+      };
+    }
+  }
+
+  /**
+   * Add posts to (and expire posts from) a hashtag co-occurrence index
+   */
+  async ingestHashtagIndex(
+    posts: any[],
+    expiredPosts: any[] = [],
+    index: string = 'default'
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/network/hashtag-index/ingest', {
+        index,
+        posts,
+        expired_posts: expiredPosts,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Hashtag index ingest error:', error);
+      return {
+        success: false,
+        error: error.message || 'Hashtag index ingest failed',
+      };
+    }
+  }
+
+  /**
+   * Suggest hashtags that co-occur with the ones typed so far
+   */
+  async suggestHashtags(
+    hashtags: string[],
+    options: {
+      index?: string;
+      top_k?: number;
+      metric?: 'pmi' | 'npmi' | 'lift' | 'count';
+      min_count?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/network/hashtag-suggestions', {
+        hashtags,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Hashtag suggestions error:', error);
+      return {
+        success: false,
+        error: error.message || 'Hashtag suggestions failed',
+      };
+    }
+  }
+
   /**
    * Detect communities in network
+   * Pass the graph_id returned by a network build instead of the full network to skip the re-upload
    */
-  async detectCommunities(networkData: any): Promise<PythonServiceResponse<any>> {
+  async detectCommunities(
+    networkData: any,
+    graphId?: string,
+    backbone?: BackboneOptions
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/network/community-detection', {
-        network: networkData,
+        ...(graphId ? { graph_id: graphId } : { network: networkData }),
+        ...(backbone ? { backbone } : {}),
       });
       return response.data;
     } catch (error: any) {
@@ -266,11 +450,31 @@ class PythonMLService {
 
   /**
    * Analyze influence in network
+   * mode: 'exact' | 'approximate' | 'auto' (sampled centralities on large graphs)
+   * Pass options.graph_id (from a network build) instead of the full network to skip the re-upload
+   * Large graphs return one page of influence_scores; pass next_cursor as options.cursor for the next page
    */
-  async analyzeInfluence(networkData: any): Promise<PythonServiceResponse<any>> {
+  async analyzeInfluence(
+    networkData: any,
+    options: {
+      mode?: 'auto' | 'exact' | 'approximate';
+      k?: number;
+      seed?: number;
+      seed_nodes?: string[];
+      include_strength?: boolean;
+      max_workers?: number;
+      graph_id?: string;
+      backbone?: BackboneOptions;
+      top_k?: number;
+      cursor?: number;
+      page_size?: number;
+      include_metrics?: string[];
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/network/influence-analysis', {
-        network: networkData,
+        ...(options.graph_id ? {} : { network: networkData }),
+        ...options,
       });
       return response.data;
     } catch (error: any) {
@@ -289,10 +493,16 @@ class PythonMLService {
   /**
    * Predict engagement for a post
    */
-  async predictEngagement(postFeatures: any): Promise<PythonServiceResponse<any>> {
+  async predictEngagement(
+    postFeatures: any,
+    accountId?: string,
+    learner: 'forest' | 'online' = 'forest'
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/predictive/engagement-prediction', {
         features: postFeatures,
+        learner,
+        ...(accountId ? { account_id: accountId } : {}),
       });
       return response.data;
     } catch (error: any) {
@@ -304,6 +514,119 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Predict engagement for many candidate posts (e.g. draft variations) in one call
+   */
+  async predictEngagementBatch(
+    posts: any[],
+    options: {
+      account_id?: string;
+      historical_data?: any[];
+      top_k?: number;
+      learner?: 'forest' | 'online';
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/engagement-prediction/batch', {
+        posts,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Batch engagement prediction error:', error);
+      return {
+        success: false,
+        error: error.message || 'Batch engagement prediction failed',
+      };
+    }
+  }
+
+  /**
+   * Update an account's incremental engagement model with new observations
+   */
+  async updateOnlineEngagementModel(observations: any[], accountId?: string): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/online-update', {
+        observations,
+        ...(accountId ? { account_id: accountId } : {}),
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Online model update error:', error);
+      return {
+        success: false,
+        error: error.message || 'Online model update failed',
+      };
+    }
+  }
+
+  /**
+   * Time-budgeted hyperparameter search over engagement model families; the winner becomes the account's model
+   */
+  async tuneEngagementModel(
+    historicalData: any[],
+    options: {
+      account_id?: string;
+      families?: Array<'ridge' | 'hist_gradient_boosting' | 'random_forest'>;
+      time_budget_seconds?: number;
+      n_candidates?: number;
+      cv?: number;
+      n_jobs?: number;
+      max_inference_ms?: number;
+      seed?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/engagement-model/tune', {
+        historical_data: historicalData,
+        ...options,
+      }, {
+        // The search may use its whole time budget
+        timeout: Math.max(30000, ((options.time_budget_seconds ?? 60) + 60) * 1000),
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Engagement model tuning error:', error);
+      return {
+        success: false,
+        error: error.message || 'Engagement model tuning failed',
+      };
+    }
+  }
+
+  /**
+   * Rank all 168 weekly posting slots for a draft post and pick a constrained schedule
+   */
+  async optimizePostingSchedule(
+    draftFeatures: any,
+    options: {
+      account_id?: string;
+      historical_data?: any[];
+      num_slots?: number;
+      blackout_hours?: number[];
+      blackout_days?: number[];
+      blackout_slots?: { day_of_week: number; hour: number }[];
+      min_spacing_hours?: number;
+      max_per_day?: number;
+      prior_weight?: number;
+      learner?: 'forest' | 'online';
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/posting-schedule', {
+        features: draftFeatures,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Posting schedule error:', error);
+      return {
+        success: false,
+        error: error.message || 'Posting schedule optimization failed',
+      };
+    }
+  }
+
   /**
    * Predict best posting time
    */
@@ -322,6 +645,81 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Add posts to an account's streaming hour/day engagement aggregate
+   */
+  async ingestPostingTimes(
+    posts: any[],
+    accountId?: string,
+    halfLifeDays?: number
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/posting-time/ingest', {
+        posts,
+        ...(accountId ? { account_id: accountId } : {}),
+        ...(halfLifeDays !== undefined ? { half_life_days: halfLifeDays } : {}),
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Posting time ingest error:', error);
+      return {
+        success: false,
+        error: error.message || 'Posting time ingest failed',
+      };
+    }
+  }
+
+  /**
+   * Best posting times (with confidence intervals) from an account's streaming aggregate
+   */
+  async getBestPostingTimeFromAggregate(
+    accountId?: string,
+    options: {
+      confidence?: number;
+      min_posts?: number;
+      top_slots?: number;
+      include_state?: boolean;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/posting-time/best', {
+        ...(accountId ? { account_id: accountId } : {}),
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Aggregate posting time error:', error);
+      return {
+        success: false,
+        error: error.message || 'Aggregate posting time query failed',
+      };
+    }
+  }
+
+  /**
+   * Merge posting time aggregates from other shards (serialized states) or local accounts
+   */
+  async mergePostingTimes(
+    accountId: string | undefined,
+    aggregates: any[] = [],
+    sourceAccountIds: string[] = []
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/posting-time/merge', {
+        ...(accountId ? { account_id: accountId } : {}),
+        aggregates,
+        source_account_ids: sourceAccountIds,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Posting time merge error:', error);
+      return {
+        success: false,
+        error: error.message || 'Posting time merge failed',
+      };
+    }
+  }
+
   /**
    * Forecast trends
    */
@@ -344,6 +742,33 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Forecast many series in one vectorized pass (linear trend and Holt-Winters with intervals)
+   */
+  async forecastTrendsBatch(
+    series: Array<{ id: string; time_series: any[] }>,
+    options: {
+      forecast_periods?: number;
+      methods?: Array<'linear' | 'holt_winters'>;
+      season_length?: number;
+      confidence?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/predictive/trend-forecast/batch', {
+        series,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Batch trend forecast error:', error);
+      return {
+        success: false,
+        error: error.message || 'Batch trend forecast failed',
+      };
+    }
+  }
+
   // =====================================================
   // Statistics Methods
   // =====================================================
@@ -366,13 +791,110 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Descriptive statistics for many series in one request.
+   * Pass ragged series ({name: values} or values[][]) or a columnar matrix (rows are observations).
+   */
+  async calculateDescriptiveStatsBatch(input: {
+    series?: Record<string, Array<number | null>> | Array<Array<number | null>>;
+    matrix?: Array<Array<number | null>>;
+    columns?: string[];
+  }): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/descriptive/batch', input);
+      return response.data;
+    } catch (error: any) {
+      console.error('Batch descriptive statistics error:', error);
+      return {
+        success: false,
+        error: error.message || 'Batch statistics calculation failed',
+      };
+    }
+  }
+
+  /**
+   * Add a chunk of values to a mergeable statistics sketch.
+   * With sketchId the sketch is stored server-side; otherwise the updated `sketch` is returned.
+   */
+  async updateStatisticsSketch(
+    values: number[],
+    options: { sketch_id?: string; sketch?: any; compression?: number } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/sketch/update', {
+        values,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Statistics sketch update error:', error);
+      return {
+        success: false,
+        error: error.message || 'Statistics sketch update failed',
+      };
+    }
+  }
+
+  /**
+   * Merge stored (sourceIds) and serialized sketches into a stored sketch
+   */
+  async mergeStatisticsSketches(
+    sketchId: string,
+    sourceIds: string[] = [],
+    sketches: any[] = []
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/sketch/merge', {
+        sketch_id: sketchId,
+        source_ids: sourceIds,
+        sketches,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Statistics sketch merge error:', error);
+      return {
+        success: false,
+        error: error.message || 'Statistics sketch merge failed',
+      };
+    }
+  }
+
+  /**
+   * Moments and percentiles of the union of stored and/or serialized sketches
+   */
+  async queryStatisticsSketches(options: {
+    sketch_ids?: string[];
+    sketches?: any[];
+    percentiles?: number[];
+    include_sketch?: boolean;
+  }): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/sketch/query', options);
+      return response.data;
+    } catch (error: any) {
+      console.error('Statistics sketch query error:', error);
+      return {
+        success: false,
+        error: error.message || 'Statistics sketch query failed',
+      };
+    }
+  }
+
   /**
    * Calculate correlation between variables
    */
-  async calculateCorrelation(variables: Record<string, number[]>): Promise<PythonServiceResponse<any>> {
+  async calculateCorrelation(
+    variables: Record<string, Array<number | null>>,
+    options: {
+      method?: 'pearson' | 'spearman';
+      top_k?: number;
+      include_matrix?: boolean;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/statistics/correlation', {
         variables,
+        ...options,
       });
       return response.data;
     } catch (error: any) {
@@ -402,13 +924,147 @@ class PythonMLService {
     }
   }
 
+  /**
+   * Time series analysis for many series in one request
+   */
+  async analyzeTimeSeriesBatch(
+    series: Array<{ id: string; time_series: any[] }>,
+    lags?: number[]
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/time-series/batch', {
+        series,
+        ...(lags ? { lags } : {}),
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Batch time series analysis error:', error);
+      return {
+        success: false,
+        error: error.message || 'Batch time series analysis failed',
+      };
+    }
+  }
+
+  /**
+   * Append points to a series' incremental rolling features (moving average/std, EWMA, seasonal delta)
+   */
+  async ingestRollingStatistics(
+    seriesId: string,
+    points: Array<number | { value: number; timestamp?: string }>,
+    options: {
+      window?: number;
+      ewma_spans?: number[];
+      season_lag?: number;
+      return_features?: boolean;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/rolling/ingest', {
+        series_id: seriesId,
+        points,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Rolling statistics ingest error:', error);
+      return {
+        success: false,
+        error: error.message || 'Rolling statistics ingest failed',
+      };
+    }
+  }
+
+  /**
+   * Current rolling features of several series
+   */
+  async queryRollingStatistics(seriesIds: string[]): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/rolling/query', {
+        series_ids: seriesIds,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Rolling statistics query error:', error);
+      return {
+        success: false,
+        error: error.message || 'Rolling statistics query failed',
+      };
+    }
+  }
+
+  /**
+   * Flag anomalous points of many series (robust z, seasonal residual, change point)
+   */
+  async detectAnomalies(
+    series: Array<{ id: string; time_series: Array<{ date: string; value: number }> }>,
+    options: {
+      methods?: Array<'robust_z' | 'seasonal' | 'change_point'>;
+      threshold?: number;
+      season_length?: number;
+      direction?: 'both' | 'up' | 'down';
+      cusum_drift?: number;
+      cusum_threshold?: number;
+      max_records?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/anomalies', {
+        series,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Anomaly detection error:', error);
+      return {
+        success: false,
+        error: error.message || 'Anomaly detection failed',
+      };
+    }
+  }
+
+  /**
+   * Score new points of a series against its rolling state and ingest them
+   */
+  async detectAnomaliesStream(
+    seriesId: string,
+    points: Array<number | { value: number; timestamp?: string }>,
+    options: {
+      threshold?: number;
+      direction?: 'both' | 'up' | 'down';
+      min_history?: number;
+      window?: number;
+      ewma_spans?: number[];
+      season_lag?: number;
+    } = {}
+  ): Promise<PythonServiceResponse<any>> {
+    try {
+      const response = await this.client.post('/api/statistics/anomalies/stream', {
+        series_id: seriesId,
+        points,
+        ...options,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error('Streaming anomaly detection error:', error);
+      return {
+        success: false,
+        error: error.message || 'Streaming anomaly detection failed',
+      };
+    }
+  }
+
   /**
    * Analyze distribution
    */
-  async analyzeDistribution(values: number[]): Promise<PythonServiceResponse<any>> {
+  async analyzeDistribution(
+    values: number[],
+    options: { bins?: number; include_fits?: boolean } = {}
+  ): Promise<PythonServiceResponse<any>> {
     try {
       const response = await this.client.post('/api/statistics/distribution', {
         values,
+        ...options,
       });
       return response.data;
     } catch (error: any) {
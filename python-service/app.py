@@ -2,8 +2,9 @@
 Python ML/NLP Service for Social Media Analytics Platform
 Handles advanced NLP, ML, network analysis, and statistical tasks
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
 import os
 from dotenv import load_dotenv
 
@@ -25,6 +26,8 @@ from services import (
     statistics_service,
     topic_modeling_service
 )
+from services.graph_store import GraphNotFoundError
+from services.statistics_sketch import DEFAULT_COMPRESSION
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -115,12 +118,17 @@ def hashtag_network():
     try:
         data = request.json
         posts = data.get('posts', [])  # Array of post objects with hashtags
+        stats = data.get('stats')  # Optional list of stats fields to compute
+        stats_sample_size = data.get('stats_sample_size')  # Wedge samples for large-graph clustering
+        backbone = data.get('backbone')  # Optional {'method': 'disparity'|'threshold'|'top_k', ...}
         
         if not posts:
             return jsonify({'error': 'Posts array is required'}), 400
         
-        result = network_analysis_service.build_hashtag_network(posts)
+        result = network_analysis_service.build_hashtag_network(posts, stats, stats_sample_size, backbone)
         return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -130,12 +138,175 @@ def mention_network():
     try:
         data = request.json
         posts = data.get('posts', [])
+        stats = data.get('stats')  # Optional list of stats fields to compute
+        stats_sample_size = data.get('stats_sample_size')
+        backbone = data.get('backbone')  # Optional backbone filter
         
         if not posts:
             return jsonify({'error': 'Posts array is required'}), 400
         
-        result = network_analysis_service.build_mention_network(posts)
+        result = network_analysis_service.build_mention_network(posts, stats, stats_sample_size, backbone)
         return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/build', methods=['POST'])
+def build_networks():
+    """Build hashtag and mention networks (and optionally author-hashtag) in one pass"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        include_author_hashtag = data.get('include_author_hashtag', False)
+        stats = data.get('stats')  # Optional {graph_type: [stats fields]}
+        stats_sample_size = data.get('stats_sample_size')
+        backbone = data.get('backbone')  # Optional backbone filter applied to every network
+        
+        if not posts:
+            return jsonify({'error': 'Posts array is required'}), 400
+        
+        if stats is not None and not isinstance(stats, dict):
+            return jsonify({'error': 'Stats must be an object keyed by graph type'}), 400
+        
+        result = network_analysis_service.build_networks(
+            posts, include_author_hashtag, stats, stats_sample_size, backbone
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/temporal', methods=['POST'])
+def temporal_network():
+    """Sliding-window network analytics, streamed as one JSON record per line"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])  # Posts with a timestamp field
+        
+        if not posts:
+            return jsonify({'error': 'Posts array is required'}), 400
+        
+        windows = network_analysis_service.temporal_network_windows(
+            posts,
+            window=data.get('window', '7D'),
+            step=data.get('step', '1D'),
+            graph_type=data.get('graph_type', 'hashtag_cooccurrence'),
+            timestamp_field=data.get('timestamp_field', 'timestamp'),
+            top_k=data.get('top_k', 10),
+            include_communities=data.get('include_communities', True),
+            stats=data.get('stats'),
+            seed=data.get('seed', 42)
+        )
+        
+        def generate():
+            try:
+                for record in windows:
+                    yield json.dumps(record, default=str) + '\n'
+            except Exception as e:
+                # Headers are already sent; report the failure in-stream
+                yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/graphs/<name>/posts', methods=['POST'])
+def update_named_network(name):
+    """Append posts to (and expire posts from) a persistent named network"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        expired_posts = data.get('expired_posts', [])  # Posts leaving a sliding window
+        graph_type = data.get('graph_type', 'hashtag_cooccurrence')
+        
+        if not posts and not expired_posts:
+            return jsonify({'error': 'Posts or expired_posts array is required'}), 400
+        
+        if graph_type not in ('hashtag_cooccurrence', 'mention_network', 'author_hashtag'):
+            return jsonify({'error': "Graph type must be 'hashtag_cooccurrence', 'mention_network' or 'author_hashtag'"}), 400
+        
+        result = network_analysis_service.update_named_network(name, posts, expired_posts, graph_type)
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/graphs/<name>', methods=['GET'])
+def get_named_network(name):
+    """Snapshot of a named network (nodes, edges, stats and graph_id)"""
+    try:
+        stats = request.args.get('stats')  # Comma-separated stats fields
+        stats = [field for field in stats.split(',') if field] if stats is not None else None
+        stats_sample_size = request.args.get('stats_sample_size', type=int)
+        
+        result = network_analysis_service.get_named_network(name, stats, stats_sample_size)
+        
+        if result is None:
+            return jsonify({'error': f"Network '{name}' not found"}), 404
+        
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/graphs/<name>', methods=['DELETE'])
+def delete_named_network(name):
+    """Delete a named network"""
+    try:
+        if not network_analysis_service.delete_named_network(name):
+            return jsonify({'error': f"Network '{name}' not found"}), 404
+        
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/hashtag-index/ingest', methods=['POST'])
+def ingest_hashtag_index():
+    """Add posts to (and expire posts from) a hashtag co-occurrence index"""
+    try:
+        data = request.json
+        index = data.get('index', 'default')  # Index name, e.g. per account
+        posts = data.get('posts', [])
+        expired_posts = data.get('expired_posts', [])
+        
+        if not posts and not expired_posts:
+            return jsonify({'error': 'Posts or expired_posts array is required'}), 400
+        
+        result = network_analysis_service.ingest_hashtag_index(index, posts, expired_posts)
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network/hashtag-suggestions', methods=['POST'])
+def hashtag_suggestions():
+    """Suggest hashtags that co-occur with the given ones"""
+    try:
+        data = request.json
+        index = data.get('index', 'default')
+        hashtags = data.get('hashtags', [])  # Hashtags typed so far
+        top_k = data.get('top_k', 10)
+        metric = data.get('metric', 'pmi')  # 'pmi', 'npmi', 'lift' or 'count'
+        min_count = data.get('min_count', 2)
+        
+        if not hashtags:
+            return jsonify({'error': 'Hashtags array is required'}), 400
+        
+        result = network_analysis_service.suggest_hashtags(index, hashtags, top_k, metric, min_count)
+        
+        if result is None:
+            return jsonify({'error': f"Hashtag index '{index}' not found"}), 404
+        
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -145,12 +316,18 @@ def community_detection():
     try:
         data = request.json
         network_data = data.get('network', {})
+        graph_id = data.get('graph_id')  # Id returned by a network build endpoint
+        backbone = data.get('backbone')  # Optional backbone filter applied before detection
         
-        if not network_data:
-            return jsonify({'error': 'Network data is required'}), 400
+        if not network_data and not graph_id:
+            return jsonify({'error': 'Network data or graph_id is required'}), 400
         
-        result = network_analysis_service.detect_communities(network_data)
+        result = network_analysis_service.detect_communities(network_data, graph_id=graph_id, backbone=backbone)
         return jsonify({'success': True, 'data': result})
+    except GraphNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -160,12 +337,36 @@ def influence_analysis():
     try:
         data = request.json
         network_data = data.get('network', {})
+        graph_id = data.get('graph_id')  # Id returned by a network build endpoint
+        mode = data.get('mode', 'auto')  # 'exact', 'approximate' or 'auto'
+        k = data.get('k')  # Pivot sample size for approximate centralities
+        seed = data.get('seed', 42)
+        seed_nodes = data.get('seed_nodes')  # Brand accounts for personalized PageRank
+        include_strength = data.get('include_strength', False)
+        max_workers = data.get('max_workers')  # Upper bound on centrality worker processes
+        backbone = data.get('backbone')  # Optional backbone filter applied before scoring
+        top_k = data.get('top_k')  # Size of top_influencers (default 10)
+        cursor = data.get('cursor', 0)  # next_cursor from the previous page
+        page_size = data.get('page_size')  # Nodes per page of influence_scores
+        include_metrics = data.get('include_metrics')  # Per-node metrics to return
         
-        if not network_data:
-            return jsonify({'error': 'Network data is required'}), 400
+        if not network_data and not graph_id:
+            return jsonify({'error': 'Network data or graph_id is required'}), 400
         
-        result = network_analysis_service.analyze_influence(network_data)
+        if mode not in ('auto', 'exact', 'approximate'):
+            return jsonify({'error': "Mode must be 'auto', 'exact' or 'approximate'"}), 400
+        
+        result = network_analysis_service.analyze_influence(
+            network_data, mode=mode, k=k, seed=seed,
+            seed_nodes=seed_nodes, include_strength=include_strength,
+            max_workers=max_workers, graph_id=graph_id, backbone=backbone,
+            top_k=top_k, cursor=cursor, page_size=page_size, include_metrics=include_metrics
+        )
         return jsonify({'success': True, 'data': result})
+    except GraphNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -179,12 +380,114 @@ def engagement_prediction():
     try:
         data = request.json
         post_features = data.get('features', {})
+        account_id = data.get('account_id')  # Models are trained and cached per account
+        learner = data.get('learner', 'forest')  # 'forest' or 'online'
         
         if not post_features:
             return jsonify({'error': 'Post features are required'}), 400
         
-        result = predictive_modeling_service.predict_engagement(post_features)
+        result = predictive_modeling_service.predict_engagement(post_features, account_id, learner)
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/engagement-prediction/batch', methods=['POST'])
+def engagement_prediction_batch():
+    """Predict engagement for many candidate posts in one call"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])  # Post feature dicts
+        account_id = data.get('account_id')
+        historical_data = data.get('historical_data')  # Optional training data
+        top_k = data.get('top_k', 10)
+        learner = data.get('learner', 'forest')
+        
+        if not posts:
+            return jsonify({'error': 'Posts array is required'}), 400
+        
+        result = predictive_modeling_service.predict_engagement_batch(
+            posts, account_id, historical_data, top_k, learner
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/engagement-model/tune', methods=['POST'])
+def tune_engagement_model():
+    """Time-budgeted hyperparameter search for an account's engagement model"""
+    try:
+        data = request.json
+        historical_data = data.get('historical_data', [])
+        
+        if not historical_data:
+            return jsonify({'error': 'Historical data is required'}), 400
+        
+        result = predictive_modeling_service.tune_engagement_model(
+            historical_data,
+            account_id=data.get('account_id'),
+            families=data.get('families'),  # Subset of 'ridge', 'hist_gradient_boosting', 'random_forest'
+            time_budget_seconds=data.get('time_budget_seconds', 60),
+            n_candidates=data.get('n_candidates', 16),
+            cv=data.get('cv', 5),
+            n_jobs=data.get('n_jobs'),
+            max_inference_ms=data.get('max_inference_ms'),  # Per 1,000 predictions
+            seed=data.get('seed', 42)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/online-update', methods=['POST'])
+def online_model_update():
+    """Update an account's incremental engagement model with new observations"""
+    try:
+        data = request.json
+        observations = data.get('observations', [])  # Post features with actual_engagement
+        account_id = data.get('account_id')
+        
+        if not observations:
+            return jsonify({'error': 'Observations array is required'}), 400
+        
+        result = predictive_modeling_service.update_online_model(observations, account_id)
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/posting-schedule', methods=['POST'])
+def posting_schedule():
+    """Rank all weekly posting slots for a draft and pick a constrained schedule"""
+    try:
+        data = request.json
+        draft = data.get('features', {})  # Draft post features (hour/day are ignored)
+        prior_weight = data.get('prior_weight', 5.0)
+        
+        if prior_weight < 0:
+            return jsonify({'error': 'prior_weight must be non-negative'}), 400
+        
+        result = predictive_modeling_service.optimize_posting_slots(
+            draft,
+            account_id=data.get('account_id'),
+            historical_data=data.get('historical_data'),
+            num_slots=data.get('num_slots', 5),
+            blackout_hours=data.get('blackout_hours'),
+            blackout_days=data.get('blackout_days'),
+            blackout_slots=data.get('blackout_slots'),
+            min_spacing_hours=data.get('min_spacing_hours', 0),
+            max_per_day=data.get('max_per_day'),
+            prior_weight=prior_weight,
+            learner=data.get('learner', 'forest')
+        )
         return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -204,6 +507,61 @@ def best_posting_time():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predictive/posting-time/ingest', methods=['POST'])
+def ingest_posting_times():
+    """Add posts to an account's streaming hour/day engagement aggregate"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        
+        if not posts:
+            return jsonify({'error': 'Posts are required'}), 400
+        
+        result = predictive_modeling_service.ingest_posting_times(
+            posts,
+            account_id=data.get('account_id'),
+            half_life_days=data.get('half_life_days')  # New aggregate's decay; must match an existing one
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/posting-time/best', methods=['POST'])
+def best_posting_time_from_aggregate():
+    """Best posting times from an account's streaming aggregate"""
+    try:
+        data = request.json or {}
+        result = predictive_modeling_service.best_posting_time_from_aggregate(
+            account_id=data.get('account_id'),
+            confidence=data.get('confidence', 0.95),
+            min_posts=data.get('min_posts', 3),
+            top_slots=data.get('top_slots', 5),
+            include_state=data.get('include_state', False)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictive/posting-time/merge', methods=['POST'])
+def merge_posting_times():
+    """Merge posting time aggregates from other shards or accounts"""
+    try:
+        data = request.json
+        result = predictive_modeling_service.merge_posting_times(
+            account_id=data.get('account_id'),
+            aggregates=data.get('aggregates'),  # 'state' objects from /posting-time/best
+            source_account_ids=data.get('source_account_ids')
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/predictive/trend-forecast', methods=['POST'])
 def trend_forecast():
     """Forecast trends"""
@@ -220,6 +578,29 @@ def trend_forecast():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predictive/trend-forecast/batch', methods=['POST'])
+def trend_forecast_batch():
+    """Forecast many series at once (linear trend and Holt-Winters)"""
+    try:
+        data = request.json
+        series = data.get('series', [])
+        
+        if not series:
+            return jsonify({'error': 'Series are required'}), 400
+        
+        result = predictive_modeling_service.forecast_trends_batch(
+            series,
+            forecast_periods=data.get('forecast_periods', 7),
+            methods=data.get('methods'),  # Subset of 'linear', 'holt_winters'
+            season_length=data.get('season_length', 7),
+            confidence=data.get('confidence', 0.95)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # =====================================================
 # Advanced Statistics Endpoints
 # =====================================================
@@ -239,6 +620,28 @@ def descriptive_statistics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/statistics/descriptive/batch', methods=['POST'])
+def descriptive_statistics_batch():
+    """Descriptive statistics for many series in one vectorized pass"""
+    try:
+        data = request.json
+        series = data.get('series')  # {name: [values]} or [[values]]
+        matrix = data.get('matrix')  # Rows are observations, columns are series
+        
+        if not series and not matrix:
+            return jsonify({'error': 'series or matrix is required'}), 400
+        
+        result = statistics_service.calculate_descriptive_stats_batch(
+            series=series,
+            matrix=matrix,
+            columns=data.get('columns')
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/statistics/correlation', methods=['POST'])
 def correlation_analysis():
     """Calculate correlation between variables"""
@@ -249,8 +652,15 @@ def correlation_analysis():
         if not variables or len(variables) < 2:
             return jsonify({'error': 'At least two variables are required'}), 400
         
-        result = statistics_service.calculate_correlation(variables)
+        result = statistics_service.calculate_correlation(
+            variables,
+            method=data.get('method', 'pearson'),  # 'pearson' or 'spearman'
+            top_k=data.get('top_k'),
+            include_matrix=data.get('include_matrix', True)
+        )
         return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -269,6 +679,23 @@ def time_series_analysis():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/statistics/time-series/batch', methods=['POST'])
+def time_series_analysis_batch():
+    """Time series analysis for many series at once"""
+    try:
+        data = request.json
+        series = data.get('series', [])  # [{id, time_series: [{date, value}]}]
+        
+        if not series:
+            return jsonify({'error': 'Series are required'}), 400
+        
+        result = statistics_service.analyze_time_series_batch(series, lags=data.get('lags'))
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/statistics/distribution', methods=['POST'])
 def distribution_analysis():
     """Analyze distribution of data"""
@@ -279,8 +706,172 @@ def distribution_analysis():
         if not values:
             return jsonify({'error': 'Values array is required'}), 400
         
-        result = statistics_service.analyze_distribution(values)
+        result = statistics_service.analyze_distribution(
+            values,
+            bins=data.get('bins'),
+            include_fits=data.get('include_fits', True)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/sketch/update', methods=['POST'])
+def update_statistics_sketch():
+    """Add a chunk of values to a mergeable statistics sketch"""
+    try:
+        data = request.json
+        values = data.get('values', [])
+        
+        if not values:
+            return jsonify({'error': 'Values array is required'}), 400
+        
+        result = statistics_service.update_sketch(
+            values,
+            sketch_id=data.get('sketch_id'),  # Stored sketch; omit to work on 'sketch' statelessly
+            sketch=data.get('sketch'),
+            compression=data.get('compression', DEFAULT_COMPRESSION)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/sketch/merge', methods=['POST'])
+def merge_statistics_sketches():
+    """Merge sketches into a stored sketch"""
+    try:
+        data = request.json
+        sketch_id = data.get('sketch_id')
+        
+        if not sketch_id:
+            return jsonify({'error': 'sketch_id is required'}), 400
+        
+        result = statistics_service.merge_sketches(
+            sketch_id,
+            source_ids=data.get('source_ids'),
+            sketches=data.get('sketches')
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/sketch/query', methods=['POST'])
+def query_statistics_sketches():
+    """Moments and percentiles of the union of several sketches"""
+    try:
+        data = request.json
+        result = statistics_service.query_sketches(
+            sketch_ids=data.get('sketch_ids'),
+            sketches=data.get('sketches'),
+            percentiles=data.get('percentiles'),
+            include_sketch=data.get('include_sketch', False)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/rolling/ingest', methods=['POST'])
+def ingest_rolling_statistics():
+    """Append points to a series' incremental rolling features"""
+    try:
+        data = request.json
+        series_id = data.get('series_id')
+        points = data.get('points', [])  # [value] or [{value, timestamp}]
+        
+        if not series_id or not points:
+            return jsonify({'error': 'series_id and points are required'}), 400
+        
+        result = statistics_service.ingest_rolling(
+            series_id,
+            points,
+            window=data.get('window'),
+            ewma_spans=data.get('ewma_spans'),
+            season_lag=data.get('season_lag'),
+            return_features=data.get('return_features', False)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/rolling/query', methods=['POST'])
+def query_rolling_statistics():
+    """Current rolling features of several series"""
+    try:
+        data = request.json
+        series_ids = data.get('series_ids', [])
+        
+        if not series_ids:
+            return jsonify({'error': 'series_ids are required'}), 400
+        
+        if not isinstance(series_ids, list) or not all(isinstance(series_id, str) for series_id in series_ids):
+            return jsonify({'error': 'series_ids must be a list of strings'}), 400
+        
+        result = statistics_service.query_rolling(series_ids)
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/anomalies', methods=['POST'])
+def detect_anomalies():
+    """Flag anomalous points of many series (robust z, seasonal residual, change point)"""
+    try:
+        data = request.json
+        series = data.get('series', [])  # [{id, time_series: [{date, value}]}]
+        
+        if not series:
+            return jsonify({'error': 'series are required'}), 400
+        
+        result = statistics_service.detect_anomalies(
+            series,
+            methods=data.get('methods'),
+            threshold=data.get('threshold', 3.5),
+            season_length=data.get('season_length', 7),
+            direction=data.get('direction', 'both'),
+            cusum_drift=data.get('cusum_drift', 0.5),
+            cusum_threshold=data.get('cusum_threshold', 8.0),
+            max_records=data.get('max_records', 1000)
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/statistics/anomalies/stream', methods=['POST'])
+def detect_anomalies_stream():
+    """Score new points of a series against its rolling state and ingest them"""
+    try:
+        data = request.json
+        series_id = data.get('series_id')
+        points = data.get('points', [])  # [value] or [{value, timestamp}]
+        
+        if not series_id or not points:
+            return jsonify({'error': 'series_id and points are required'}), 400
+        
+        result = statistics_service.ingest_rolling(
+            series_id,
+            points,
+            window=data.get('window'),
+            ewma_spans=data.get('ewma_spans'),
+            season_lag=data.get('season_lag'),
+            anomaly_threshold=data.get('threshold', 3.5),
+            direction=data.get('direction', 'both'),
+            min_history=data.get('min_history', 10)
+        )
         return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
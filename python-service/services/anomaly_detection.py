@@ -0,0 +1,161 @@
+"""
+Vectorized Anomaly Detection
+Robust z-scores (median/MAD), seasonal-residual scores and CUSUM change points
+for many series at once. Series are rows of a NaN-padded matrix; every detector
+works on whole rows (CUSUM steps through time, but across all series at once)
+"""
+import numpy as np
+from typing import Dict, Tuple
+
+ANOMALY_METHODS = ('robust_z', 'seasonal', 'change_point')
+
+# MAD of a normal distribution is 0.6745 standard deviations
+MAD_SCALE = 1.4826
+
+# Mean of the smallest 90% of |x_t - x_t-1| for Gaussian noise, in standard deviations
+TRIMMED_DIFFERENCE_SCALE = 0.9295
+
+
+def robust_scale(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row median and robust standard deviation (1.4826 * MAD). Rows whose MAD is
+    zero fall back to the mean absolute deviation (times sqrt(pi / 2)).
+    Returns:
+        (median, scale) with NaN/0 for rows without values
+    """
+    with np.errstate(invalid='ignore'):
+        empty = np.isnan(values).all(axis=1)
+        filled = np.where(empty[:, None], 0.0, values)
+        median = np.nanmedian(filled, axis=1)
+        deviation = np.abs(filled - median[:, None])
+        scale = MAD_SCALE * np.nanmedian(deviation, axis=1)
+        mean_deviation = np.nanmean(deviation, axis=1) * np.sqrt(np.pi / 2)
+    scale = np.where(scale > 0, scale, mean_deviation)
+    return np.where(empty, np.nan, median), np.where(empty, 0.0, scale)
+
+
+def robust_z_scores(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """(x - median) / robust scale per row; scores are 0 where a row has no spread"""
+    median, scale = robust_scale(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.where(scale[:, None] > 0, (values - median[:, None]) / scale[:, None], 0.0)
+    return {'score': np.where(np.isnan(values), np.nan, score),
+            'baseline': np.broadcast_to(median[:, None], values.shape)}
+
+
+def seasonal_scores(values: np.ndarray, season_length: int = 7) -> Dict[str, np.ndarray]:
+    """
+    Robust z-scores of the residuals after removing each row's seasonal profile
+    (median per phase of season_length); the baseline is that phase median
+    """
+    phase_median = np.full((values.shape[0], season_length), np.nan)
+    with np.errstate(invalid='ignore'):
+        for phase in range(season_length):
+            column = values[:, phase::season_length]
+            present = ~np.isnan(column).all(axis=1)
+            if present.any():
+                phase_median[present, phase] = np.nanmedian(column[present], axis=1)
+    baseline = np.tile(phase_median, int(np.ceil(values.shape[1] / season_length)))[:, :values.shape[1]]
+    residuals = robust_z_scores(values - baseline)
+    return {'score': residuals['score'], 'baseline': baseline}
+
+
+def noise_scale(values: np.ndarray) -> np.ndarray:
+    """
+    Per-row noise standard deviation from first differences, which level shifts and
+    single outliers barely move: the mean absolute difference of the smallest 90% of
+    differences, scaled to be consistent for Gaussian noise. Rows without differences
+    (or with constant differences) fall back to robust_scale of the values.
+    """
+    differences = np.abs(np.diff(values, axis=1))
+    with np.errstate(invalid='ignore'):
+        present = ~np.isnan(differences).all(axis=1)
+        cutoff = np.full(values.shape[0], np.nan)
+        if present.any():
+            cutoff[present] = np.nanquantile(differences[present], 0.9, axis=1)
+        kept = differences <= cutoff[:, None]
+        scale = np.where(kept, differences, 0.0).sum(axis=1) / np.maximum(kept.sum(axis=1), 1) / TRIMMED_DIFFERENCE_SCALE
+    _, level_scale = robust_scale(values)
+    return np.where(scale > 0, scale, level_scale)
+
+
+def cusum_change_points(values: np.ndarray, drift: float = 0.5, threshold: float = 8.0,
+                        min_segment: int = 7) -> Dict[str, np.ndarray]:
+    """
+    Two-sided CUSUM change points. Each segment's reference level starts as the median
+    of its first min_segment points and then follows the running mean of the segment;
+    the rest of the segment is monitored in units of the row's noise_scale. Deviations
+    are clipped at threshold / 2 so a single outlier cannot raise an alarm on its own.
+    On an alarm the change is dated at its onset (the split since the statistic left
+    zero that best explains a step), and a new segment starts there with its reference
+    re-estimated from the points after the change.
+    Args:
+        values: Padded matrix (num_series, max_length), NaN past each row's end
+        drift: CUSUM slack in noise units
+        threshold: Alarm level in noise units
+        min_segment: Points used to estimate a segment's reference level
+    Returns:
+        {'alarm': bool matrix marking each change onset, 'score': signed CUSUM value
+         at the alarm (stored at the onset), 'baseline': reference level before the change}
+    """
+    num_series, length = values.shape
+    lengths = (~np.isnan(values)).sum(axis=1)
+    scale = noise_scale(values)
+    clip = threshold / 2
+    
+    def segment_reference(rows: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Median of the first min_segment points of each row's segment"""
+        index = np.minimum(starts[:, None] + np.arange(min_segment), length - 1)
+        window = np.where(index < lengths[rows, None], values[rows[:, None], index], np.nan)
+        with np.errstate(invalid='ignore'):
+            return np.nanmedian(np.where(np.isnan(window).all(axis=1)[:, None], 0.0, window), axis=1)
+    
+    rows = np.arange(num_series)
+    reference = segment_reference(rows, np.zeros(num_series, dtype=np.int64)) if length else np.zeros(0)
+    segment_count = np.full(num_series, float(min_segment))
+    resume = np.full(num_series, min_segment)
+    upper = np.zeros(num_series)
+    lower = np.zeros(num_series)
+    upper_start = np.zeros(num_series, dtype=np.int64)
+    lower_start = np.zeros(num_series, dtype=np.int64)
+    alarm = np.zeros(values.shape, dtype=bool)
+    score = np.zeros(values.shape)
+    baseline = np.full(values.shape, np.nan)
+    
+    for t in range(length):
+        monitored = (t >= resume) & (t < lengths) & (scale > 0)
+        if not monitored.any():
+            continue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(monitored, np.clip((values[:, t] - reference) / scale, -clip, clip), 0.0)
+        # The statistic that is zero before this step starts a candidate change here
+        upper_start = np.where(monitored & (upper == 0), t, upper_start)
+        lower_start = np.where(monitored & (lower == 0), t, lower_start)
+        upper = np.where(monitored, np.maximum(0.0, upper + z - drift), upper)
+        lower = np.where(monitored, np.maximum(0.0, lower - z - drift), lower)
+        
+        up = monitored & (upper > threshold)
+        down = monitored & (lower > threshold) & ~up
+        changed = np.flatnonzero(up | down)
+        # Quiet segments absorb the (clipped) point into their running mean
+        quiet = monitored & ~(up | down)
+        segment_count = np.where(quiet, segment_count + 1, segment_count)
+        reference = np.where(quiet, reference + z * scale / segment_count, reference)
+        if len(changed) == 0:
+            continue
+        for row in changed.tolist():
+            # Onset: the split in [start, t] maximizing the step likelihood ratio S_k^2 / n_k
+            start = upper_start[row] if up[row] else lower_start[row]
+            deviation = values[row, start:t + 1] - reference[row]
+            tail_sums = np.cumsum(deviation[::-1])[::-1]
+            onset = start + int(np.argmax(tail_sums ** 2 / np.arange(len(deviation), 0, -1)))
+            alarm[row, onset] = True
+            score[row, onset] = upper[row] if up[row] else -lower[row]
+            baseline[row, onset] = reference[row]
+            resume[row] = onset + min_segment
+            upper_start[row] = onset
+        reference[changed] = segment_reference(changed, upper_start[changed])
+        segment_count[changed] = min_segment
+        upper[changed] = 0.0
+        lower[changed] = 0.0
+    return {'alarm': alarm, 'score': score, 'baseline': baseline}
@@ -0,0 +1,166 @@
+"""
+Vectorized Multi-Series Forecasting
+Fits linear trends and additive Holt-Winters models to many series at once.
+Series are left-aligned in a NaN-padded matrix, so every fit is a handful of
+array operations over all series (and all smoothing parameter candidates)
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from typing import Any, Dict, List, Tuple
+
+# Smoothing parameter candidates evaluated for every series in one pass
+HOLT_WINTERS_GRID = {
+    'alpha': (0.1, 0.3, 0.5, 0.7, 0.9),
+    'beta': (0.01, 0.05, 0.2),
+    'gamma': (0.05, 0.2, 0.5)
+}
+
+
+def series_frame(series: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    All observations of [{'time_series': [{'date', 'value'}]}] in one frame, parsed in
+    one pass and sorted by series position, then date. Rows without a numeric value are dropped.
+    Returns:
+        DataFrame with 'series' (position in the input), 'date' and 'value' columns
+    """
+    lengths = [len(entry.get('time_series') or []) for entry in series]
+    observations = [point for entry in series for point in (entry.get('time_series') or [])]
+    return pd.DataFrame({
+        'series': np.repeat(np.arange(len(series)), lengths),
+        'date': pd.to_datetime([point.get('date') for point in observations]),
+        'value': pd.to_numeric(pd.Series([point.get('value') for point in observations], dtype=object),
+                               errors='coerce')
+    }).dropna().sort_values(['series', 'date'], kind='stable')
+
+
+def pad_series(series: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack series of different lengths into a left-aligned matrix
+    Returns:
+        (values of shape (num_series, max_length) padded with NaN, lengths)
+    """
+    lengths = np.array([len(values) for values in series], dtype=np.int64)
+    matrix = np.full((len(series), int(lengths.max(initial=0))), np.nan)
+    mask = np.arange(matrix.shape[1]) < lengths[:, None]
+    if len(series):
+        matrix[mask] = np.concatenate(series)
+    return matrix, lengths
+
+
+def linear_trend_forecast(values: np.ndarray, lengths: np.ndarray, horizon: int,
+                          confidence: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Ordinary least squares trend y = a + b * t per row of a padded matrix, with
+    OLS prediction intervals for the next horizon steps
+    Returns:
+        {'slope', 'intercept', 'forecast', 'lower', 'upper'} (forecasts are (num_series, horizon))
+    """
+    mask = np.arange(values.shape[1]) < lengths[:, None]
+    t = np.where(mask, np.arange(values.shape[1], dtype=float), 0.0)
+    y = np.where(mask, values, 0.0)
+    n = lengths.astype(float)
+    
+    t_mean = t.sum(axis=1) / n
+    y_mean = y.sum(axis=1) / n
+    t_centered = np.where(mask, t - t_mean[:, None], 0.0)
+    sxx = (t_centered ** 2).sum(axis=1)
+    slope = (t_centered * y).sum(axis=1) / sxx
+    intercept = y_mean - slope * t_mean
+    
+    residuals = np.where(mask, y - intercept[:, None] - slope[:, None] * t, 0.0)
+    # Two fitted parameters; series of length 2 fit exactly
+    sigma = np.sqrt((residuals ** 2).sum(axis=1) / np.maximum(n - 2, 1))
+    
+    future_t = (lengths - 1)[:, None] + np.arange(1, horizon + 1)
+    forecast = intercept[:, None] + slope[:, None] * future_t
+    half_width = norm.ppf(0.5 + confidence / 2) * sigma[:, None] * np.sqrt(
+        1 + 1 / n[:, None] + (future_t - t_mean[:, None]) ** 2 / sxx[:, None]
+    )
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'forecast': forecast,
+        'lower': forecast - half_width,
+        'upper': forecast + half_width
+    }
+
+
+def holt_winters_forecast(values: np.ndarray, lengths: np.ndarray, horizon: int,
+                          season_length: int = 7, confidence: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Additive Holt-Winters (level, trend and seasonal components) per row of a padded
+    matrix. Every series is filtered with all HOLT_WINTERS_GRID parameter combinations
+    at once, and each keeps the combination with the lowest one-step-ahead squared
+    error. Series shorter than two seasons get Holt's linear method (no seasonality).
+    Intervals use the ETS(A,A,A) forecast variance.
+    Returns:
+        {'forecast', 'lower', 'upper', 'alpha', 'beta', 'gamma', 'seasonal', 'rmse'}
+    """
+    num_series = values.shape[0]
+    m = season_length
+    seasonal = lengths >= 2 * m
+    
+    alpha, beta, gamma = (grid.ravel() for grid in np.meshgrid(
+        HOLT_WINTERS_GRID['alpha'], HOLT_WINTERS_GRID['beta'], HOLT_WINTERS_GRID['gamma'], indexing='ij'))
+    # Shapes (num_series, num_candidates); non-seasonal series never update seasonality
+    alpha = np.broadcast_to(alpha, (num_series, len(alpha)))
+    beta = np.broadcast_to(beta, alpha.shape)
+    gamma = np.where(seasonal[:, None], gamma, 0.0)
+    
+    # Seasonal series start from their first season, the others from their first point
+    level0 = values[:, 0].copy()
+    trend0 = values[:, 1] - values[:, 0]
+    season0 = np.zeros((num_series, m))
+    if seasonal.any():
+        first_season = values[seasonal, :m].mean(axis=1)
+        second_season = values[seasonal, m:2 * m].mean(axis=1)
+        level0[seasonal] = first_season
+        trend0[seasonal] = (second_season - first_season) / m
+        season0[seasonal] = values[seasonal, :m] - first_season[:, None]
+    start = np.where(seasonal, m, 1)
+    
+    level = np.repeat(level0[:, None], alpha.shape[1], axis=1)
+    trend = np.repeat(trend0[:, None], alpha.shape[1], axis=1)
+    season = np.repeat(season0[:, None, :], alpha.shape[1], axis=1)
+    sse = np.zeros(alpha.shape)
+    
+    for t in range(1, values.shape[1]):
+        active = ((t >= start) & (t < lengths))[:, None]
+        if not active.any():
+            continue
+        y = np.nan_to_num(values[:, t])[:, None]
+        s = season[:, :, t % m]
+        error = y - (level + trend + s)
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, :, t % m] = np.where(active, gamma * (y - new_level) + (1 - gamma) * s, s)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        sse += np.where(active, error ** 2, 0.0)
+    
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(num_series)
+    level, trend, season = level[rows, best], trend[rows, best], season[rows, best]
+    alpha, beta, gamma = alpha[rows, best], beta[rows, best], gamma[rows, best]
+    sigma2 = sse[rows, best] / np.maximum(lengths - start, 1)
+    
+    steps = np.arange(1, horizon + 1)
+    phase = ((lengths - 1)[:, None] + steps) % m
+    forecast = level[:, None] + steps * trend[:, None] + np.take_along_axis(season, phase, axis=1)
+    
+    # Var(h) = sigma^2 * (1 + sum_{j<h} c_j^2), c_j = alpha * (1 + j * beta) + gamma * [j % m == 0]
+    j = np.arange(1, horizon)
+    c = alpha[:, None] * (1 + j * beta[:, None]) + gamma[:, None] * (j % m == 0)
+    variance = sigma2[:, None] * (1 + np.concatenate([np.zeros((num_series, 1)), np.cumsum(c ** 2, axis=1)], axis=1))
+    half_width = norm.ppf(0.5 + confidence / 2) * np.sqrt(variance)
+    return {
+        'forecast': forecast,
+        'lower': forecast - half_width,
+        'upper': forecast + half_width,
+        'alpha': alpha,
+        'beta': beta,
+        'gamma': gamma,
+        'seasonal': seasonal,
+        'rmse': np.sqrt(sigma2)
+    }
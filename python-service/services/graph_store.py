@@ -0,0 +1,116 @@
+"""
+Server-side Graph Store
+Keeps built networks under a content-hash graph_id with LRU/TTL eviction,
+together with their parsed graph structures and derived analysis results
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional
+
+
+class GraphNotFoundError(LookupError):
+    """Raised when a graph_id is unknown or has been evicted"""
+    
+    def __init__(self, graph_id: str):
+        super().__init__(f"Graph '{graph_id}' not found or expired. Rebuild the network or send it inline.")
+        self.graph_id = graph_id
+
+
+class StoredGraph:
+    """A stored network payload plus lazily built structures and cached results"""
+    
+    def __init__(self, graph_id: str, network_data: Dict[str, Any]):
+        self.graph_id = graph_id
+        self.network_data = network_data
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.structures: Dict[Hashable, Any] = {}
+        self.results: Dict[Hashable, Any] = {}
+        # Re-entrant so cached results can build cached structures of the same entry
+        self.lock = threading.RLock()
+    
+    def get_or_build(self, cache: Dict[Hashable, Any], key: Hashable, build: Callable[[], Any],
+                     cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return cache[key], building it once under the entry lock.
+        Built values for which cacheable returns False are returned without being cached.
+        """
+        with self.lock:
+            if key in cache:
+                return cache[key]
+            value = build()
+            if cacheable is None or cacheable(value):
+                cache[key] = value
+            return value
+
+
+class GraphStore:
+    """Thread-safe LRU cache of networks with a time-to-live per entry"""
+    
+    def __init__(self, max_entries: int = 32, ttl_seconds: float = 1800):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[str, StoredGraph]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def compute_graph_id(network_data: Dict[str, Any]) -> str:
+        """Content hash over the graph type, nodes and edges (stats are ignored)"""
+        canonical = json.dumps({
+            'graph_type': network_data.get('graph_type'),
+            'nodes': network_data.get('nodes', []),
+            'edges': network_data.get('edges', [])
+        }, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+    
+    def put(self, network_data: Dict[str, Any]) -> StoredGraph:
+        """Store a network (or refresh the existing entry with the same content)"""
+        graph_id = self.compute_graph_id(network_data)
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(graph_id)
+            if entry is None:
+                entry = StoredGraph(graph_id, network_data)
+                self._entries[graph_id] = entry
+            entry.last_access = time.time()
+            self._entries.move_to_end(graph_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+    
+    def get(self, graph_id: str) -> StoredGraph:
+        """Look up a stored network, raising GraphNotFoundError when missing or expired"""
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(graph_id)
+            if entry is None:
+                raise GraphNotFoundError(graph_id)
+            entry.last_access = time.time()
+            self._entries.move_to_end(graph_id)
+            return entry
+    
+    def remove(self, graph_id: str) -> bool:
+        """Drop a stored network; returns whether it existed"""
+        with self._lock:
+            return self._entries.pop(graph_id, None) is not None
+    
+    def _evict_expired(self):
+        """Remove entries not accessed within the TTL (caller holds the lock)"""
+        if not self.ttl_seconds:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = [graph_id for graph_id, entry in self._entries.items() if entry.last_access < cutoff]
+        for graph_id in expired:
+            del self._entries[graph_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Size and configuration of the store"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds
+            }
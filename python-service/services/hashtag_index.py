@@ -0,0 +1,171 @@
+"""
+Hashtag Co-occurrence Index
+Incrementally maintained sparse co-occurrence counts for hashtag suggestions.
+Rows are kept as per-tag dicts for O(1) updates and cached as NumPy arrays for
+queries, so PMI, lift and NPMI are computed vectorized over a few rows only
+"""
+import threading
+import numpy as np
+from typing import Dict, List, Any, Tuple
+from .graph_kernels import top_k_indices
+from .incremental_network import extract_hashtags
+
+SUGGESTION_METRICS = ('pmi', 'npmi', 'lift', 'count')
+
+
+class HashtagCooccurrenceIndex:
+    """
+    Post-level hashtag co-occurrence index. Each post counts once per hashtag and once
+    per hashtag pair (duplicates within a post are ignored), so counts are document
+    frequencies and the association scores are well defined.
+    """
+    
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.hashtags: List[str] = []
+        self.num_posts = 0
+        self.version = 0
+        self.lock = threading.RLock()
+        self._tag_counts = np.zeros(64, dtype=np.int64)
+        self._rows: List[Dict[int, int]] = []
+        # Array form of each row, rebuilt lazily after the row changes
+        self._row_arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def add_posts(self, posts: List[Dict[str, Any]]) -> int:
+        """Add a batch of posts; returns how many had hashtags"""
+        return self._apply_posts(posts, 1)
+    
+    def remove_posts(self, posts: List[Dict[str, Any]]) -> int:
+        """Expire a batch of previously added posts; returns how many had hashtags"""
+        return self._apply_posts(posts, -1)
+    
+    def _apply_posts(self, posts: List[Dict[str, Any]], sign: int) -> int:
+        with self.lock:
+            applied = 0
+            for post in posts:
+                applied += 1 if self.apply_hashtags(extract_hashtags(post), sign) else 0
+            return applied
+    
+    def apply_hashtags(self, hashtags: List[str], sign: int = 1) -> bool:
+        """Add (sign=1) or remove (sign=-1) one post's normalized hashtags"""
+        with self.lock:
+            if sign < 0:
+                # Unknown tags cannot have been added before
+                hashtags = [tag for tag in hashtags if tag in self.vocabulary]
+            ids = sorted({self._tag_id(tag) for tag in hashtags})
+            if not ids:
+                return False
+            
+            self._tag_counts[ids] += sign
+            for i, a in enumerate(ids):
+                row = self._rows[a]
+                for b in ids[:i] + ids[i+1:]:
+                    count = row.get(b, 0) + sign
+                    if count > 0:
+                        row[b] = count
+                    else:
+                        row.pop(b, None)
+                self._row_arrays.pop(a, None)
+            self.num_posts += sign
+            self.version += 1
+            return True
+    
+    def _tag_id(self, tag: str) -> int:
+        tag_id = self.vocabulary.get(tag)
+        if tag_id is None:
+            tag_id = len(self.hashtags)
+            self.vocabulary[tag] = tag_id
+            self.hashtags.append(tag)
+            self._rows.append({})
+            if tag_id >= len(self._tag_counts):
+                self._tag_counts = np.concatenate([self._tag_counts, np.zeros_like(self._tag_counts)])
+        return tag_id
+    
+    def _row(self, tag_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Co-occurring tag ids and counts of one tag as arrays"""
+        arrays = self._row_arrays.get(tag_id)
+        if arrays is None:
+            row = self._rows[tag_id]
+            arrays = (np.fromiter(row.keys(), dtype=np.int64, count=len(row)),
+                      np.fromiter(row.values(), dtype=np.int64, count=len(row)))
+            self._row_arrays[tag_id] = arrays
+        return arrays
+    
+    def suggest(self, hashtags: List[str], top_k: int = 10, metric: str = 'pmi',
+                min_count: int = 2) -> Dict[str, Any]:
+        """
+        Hashtags that co-occur with the given ones, ranked by association
+        Args:
+            hashtags: Hashtags typed so far
+            top_k: Number of suggestions
+            metric: 'pmi', 'npmi', 'lift' or 'count' (raw co-occurrences)
+            min_count: Minimum co-occurrences with a typed hashtag (filters rare, noisy pairs)
+        Returns:
+            Suggestions with their score and co-occurrence count. With several typed
+            hashtags the score is the mean over them; a typed hashtag a candidate never
+            co-occurs with contributes the metric's independence value (0 for PMI, 1 for
+            lift) or its minimum (-1 for NPMI, 0 for counts).
+        """
+        if metric not in SUGGESTION_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Expected one of: {', '.join(SUGGESTION_METRICS)}")
+        
+        query = list(dict.fromkeys(tag.lower().strip('#') for tag in hashtags if tag))
+        with self.lock:
+            known = [self.vocabulary[tag] for tag in query if tag in self.vocabulary]
+            unknown = [tag for tag in query if tag not in self.vocabulary]
+            result = {'suggestions': [], 'metric': metric, 'unknown_hashtags': unknown,
+                      'indexed_posts': self.num_posts}
+            if not known:
+                return result
+            
+            rows = [self._row(tag_id) for tag_id in known]
+            columns = np.concatenate([row[0] for row in rows])
+            pair_counts = np.concatenate([row[1] for row in rows]).astype(float)
+            query_index = np.repeat(np.arange(len(known)), [len(row[0]) for row in rows])
+            tag_counts = self._tag_counts.astype(float)
+            n = float(self.num_posts)
+        
+        keep = (pair_counts >= min_count) & ~np.isin(columns, known)
+        columns, pair_counts, query_index = columns[keep], pair_counts[keep], query_index[keep]
+        if len(columns) == 0:
+            return result
+        
+        lift = pair_counts * n / (tag_counts[np.asarray(known)][query_index] * tag_counts[columns])
+        if metric == 'lift':
+            values, missing = lift, 1.0
+        elif metric == 'count':
+            values, missing = pair_counts, 0.0
+        else:
+            pmi = np.log(lift)
+            if metric == 'pmi':
+                values, missing = pmi, 0.0
+            else:
+                joint = pair_counts / n
+                # A pair present in every post is perfectly associated
+                values = np.divide(pmi, -np.log(joint), out=np.ones_like(pmi), where=joint < 1)
+                missing = -1.0
+        
+        candidates, inverse = np.unique(columns, return_inverse=True)
+        scores = np.full((len(candidates), len(known)), missing)
+        scores[inverse, query_index] = values
+        score = scores.mean(axis=1)
+        cooccurrences = np.bincount(inverse, weights=pair_counts, minlength=len(candidates))
+        
+        top = top_k_indices(score, top_k)
+        result['suggestions'] = [{
+            'hashtag': self.hashtags[tag_id],
+            'score': float(score[i]),
+            'cooccurrences': int(cooccurrences[i]),
+            'posts': int(tag_counts[tag_id])
+        } for i, tag_id in zip(top.tolist(), candidates[top].tolist())]
+        return result
+    
+    def summary(self) -> Dict[str, Any]:
+        """Size summary of the index"""
+        with self.lock:
+            return {
+                'version': self.version,
+                'posts': self.num_posts,
+                'hashtags': int(np.count_nonzero(self._tag_counts)),
+                'pairs': sum(len(row) for row in self._rows) // 2
+            }
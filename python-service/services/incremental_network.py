@@ -0,0 +1,468 @@
+"""
+Incremental Network Builder
+Maintains hashtag co-occurrence, mention and author-hashtag networks in place as
+batches of posts are appended or expired, so updates cost time proportional to the batch
+"""
+import math
+import random
+import re
+import threading
+import networkx as nx
+from typing import Dict, List, Any, Optional, Tuple
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+MENTION_PATTERN = re.compile(r'@(\w+)')
+# Hashtags and mentions in one scan; matches the same tokens as the two patterns above
+TAG_PATTERN = re.compile(r'([#@])(\w+)')
+
+GRAPH_TYPES = ('hashtag_cooccurrence', 'mention_network', 'author_hashtag')
+
+
+def extract_hashtags(post: Dict[str, Any]) -> List[str]:
+    """Normalized hashtags of a post, from 'hashtags' or parsed from 'content'"""
+    hashtags = []
+    if 'hashtags' in post and post['hashtags']:
+        hashtags = post['hashtags'] if isinstance(post['hashtags'], list) else []
+    elif 'content' in post:
+        hashtags = HASHTAG_PATTERN.findall(post['content'])
+    return [tag.lower().strip('#') for tag in hashtags if tag]
+
+
+def extract_mentions(post: Dict[str, Any]) -> List[str]:
+    """Normalized mentions of a post, from 'mentions' or parsed from 'content'"""
+    mentions = []
+    if 'mentions' in post and post['mentions']:
+        mentions = post['mentions'] if isinstance(post['mentions'], list) else []
+    elif 'content' in post:
+        mentions = MENTION_PATTERN.findall(post['content'])
+    return [mention.lower().strip('@') for mention in mentions if mention]
+
+
+def post_author(post: Dict[str, Any]) -> str:
+    """Author of a post"""
+    return post.get('author_username', post.get('username', 'unknown'))
+
+
+def parse_post(post: Dict[str, Any]) -> Tuple[str, List[str], List[str]]:
+    """
+    Author, normalized hashtags and normalized mentions of a post. Same result as
+    post_author/extract_hashtags/extract_mentions, but 'content' is scanned at most once.
+    """
+    has_hashtags = 'hashtags' in post and post['hashtags']
+    has_mentions = 'mentions' in post and post['mentions']
+    if (has_hashtags and has_mentions) or 'content' not in post:
+        return post_author(post), extract_hashtags(post), extract_mentions(post)
+    
+    parsed_hashtags, parsed_mentions = [], []
+    for prefix, token in TAG_PATTERN.findall(post['content']):
+        (parsed_hashtags if prefix == '#' else parsed_mentions).append(token.lower())
+    
+    hashtags = extract_hashtags(post) if has_hashtags else parsed_hashtags
+    mentions = extract_mentions(post) if has_mentions else parsed_mentions
+    return post_author(post), hashtags, mentions
+
+
+HASHTAG_STATS = ('total_nodes', 'total_edges', 'density', 'average_clustering', 'is_connected')
+MENTION_STATS = ('total_nodes', 'total_edges', 'density', 'is_strongly_connected', 'is_weakly_connected')
+AUTHOR_HASHTAG_STATS = ('total_nodes', 'total_edges', 'density', 'is_connected', 'total_users', 'total_hashtags')
+
+
+class IncrementalNetwork:
+    """
+    Hashtag co-occurrence (undirected), mention (directed) or author-hashtag
+    (bipartite, undirected) network updated in place.
+    Node/edge weights, degrees, post counts and edge totals change per post; connectivity
+    is tracked with a union-find while posts are only added and recomputed lazily after
+    expiries; clustering and strong connectivity are computed on demand and cached
+    until the next update.
+    """
+    # Exact average clustering up to this size; wedge sampling above it
+    EXACT_CLUSTERING_MAX_NODES = 5000
+    EXACT_CLUSTERING_MAX_EDGES = 50000
+    CLUSTERING_SAMPLE_SIZE = 2000
+    
+    def __init__(self, graph_type: str = 'hashtag_cooccurrence'):
+        if graph_type not in GRAPH_TYPES:
+            raise ValueError(f"Unknown graph type '{graph_type}'. Expected one of: {', '.join(GRAPH_TYPES)}")
+        self.graph_type = graph_type
+        self.directed = graph_type == 'mention_network'
+        self.G = nx.DiGraph() if self.directed else nx.Graph()
+        self.num_edges = 0
+        self.num_posts = 0
+        self.version = 0
+        self.lock = threading.RLock()
+        self._parent: Dict[Any, Any] = {}
+        self._size: Dict[Any, int] = {}
+        self._components = 0
+        self._components_dirty = False
+        self._cached_stats: Dict[str, Any] = {}
+        self._cached_version = -1
+    
+    def add_posts(self, posts: List[Dict[str, Any]]) -> int:
+        """Add a batch of posts; returns how many changed the network"""
+        return self._apply_posts(posts, 1)
+    
+    def remove_posts(self, posts: List[Dict[str, Any]]) -> int:
+        """Expire a batch of previously added posts; returns how many changed the network"""
+        return self._apply_posts(posts, -1)
+    
+    def _apply_posts(self, posts: List[Dict[str, Any]], sign: int) -> int:
+        with self.lock:
+            applied = 0
+            for post in posts:
+                if self.graph_type == 'mention_network':
+                    changed = self.apply_mentions(post_author(post), extract_mentions(post), sign)
+                elif self.graph_type == 'author_hashtag':
+                    changed = self.apply_author_hashtags(post_author(post), extract_hashtags(post), sign)
+                else:
+                    changed = self.apply_hashtags(extract_hashtags(post), sign)
+                applied += 1 if changed else 0
+            return applied
+    
+    def apply_parsed(self, author: str, hashtags: List[str], mentions: List[str], sign: int = 1) -> bool:
+        """Add or remove one post already split by parse_post"""
+        if self.graph_type == 'mention_network':
+            return self.apply_mentions(author, mentions, sign)
+        if self.graph_type == 'author_hashtag':
+            return self.apply_author_hashtags(author, hashtags, sign)
+        return self.apply_hashtags(hashtags, sign)
+    
+    def apply_hashtags(self, hashtags: List[str], sign: int = 1) -> bool:
+        """Add (sign=1) or remove (sign=-1) one post's normalized hashtags"""
+        # Posts with a single hashtag carry no co-occurrence
+        if len(hashtags) <= 1:
+            return False
+        
+        with self.lock:
+            G = self.G
+            for tag in hashtags:
+                if sign > 0 and tag not in G:
+                    G.add_node(tag, weight=0)
+                    self._add_component(tag)
+                if tag in G:
+                    G.nodes[tag]['weight'] += sign
+            
+            for i, tag1 in enumerate(hashtags):
+                for tag2 in hashtags[i+1:]:
+                    self._apply_edge(tag1, tag2, sign)
+            
+            if sign < 0:
+                for tag in hashtags:
+                    if tag in G and G.nodes[tag]['weight'] <= 0:
+                        G.remove_node(tag)
+                        self._components_dirty = True
+            
+            self.num_posts += sign
+            self.version += 1
+            return True
+    
+    def apply_mentions(self, author: str, mentions: List[str], sign: int = 1) -> bool:
+        """Add (sign=1) or remove (sign=-1) one post: its author and author -> mention edges"""
+        with self.lock:
+            G = self.G
+            if sign > 0:
+                if author not in G:
+                    G.add_node(author, type='user', posts=0)
+                    self._add_component(author)
+                G.nodes[author]['posts'] = G.nodes[author].get('posts', 0) + 1
+            elif author in G:
+                G.nodes[author]['posts'] = G.nodes[author].get('posts', 0) - 1
+            else:
+                return False
+            
+            for mention in mentions:
+                if sign > 0 and mention not in G:
+                    G.add_node(mention, type='user', posts=0)
+                    self._add_component(mention)
+                self._apply_edge(author, mention, sign)
+            
+            if sign < 0:
+                # Drop users that no longer post and no longer take part in any mention
+                for node in [author] + mentions:
+                    if node in G and G.nodes[node].get('posts', 0) <= 0 and G.degree(node) == 0:
+                        G.remove_node(node)
+                        self._components_dirty = True
+            
+            self.num_posts += sign
+            self.version += 1
+            return True
+    
+    def apply_author_hashtags(self, author: str, hashtags: List[str], sign: int = 1) -> bool:
+        """
+        Add (sign=1) or remove (sign=-1) one post's author -> hashtag edges. Node ids are
+        prefixed ('@author', '#hashtag') so a user and a hashtag with the same name stay apart.
+        """
+        if not hashtags:
+            return False
+        
+        with self.lock:
+            G = self.G
+            user = f"@{author}"
+            if sign > 0 and user not in G:
+                G.add_node(user, type='user', weight=0)
+                self._add_component(user)
+            if user not in G:
+                return False
+            G.nodes[user]['weight'] += sign
+            
+            for tag in hashtags:
+                node = f"#{tag}"
+                if sign > 0 and node not in G:
+                    G.add_node(node, type='hashtag', weight=0)
+                    self._add_component(node)
+                if node in G:
+                    G.nodes[node]['weight'] += sign
+                    self._apply_edge(user, node, sign)
+            
+            if sign < 0:
+                for node in [user] + [f"#{tag}" for tag in hashtags]:
+                    if node in G and G.nodes[node]['weight'] <= 0:
+                        G.remove_node(node)
+                        self._components_dirty = True
+            
+            self.num_posts += sign
+            self.version += 1
+            return True
+    
+    def _apply_edge(self, source: Any, target: Any, sign: int):
+        G = self.G
+        if G.has_edge(source, target):
+            G[source][target]['weight'] += sign
+            if G[source][target]['weight'] <= 0:
+                G.remove_edge(source, target)
+                self.num_edges -= 1
+                self._components_dirty = True
+        elif sign > 0:
+            G.add_edge(source, target, weight=1)
+            self.num_edges += 1
+            self._union(source, target)
+    
+    def _add_component(self, node: Any):
+        if self._components_dirty:
+            return
+        self._parent[node] = node
+        self._size[node] = 1
+        self._components += 1
+    
+    def _find(self, node: Any) -> Any:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    
+    def _union(self, a: Any, b: Any):
+        if self._components_dirty:
+            return
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        self._components -= 1
+    
+    def _rebuild_components(self):
+        """Recompute the union-find from the current graph after expiries"""
+        self._parent, self._size, self._components = {}, {}, 0
+        self._components_dirty = False
+        for node in self.G:
+            self._add_component(node)
+        for source, target in self.G.edges():
+            self._union(source, target)
+    
+    def edge_subgraph(self, edges: List[Tuple[Any, Any]]) -> 'IncrementalNetwork':
+        """Independent network restricted to the given edges and their endpoints"""
+        with self.lock:
+            network = IncrementalNetwork(self.graph_type)
+            network.G = self.G.edge_subgraph(edges).copy()
+            network.num_edges = network.G.number_of_edges()
+            network.num_posts = self.num_posts
+            network._rebuild_components()
+            return network
+    
+    def number_of_components(self) -> int:
+        """Connected (weakly connected, for mention networks) components"""
+        with self.lock:
+            if self._components_dirty:
+                self._rebuild_components()
+            return self._components
+    
+    def density(self) -> float:
+        if self.graph_type == 'author_hashtag':
+            # Share of possible user-hashtag pairs
+            users = self.number_of_users()
+            hashtags = self.G.number_of_nodes() - users
+            return self.num_edges / (users * hashtags) if users and hashtags else 0
+        n = self.G.number_of_nodes()
+        if n <= 1:
+            return 0
+        if self.directed:
+            return self.num_edges / (n * (n - 1))
+        return 2 * self.num_edges / (n * (n - 1))
+    
+    def number_of_users(self) -> int:
+        """User nodes of an author-hashtag network"""
+        return self._lazy_stat('total_users', lambda: sum(
+            1 for _, node_type in self.G.nodes(data='type') if node_type == 'user'
+        ))
+    
+    def _lazy_stat(self, name: Any, compute) -> Any:
+        """Compute an expensive statistic once per graph version"""
+        if self._cached_version != self.version:
+            self._cached_stats = {}
+            self._cached_version = self.version
+        if name not in self._cached_stats:
+            self._cached_stats[name] = compute()
+        return self._cached_stats[name]
+    
+    def stats(self, fields: Optional[List[str]] = None, sample_size: Optional[int] = None,
+              seed: int = 42) -> Dict[str, Any]:
+        """
+        Network statistics in the same shape as the full builders
+        Args:
+            fields: Statistics to compute (default: all for the graph type)
+            sample_size: Wedge samples for the clustering estimate on large graphs
+            seed: Random seed for sampling
+        """
+        available = {
+            'hashtag_cooccurrence': HASHTAG_STATS,
+            'mention_network': MENTION_STATS,
+            'author_hashtag': AUTHOR_HASHTAG_STATS
+        }[self.graph_type]
+        fields = list(available) if fields is None else fields
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise ValueError(f"Unknown stats field(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+        
+        with self.lock:
+            G = self.G
+            n = G.number_of_nodes()
+            stats = {}
+            for field in available:
+                if field not in fields:
+                    continue
+                if field == 'total_nodes':
+                    stats[field] = n
+                elif field == 'total_edges':
+                    stats[field] = self.num_edges
+                elif field == 'density':
+                    stats[field] = self.density()
+                elif field == 'average_clustering':
+                    stats.update(self._average_clustering(sample_size, seed))
+                elif field in ('is_connected', 'is_weakly_connected'):
+                    stats[field] = n > 0 and self.number_of_components() == 1
+                elif field == 'total_users':
+                    stats[field] = self.number_of_users()
+                elif field == 'total_hashtags':
+                    stats[field] = n - self.number_of_users()
+                elif field == 'is_strongly_connected':
+                    stats[field] = self._lazy_stat(
+                        'is_strongly_connected', lambda: nx.is_strongly_connected(G) if n > 0 else False
+                    )
+            return stats
+    
+    def _average_clustering(self, sample_size: Optional[int], seed: int) -> Dict[str, Any]:
+        """Exact average clustering below the size budget, a wedge-sampling estimate above it"""
+        G = self.G
+        n = G.number_of_nodes()
+        if n <= 2:
+            return {'average_clustering': 0}
+        if n <= self.EXACT_CLUSTERING_MAX_NODES and self.num_edges <= self.EXACT_CLUSTERING_MAX_EDGES:
+            return {'average_clustering': self._lazy_stat('average_clustering', lambda: nx.average_clustering(G))}
+        
+        sample_size = int(sample_size or self.CLUSTERING_SAMPLE_SIZE)
+        return self._lazy_stat(('average_clustering', sample_size, seed),
+                               lambda: self._sample_average_clustering(sample_size, seed))
+    
+    def _sample_average_clustering(self, sample_size: int, seed: int) -> Dict[str, Any]:
+        """
+        Estimate average clustering by wedge sampling: pick a node uniformly, then two
+        distinct neighbours, and check whether they close a triangle. The hit rate is an
+        unbiased estimate of the mean local clustering (nodes of degree < 2 count as 0),
+        reported with a 95% Wilson confidence interval.
+        """
+        G = self.G
+        rng = random.Random(seed)
+        nodes = list(G)
+        closed = 0
+        for _ in range(sample_size):
+            node = nodes[rng.randrange(len(nodes))]
+            neighbours = [nbr for nbr in G[node] if nbr != node]
+            if len(neighbours) < 2:
+                continue
+            u, v = rng.sample(neighbours, 2)
+            if G.has_edge(u, v):
+                closed += 1
+        
+        estimate = closed / sample_size
+        z = 1.96
+        denominator = 1 + z * z / sample_size
+        centre = (estimate + z * z / (2 * sample_size)) / denominator
+        half_width = z * math.sqrt(estimate * (1 - estimate) / sample_size + z * z / (4 * sample_size * sample_size)) / denominator
+        return {
+            'average_clustering': estimate,
+            'average_clustering_estimate': {
+                'method': 'wedge_sampling',
+                'sample_size': sample_size,
+                'confidence': 0.95,
+                'ci_lower': max(centre - half_width, 0.0),
+                'ci_upper': min(centre + half_width, 1.0)
+            }
+        }
+    
+    def nodes_json(self) -> List[Dict[str, Any]]:
+        G = self.G
+        if self.directed:
+            return [{
+                'id': node,
+                'label': node,
+                'type': G.nodes[node].get('type', 'user'),
+                'posts': G.nodes[node].get('posts', 0),
+                'in_degree': G.in_degree(node),
+                'out_degree': G.out_degree(node)
+            } for node in G.nodes()]
+        if self.graph_type == 'author_hashtag':
+            return [{
+                'id': node,
+                'label': node,
+                'type': G.nodes[node]['type'],
+                'weight': G.nodes[node]['weight'],
+                'degree': G.degree(node)
+            } for node in G.nodes()]
+        return [{
+            'id': node,
+            'label': f"#{node}",
+            'weight': G.nodes[node].get('weight', 1),
+            'degree': G.degree(node)
+        } for node in G.nodes()]
+    
+    def edges_json(self) -> List[Dict[str, Any]]:
+        return [{
+            'source': source,
+            'target': target,
+            'weight': weight
+        } for source, target, weight in self.G.edges(data='weight', default=1)]
+    
+    def to_json(self, stats: Optional[List[str]] = None, stats_sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """Full network payload ({'nodes', 'edges', 'stats', 'graph_type'})"""
+        with self.lock:
+            return {
+                'nodes': self.nodes_json(),
+                'edges': self.edges_json(),
+                'stats': self.stats(stats, stats_sample_size),
+                'graph_type': self.graph_type
+            }
+    
+    def summary(self) -> Dict[str, Any]:
+        """Cheap size summary without serializing the graph"""
+        with self.lock:
+            return {
+                'graph_type': self.graph_type,
+                'version': self.version,
+                'posts': self.num_posts,
+                'total_nodes': self.G.number_of_nodes(),
+                'total_edges': self.num_edges,
+                'density': self.density()
+            }
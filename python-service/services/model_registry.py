@@ -0,0 +1,116 @@
+"""
+Model Registry
+Trained models keyed by account and training-data fingerprint, stored in a
+StateStore so each account keeps its own models and identical training data
+is never fitted twice
+"""
+import copy
+import hashlib
+import time
+import numpy as np
+from typing import Any, Callable, Dict, Optional
+from .state_store import StateStore
+
+
+class ModelRegistry:
+    """Per-account models with a pointer to each account's most recent model"""
+    
+    def __init__(self, store: StateStore, max_versions: int = 5):
+        """
+        Args:
+            store: Where models are kept
+            max_versions: Trained models kept per account; older ones are deleted
+        """
+        self.store = store
+        self.max_versions = max(int(max_versions), 1)
+    
+    @staticmethod
+    def fingerprint(X: np.ndarray, y: np.ndarray, kind: str = '') -> str:
+        """Content hash of a training set (features, targets and model kind)"""
+        digest = hashlib.sha256(kind.encode('utf-8'))
+        for array in (X, y):
+            array = np.ascontiguousarray(array, dtype=float)
+            digest.update(str(array.shape).encode('utf-8'))
+            digest.update(array.tobytes())
+        return digest.hexdigest()[:24]
+    
+    def _key(self, account_id: str, name: str) -> str:
+        return f"model:{account_id}:{name}"
+    
+    def get_or_train(self, account_id: str, fingerprint: str, train: Callable[[], Any],
+                     **metadata: Any) -> Dict[str, Any]:
+        """
+        The account's model for this training set, training it only if it has not
+        been trained before. The entry becomes the account's latest model.
+        Returns:
+            {'model', 'account_id', 'fingerprint', 'trained_at', ...metadata, 'cached': bool}
+        """
+        trained = []
+        
+        def create():
+            trained.append(True)
+            return {
+                'model': train(),
+                'account_id': account_id,
+                'fingerprint': fingerprint,
+                'trained_at': time.time(),
+                **metadata
+            }
+        
+        entry = self.store.get_or_create(self._key(account_id, fingerprint), create)
+        if self.store.get(self._key(account_id, 'latest')) != fingerprint:
+            self._set_latest(account_id, fingerprint)
+        return {**entry, 'cached': not trained}
+    
+    def register(self, account_id: str, fingerprint: str, model: Any, **metadata: Any) -> Dict[str, Any]:
+        """Store an already trained model and make it the account's latest"""
+        entry = {
+            'model': model,
+            'account_id': account_id,
+            'fingerprint': fingerprint,
+            'trained_at': time.time(),
+            **metadata
+        }
+        self.store.put(self._key(account_id, fingerprint), entry)
+        self._set_latest(account_id, fingerprint)
+        return {**entry, 'cached': False}
+    
+    def _set_latest(self, account_id: str, fingerprint: str):
+        """Point the account at a model and delete its versions beyond max_versions"""
+        versions_key = self._key(account_id, 'versions')
+        with self.store.key_lock(versions_key):
+            # Most recently used first
+            versions = [version for version in self.store.get(versions_key) or [] if version != fingerprint]
+            versions.insert(0, fingerprint)
+            for version in versions[self.max_versions:]:
+                self.store.remove(self._key(account_id, version))
+            self.store.put(versions_key, versions[:self.max_versions])
+            self.store.put(self._key(account_id, 'latest'), fingerprint)
+    
+    def latest(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Most recently trained (or reused) model of an account, if any"""
+        fingerprint = self.store.get(self._key(account_id, 'latest'))
+        if fingerprint is None:
+            return None
+        entry = self.store.get(self._key(account_id, fingerprint))
+        return {**entry, 'cached': True} if entry is not None else None
+    
+    def get(self, account_id: str, name: str) -> Optional[Any]:
+        """A named model of an account (e.g. 'online'), if any"""
+        return self.store.get(self._key(account_id, name))
+    
+    def update(self, account_id: str, name: str, create: Callable[[], Any],
+               update: Callable[[Any], Any]) -> Any:
+        """
+        Load (or create) a named, mutable model of an account, apply update to it and
+        persist it. Updates of the same model are serialized; returns update's result.
+        The update runs on a copy that replaces the stored model only when it succeeds,
+        so readers never see a partially updated model.
+        """
+        key = self._key(account_id, name)
+        with self.store.key_lock(key):
+            model = self.store.get(key)
+            model = create() if model is None else copy.deepcopy(model)
+            result = update(model)
+            self.store.put(key, model)
+        return result
@@ -3,20 +3,69 @@ Network Analysis Service using NetworkX
 Implements hashtag networks, mention networks, community detection, and influence analysis
 """
 import networkx as nx
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Union
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import math
+import multiprocessing
+import os
+import pickle
+import random
+import threading
+import time
+import numpy as np
 import pandas as pd
+from .graph_kernels import CSRGraph, BACKBONE_METHODS, top_k_indices
+from .graph_store import GraphStore, StoredGraph
+from .incremental_network import IncrementalNetwork, parse_post
+from .hashtag_index import HashtagCooccurrenceIndex
+
+CENTRALITY_MODES = ('auto', 'exact', 'approximate')
+INFLUENCE_METRICS = ('pagerank', 'degree_centrality', 'betweenness_centrality', 'closeness_centrality',
+                     'personalized_pagerank', 'in_strength', 'out_strength')
 
 class NetworkAnalysisService:
+    # Graphs above either size switch to sampled centralities in 'auto' mode
+    APPROXIMATE_NODE_THRESHOLD = 5000
+    APPROXIMATE_EDGE_THRESHOLD = 50000
+    DEFAULT_CENTRALITY_SAMPLES = 256
+    # Graphs below this size run centralities in-process unless max_workers is given
+    PARALLEL_NODE_THRESHOLD = 2000
+    # Failure probability for the reported error bounds (95% confidence)
+    CENTRALITY_ERROR_DELTA = 0.05
+    # Influence responses for larger graphs are paginated by default
+    INFLUENCE_PAGE_NODE_THRESHOLD = 1000
+    DEFAULT_INFLUENCE_PAGE_SIZE = 1000
+    DEFAULT_TOP_INFLUENCERS = 10
+    # Upper bound on windows per temporal analysis request
+    MAX_TEMPORAL_WINDOWS = 1000
+    
     def __init__(self):
         """Initialize network analysis service"""
-        pass
+        # Built networks and their derived results, addressable by graph_id
+        self.graph_store = GraphStore(
+            max_entries=int(os.getenv('GRAPH_STORE_MAX_ENTRIES', 32)),
+            ttl_seconds=float(os.getenv('GRAPH_STORE_TTL_SECONDS', 1800))
+        )
+        # Named networks updated in place from batches of posts
+        self.named_networks: Dict[str, IncrementalNetwork] = {}
+        self._named_networks_lock = threading.Lock()
+        # Hashtag co-occurrence indexes for suggestions, by index name
+        self.hashtag_indexes: Dict[str, HashtagCooccurrenceIndex] = {}
+        self._hashtag_indexes_lock = threading.Lock()
     
-    def build_hashtag_network(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def build_hashtag_network(self, posts: List[Dict[str, Any]], stats: Optional[List[str]] = None,
+                              stats_sample_size: Optional[int] = None,
+                              backbone: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Build hashtag co-occurrence network from posts
         Args:
             posts: List of post objects with 'hashtags' or 'content' field
+            stats: Statistics to include (default: all); an empty list skips them
+            stats_sample_size: Wedge samples for the clustering estimate on large graphs
+            backbone: Optional backbone filter applied before stats, e.g. {'method': 'disparity', 'alpha': 0.05}
         Returns:
             {
                 'nodes': [{'id': str, 'label': str, 'weight': int}],
@@ -24,173 +73,400 @@ class NetworkAnalysisService:
                 'stats': {}
             }
         """
-        G = nx.Graph()
-        
-        # Extract hashtags from posts
-        post_hashtags = []
-        for post in posts:
-            hashtags = []
-            if 'hashtags' in post and post['hashtags']:
-                hashtags = post['hashtags'] if isinstance(post['hashtags'], list) else []
-            elif 'content' in post:
-                # Extract hashtags from content
-                import re
-                hashtags = re.findall(r'#(\w+)', post['content'])
-            
-            # Normalize hashtags
-            hashtags = [tag.lower().strip('#') for tag in hashtags if tag]
-            if len(hashtags) > 1:
-                post_hashtags.append(hashtags)
-        
-        # Count hashtag occurrences (node weights)
-        hashtag_counts = Counter()
-        for hashtags in post_hashtags:
-            hashtag_counts.update(hashtags)
-        
-        # Add nodes with weights
-        for hashtag, count in hashtag_counts.items():
-            G.add_node(hashtag, weight=count)
-        
-        # Add edges for co-occurring hashtags (edge weights)
-        for hashtags in post_hashtags:
-            for i, tag1 in enumerate(hashtags):
-                for tag2 in hashtags[i+1:]:
-                    if G.has_edge(tag1, tag2):
-                        G[tag1][tag2]['weight'] += 1
-                    else:
-                        G.add_edge(tag1, tag2, weight=1)
-        
-        # Convert to JSON format
-        nodes = [{
-            'id': node,
-            'label': f"#{node}",
-            'weight': G.nodes[node].get('weight', 1),
-            'degree': G.degree(node)
-        } for node in G.nodes()]
-        
-        edges = [{
-            'source': edge[0],
-            'target': edge[1],
-            'weight': G.edges[edge].get('weight', 1)
-        } for edge in G.edges()]
-        
-        # Calculate network statistics
-        stats = {
-            'total_nodes': G.number_of_nodes(),
-            'total_edges': G.number_of_edges(),
-            'density': nx.density(G) if G.number_of_nodes() > 1 else 0,
-            'average_clustering': nx.average_clustering(G) if G.number_of_nodes() > 2 else 0,
-            'is_connected': nx.is_connected(G) if G.number_of_nodes() > 0 else False
-        }
+        network = IncrementalNetwork('hashtag_cooccurrence')
+        network.add_posts(posts)
         
-        return {
-            'nodes': nodes,
-            'edges': edges,
-            'stats': stats,
-            'graph_type': 'hashtag_cooccurrence'
-        }
+        return self._store_network(network, stats, stats_sample_size, backbone)
     
-    def build_mention_network(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def build_mention_network(self, posts: List[Dict[str, Any]], stats: Optional[List[str]] = None,
+                              stats_sample_size: Optional[int] = None,
+                              backbone: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Build mention/interaction network from posts
         Args:
             posts: List of post objects with 'mentions' or 'content' field
+            stats: Statistics to include (default: all); an empty list skips them
+            stats_sample_size: Unused for mention networks (no sampled statistics)
+            backbone: Optional backbone filter applied before stats
         Returns:
             Network structure with nodes and edges
         """
-        G = nx.DiGraph()  # Directed graph for mentions
+        network = IncrementalNetwork('mention_network')  # Directed graph for mentions
+        network.add_posts(posts)
         
-        # Extract mentions from posts
-        for post in posts:
-            mentions = []
-            author = post.get('author_username', post.get('username', 'unknown'))
-            
-            if 'mentions' in post and post['mentions']:
-                mentions = post['mentions'] if isinstance(post['mentions'], list) else []
-            elif 'content' in post:
-                # Extract mentions from content
-                import re
-                mentions = re.findall(r'@(\w+)', post['content'])
-            
-            # Normalize mentions
-            mentions = [mention.lower().strip('@') for mention in mentions if mention]
-            
-            # Add author as node
-            if not G.has_node(author):
-                G.add_node(author, type='user', posts=0)
-            G.nodes[author]['posts'] = G.nodes[author].get('posts', 0) + 1
+        return self._store_network(network, stats, stats_sample_size, backbone)
+    
+    def build_networks(self, posts: List[Dict[str, Any]], include_author_hashtag: bool = False,
+                       stats: Optional[Dict[str, List[str]]] = None,
+                       stats_sample_size: Optional[int] = None,
+                       backbone: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the hashtag co-occurrence and mention networks (and optionally the
+        author -> hashtag bipartite network) from a single pass over the posts
+        Args:
+            posts: List of post objects with 'hashtags'/'mentions' or 'content' fields
+            include_author_hashtag: Also build the author-hashtag bipartite network
+            stats: Optional stats fields per graph type, e.g. {'mention_network': []}
+            stats_sample_size: Wedge samples for the clustering estimate on large graphs
+            backbone: Optional backbone filter applied to every network
+        Returns:
+            {
+                'hashtag_network': {...},
+                'mention_network': {...},
+                'author_hashtag_network': {...},
+                'timings_ms': {'parse': float, 'build': {...}, 'serialize': {...}, 'total': float}
+            }
+        """
+        stats = stats or {}
+        started = time.perf_counter()
+        
+        # Each post's content is scanned once for hashtags and mentions together
+        parsed = [parse_post(post) for post in posts]
+        parse_time = time.perf_counter()
+        timings = {'parse': (parse_time - started) * 1000, 'build': {}, 'serialize': {}}
+        
+        graphs = [('hashtag_network', 'hashtag_cooccurrence'), ('mention_network', 'mention_network')]
+        if include_author_hashtag:
+            graphs.append(('author_hashtag_network', 'author_hashtag'))
+        
+        result = {}
+        for name, graph_type in graphs:
+            stage_start = time.perf_counter()
+            network = IncrementalNetwork(graph_type)
+            for author, hashtags, mentions in parsed:
+                network.apply_parsed(author, hashtags, mentions)
+            built = time.perf_counter()
             
-            # Add mentions as edges (author mentions user)
-            for mention in mentions:
-                if not G.has_node(mention):
-                    G.add_node(mention, type='user', posts=0)
-                
-                if G.has_edge(author, mention):
-                    G[author][mention]['weight'] += 1
-                else:
-                    G.add_edge(author, mention, weight=1)
-        
-        # Convert to JSON format
-        nodes = [{
-            'id': node,
-            'label': node,
-            'type': G.nodes[node].get('type', 'user'),
-            'posts': G.nodes[node].get('posts', 0),
-            'in_degree': G.in_degree(node),
-            'out_degree': G.out_degree(node)
-        } for node in G.nodes()]
-        
-        edges = [{
-            'source': edge[0],
-            'target': edge[1],
-            'weight': G.edges[edge].get('weight', 1)
-        } for edge in G.edges()]
-        
-        # Calculate network statistics
-        stats = {
-            'total_nodes': G.number_of_nodes(),
-            'total_edges': G.number_of_edges(),
-            'density': nx.density(G) if G.number_of_nodes() > 1 else 0,
-            'is_strongly_connected': nx.is_strongly_connected(G) if G.number_of_nodes() > 0 else False,
-            'is_weakly_connected': nx.is_weakly_connected(G) if G.number_of_nodes() > 0 else False
+            result[name] = self._store_network(network, stats.get(graph_type), stats_sample_size, backbone)
+            timings['build'][name] = (built - stage_start) * 1000
+            timings['serialize'][name] = (time.perf_counter() - built) * 1000
+        
+        timings['total'] = (time.perf_counter() - started) * 1000
+        result['timings_ms'] = timings
+        return result
+    
+    def _store_network(self, network: IncrementalNetwork, stats: Optional[List[str]],
+                       stats_sample_size: Optional[int],
+                       backbone: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Serialize a built network (after optional backbone filtering) and store it"""
+        report = None
+        if backbone:
+            options = self._backbone_options(backbone)
+            csr = CSRGraph.from_network_data({
+                'nodes': [{'id': node} for node in network.G],
+                'edges': network.edges_json()
+            }, directed=network.directed)
+            mask, _, report = self._backbone_edges(csr, options)
+            ids = csr.node_ids
+            network = network.edge_subgraph([
+                (ids[u], ids[v]) for u, v in zip(csr.sources[mask].tolist(), csr.targets[mask].tolist())
+            ])
+        
+        result = network.to_json(stats, stats_sample_size)
+        if report is not None:
+            result['backbone'] = report
+        result['graph_id'] = self.graph_store.put(result).graph_id
+        return result
+    
+    def update_named_network(self, name: str, posts: Optional[List[Dict[str, Any]]] = None,
+                             expired_posts: Optional[List[Dict[str, Any]]] = None,
+                             graph_type: str = 'hashtag_cooccurrence') -> Dict[str, Any]:
+        """
+        Append new posts to (and expire old posts from) a persistent named network.
+        The network is created on first use; cost is proportional to the batch size.
+        Args:
+            name: Network name (e.g. per account and graph type)
+            posts: New posts to add
+            expired_posts: Previously added posts leaving a sliding window
+            graph_type: 'hashtag_cooccurrence', 'mention_network' or 'author_hashtag' (used on creation)
+        Returns:
+            Size summary of the updated network
+        """
+        with self._named_networks_lock:
+            network = self.named_networks.get(name)
+            if network is None:
+                network = IncrementalNetwork(graph_type)
+                self.named_networks[name] = network
+        
+        if network.graph_type != graph_type:
+            raise ValueError(f"Network '{name}' is a {network.graph_type} network, not {graph_type}")
+        
+        with network.lock:
+            added = network.add_posts(posts or [])
+            expired = network.remove_posts(expired_posts or [])
+            summary = network.summary()
+        
+        return {
+            'name': name,
+            'added_posts': added,
+            'expired_posts': expired,
+            **summary
         }
+    
+    def get_named_network(self, name: str, stats: Optional[List[str]] = None,
+                          stats_sample_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot of a named network in the builder format. The snapshot is stored
+        in the graph store, so the returned graph_id works with the analysis endpoints.
+        """
+        network = self.named_networks.get(name)
+        if network is None:
+            return None
+        
+        result = network.to_json(stats, stats_sample_size)
+        result['name'] = name
+        result['version'] = network.version
+        result['graph_id'] = self.graph_store.put(result).graph_id
+        return result
+    
+    def delete_named_network(self, name: str) -> bool:
+        """Drop a named network; returns whether it existed"""
+        with self._named_networks_lock:
+            return self.named_networks.pop(name, None) is not None
+    
+    def ingest_hashtag_index(self, name: str, posts: Optional[List[Dict[str, Any]]] = None,
+                             expired_posts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Add posts to (and expire posts from) a named hashtag co-occurrence index.
+        The index is created on first use; cost is proportional to the batch size.
+        """
+        for field, batch in (('posts', posts), ('expired_posts', expired_posts)):
+            if batch is not None and not (isinstance(batch, list) and all(isinstance(post, dict) for post in batch)):
+                raise ValueError(f"'{field}' must be a list of post objects")
+        
+        with self._hashtag_indexes_lock:
+            index = self.hashtag_indexes.get(name)
+            if index is None:
+                index = HashtagCooccurrenceIndex()
+                self.hashtag_indexes[name] = index
+        
+        with index.lock:
+            added = index.add_posts(posts or [])
+            expired = index.remove_posts(expired_posts or [])
+            summary = index.summary()
         
         return {
-            'nodes': nodes,
-            'edges': edges,
-            'stats': stats,
-            'graph_type': 'mention_network'
+            'index': name,
+            'added_posts': added,
+            'expired_posts': expired,
+            **summary
         }
     
-    def detect_communities(self, network_data: Dict[str, Any]) -> Dict[str, Any]:
+    def suggest_hashtags(self, name: str, hashtags: List[str], top_k: int = 10,
+                         metric: str = 'pmi', min_count: int = 2) -> Optional[Dict[str, Any]]:
+        """
+        Hashtags that co-occur with the given ones in a named index, ranked by
+        PMI, NPMI, lift or raw count. Returns None if the index does not exist.
+        """
+        index = self.hashtag_indexes.get(name)
+        if index is None:
+            return None
+        return index.suggest(hashtags, top_k=top_k, metric=metric, min_count=min_count)
+    
+    def temporal_network_windows(self, posts: List[Dict[str, Any]], window: Union[str, float] = '7D',
+                                 step: Union[str, float] = '1D',
+                                 graph_type: str = 'hashtag_cooccurrence',
+                                 timestamp_field: str = 'timestamp', top_k: int = 10,
+                                 include_communities: bool = True,
+                                 stats: Optional[List[str]] = None,
+                                 seed: Optional[int] = 42) -> Iterator[Dict[str, Any]]:
+        """
+        Sliding-window network analytics over timestamped posts. One network is kept
+        for the whole run: posts entering a window are added and expiring posts removed,
+        so each step costs time proportional to the posts that changed.
+        Input is validated eagerly; the returned iterator is meant to be streamed.
+        Args:
+            posts: Post objects with a timestamp plus 'hashtags'/'mentions' or 'content'
+            window: Window length as a pandas offset ('7D', '12h') or seconds
+            step: Step between window starts, same format
+            graph_type: 'hashtag_cooccurrence', 'mention_network' or 'author_hashtag'
+            timestamp_field: Post field holding the timestamp (ISO 8601 string)
+            top_k: Top nodes per window by weighted degree (weighted in-degree for mentions)
+            include_communities: Run Louvain community detection per window
+            stats: Statistics to include per window (default: all)
+            seed: Random seed for community detection (None for a random one)
+        Yields:
+            {'type': 'meta', ...}, then {'type': 'window', 'index', 'start', 'end', 'posts',
+            'entered', 'expired', 'stats', 'top_nodes', 'communities'} per window,
+            then {'type': 'summary', ...}
+        """
+        network = IncrementalNetwork(graph_type)
+        window_size = self._parse_duration(window, 'window')
+        step_size = self._parse_duration(step, 'step')
+        network.stats(stats)  # Validates the requested fields before streaming starts
+        top_k = self._parse_int(top_k, 'top_k')
+        seed = None if seed is None else self._parse_int(seed, 'seed')
+        
+        timestamps = pd.to_datetime(pd.Series([post.get(timestamp_field) for post in posts], dtype=object),
+                                    utc=True, errors='coerce', format='mixed')
+        valid = timestamps.notna().to_numpy()
+        times = timestamps[valid].dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        parsed = [parse_post(posts[i]) for i in np.flatnonzero(valid)[order].tolist()]
+        
+        num_windows = int((times[-1] - times[0]) // step_size) + 1 if len(times) else 0
+        if num_windows > self.MAX_TEMPORAL_WINDOWS:
+            raise ValueError(f"{num_windows} windows requested; increase step (max {self.MAX_TEMPORAL_WINDOWS})")
+        
+        def generate() -> Iterator[Dict[str, Any]]:
+            started = time.perf_counter()
+            yield {
+                'type': 'meta',
+                'graph_type': graph_type,
+                'window_seconds': window_size / np.timedelta64(1, 's'),
+                'step_seconds': step_size / np.timedelta64(1, 's'),
+                'posts': len(parsed),
+                'skipped_posts': int((~valid).sum()),
+                'windows': num_windows
+            }
+            
+            lo = hi = 0
+            tracked = {'ids': {}, 'next_id': 0}
+            computed_version, analytics = None, None
+            for index in range(num_windows):
+                start = times[0] + index * step_size
+                end = start + window_size
+                new_lo = int(np.searchsorted(times, start, side='left'))
+                new_hi = int(np.searchsorted(times, end, side='left'))
+                
+                # Expire posts that left the window, then add the posts that entered it
+                for i in range(lo, min(new_lo, hi)):
+                    network.apply_parsed(*parsed[i], sign=-1)
+                for i in range(max(hi, new_lo), new_hi):
+                    network.apply_parsed(*parsed[i])
+                expired = min(new_lo, hi) - lo
+                entered = new_hi - max(hi, new_lo)
+                lo, hi = new_lo, new_hi
+                
+                # Windows over the same posts share their analytics
+                if network.version != computed_version:
+                    analytics = {
+                        'stats': network.stats(stats),
+                        'top_nodes': self._temporal_top_nodes(network, top_k)
+                    }
+                    if include_communities:
+                        analytics['communities'] = self._temporal_communities(network.G, tracked, seed)
+                    computed_version = network.version
+                
+                yield {
+                    'type': 'window',
+                    'index': index,
+                    'start': pd.Timestamp(start, tz='UTC').isoformat(),
+                    'end': pd.Timestamp(end, tz='UTC').isoformat(),
+                    'posts': hi - lo,
+                    'entered': entered,
+                    'expired': expired,
+                    **analytics
+                }
+            
+            yield {
+                'type': 'summary',
+                'windows': num_windows,
+                'elapsed_ms': (time.perf_counter() - started) * 1000
+            }
+        
+        return generate()
+    
+    def _parse_duration(self, value: Union[str, float], name: str) -> np.timedelta64:
+        """Pandas offset string ('7D', '12h') or number of seconds as a positive timedelta"""
+        try:
+            if isinstance(value, (int, float)):
+                duration = pd.Timedelta(seconds=value)
+            else:
+                duration = pd.Timedelta(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name} '{value}'; use an offset like '7D' or '12h', or seconds")
+        if duration <= pd.Timedelta(0):
+            raise ValueError(f"{name} must be positive")
+        return duration.to_timedelta64().astype('timedelta64[ns]')
+    
+    def _parse_int(self, value: Any, name: str, minimum: int = 0) -> int:
+        """Integer (or integer string) parameter of at least minimum"""
+        try:
+            number = int(value)
+            if isinstance(value, bool) or (isinstance(value, float) and number != value):
+                raise TypeError
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+        if number < minimum:
+            raise ValueError(f"{name} must be at least {minimum}")
+        return number
+    
+    def _temporal_top_nodes(self, network: IncrementalNetwork, top_k: int) -> List[Dict[str, Any]]:
+        """Nodes with the largest weighted degree (weighted in-degree for mention networks)"""
+        G = network.G
+        strengths = list(G.in_degree(weight='weight') if network.directed else G.degree(weight='weight'))
+        values = np.array([strength for _, strength in strengths], dtype=float)
+        return [
+            {'node': strengths[i][0], 'strength': strengths[i][1]}
+            for i in top_k_indices(values, top_k).tolist()
+        ]
+    
+    def _temporal_communities(self, G: nx.Graph, tracked: Dict[str, Any], seed: int) -> List[Dict[str, Any]]:
+        """
+        Louvain communities of one window. Each community takes over the id of the
+        previous window's community it shares the most members with, so ids follow
+        clusters across windows; unmatched communities get new ids.
+        """
+        if G.number_of_nodes() == 0:
+            tracked['ids'] = {}
+            return []
+        
+        undirected = G.to_undirected(as_view=True) if G.is_directed() else G
+        communities = sorted(nx.community.louvain_communities(undirected, weight='weight', seed=seed),
+                             key=len, reverse=True)
+        
+        previous_ids = tracked['ids']
+        taken = set()
+        community_list = []
+        node_ids = {}
+        for members in communities:
+            overlap = Counter(previous_ids[node] for node in members if node in previous_ids)
+            community_id = next((cid for cid, _ in overlap.most_common() if cid not in taken), None)
+            if community_id is None:
+                community_id = tracked['next_id']
+                tracked['next_id'] += 1
+            taken.add(community_id)
+            for node in members:
+                node_ids[node] = community_id
+            community_list.append({
+                'id': community_id,
+                'members': list(members),
+                'size': len(members)
+            })
+        
+        tracked['ids'] = node_ids
+        return community_list
+    
+    def detect_communities(self, network_data: Optional[Dict[str, Any]] = None,
+                           graph_id: Optional[str] = None,
+                           backbone: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Detect communities in a network using Louvain algorithm
         Args:
             network_data: Network structure with nodes and edges
+            graph_id: Id of a stored network (used instead of network_data)
+            backbone: Optional backbone filter applied before detection
         Returns:
             Communities and their members
         """
-        # Rebuild graph from network data
-        G = nx.Graph()
-        
-        # Add nodes
-        for node in network_data.get('nodes', []):
-            node_id = node.get('id') or node.get('label')
-            G.add_node(node_id, **{k: v for k, v in node.items() if k not in ['id', 'label']})
-        
-        # Add edges
-        for edge in network_data.get('edges', []):
-            source = edge.get('source')
-            target = edge.get('target')
-            weight = edge.get('weight', 1)
-            if source and target:
-                G.add_edge(source, target, weight=weight)
+        entry = self._resolve_graph(network_data, graph_id)
+        entry, report = self._backbone_graph(entry, backbone)
+        result = entry.get_or_build(entry.results, ('communities',), lambda: self._detect_communities(entry))
+        return self._with_backbone(result, report)
+    
+    def _detect_communities(self, entry: StoredGraph) -> Dict[str, Any]:
+        """Community detection on a stored network (cached per graph by detect_communities)"""
+        # Community detection always treats the network as undirected
+        _, G = self._graph_structures(entry, directed=False)
         
         if G.number_of_nodes() == 0:
             return {
                 'communities': [],
                 'num_communities': 0,
-                'modularity': 0
+                'modularity': 0,
+                'graph_id': entry.graph_id
             }
         
         # Detect communities using greedy modularity communities
@@ -209,7 +485,8 @@ class NetworkAnalysisService:
             return {
                 'communities': community_list,
                 'num_communities': len(communities),
-                'modularity': float(modularity)
+                'modularity': float(modularity),
+                'graph_id': entry.graph_id
             }
         except Exception as e:
             # Fallback to simple connected components
@@ -226,104 +503,501 @@ class NetworkAnalysisService:
                 'communities': community_list,
                 'num_communities': len(communities),
                 'modularity': 0.0,
-                'method': 'connected_components'
+                'method': 'connected_components',
+                'graph_id': entry.graph_id
             }
     
-    def analyze_influence(self, network_data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_influence(self, network_data: Optional[Dict[str, Any]] = None, mode: str = 'auto',
+                          k: Optional[int] = None, seed: int = 42,
+                          seed_nodes: Optional[List[Any]] = None,
+                          include_strength: bool = False,
+                          max_workers: Optional[int] = None,
+                          graph_id: Optional[str] = None,
+                          backbone: Optional[Dict[str, Any]] = None,
+                          top_k: Optional[int] = None, cursor: int = 0,
+                          page_size: Optional[int] = None,
+                          include_metrics: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Analyze influence in network using centrality measures
         Args:
             network_data: Network structure with nodes and edges
+            mode: 'exact', 'approximate' or 'auto' (approximate above the size thresholds)
+            k: Number of pivot nodes sampled for approximate betweenness/closeness
+            seed: Random seed for pivot sampling
+            seed_nodes: Nodes (e.g. brand accounts) to seed personalized PageRank on
+            include_strength: Add weighted in/out strength to each node
+            max_workers: Upper bound on worker processes (default: all cores for large graphs)
+            graph_id: Id of a stored network (used instead of network_data)
+            backbone: Optional backbone filter applied before scoring
+            top_k: Number of top_influencers (default 10)
+            cursor: Rank offset of the first node in influence_scores
+            page_size: Nodes per page (default: all nodes up to 1000 nodes, else 1000)
+            include_metrics: Per-node metrics to include besides influence_score (default: all)
         Returns:
-            Influence scores for each node
+            Influence scores for a page of nodes by rank, the top influencers and next_cursor
         """
-        # Determine if directed or undirected
-        is_directed = network_data.get('graph_type') == 'mention_network'
+        if mode not in CENTRALITY_MODES:
+            raise ValueError(f"Unknown centrality mode '{mode}'. Expected one of: {', '.join(CENTRALITY_MODES)}")
+        if include_metrics is not None:
+            unknown = [metric for metric in include_metrics if metric not in INFLUENCE_METRICS]
+            if unknown:
+                raise ValueError(f"Unknown metrics: {', '.join(map(str, unknown))}. "
+                                 f"Expected any of: {', '.join(INFLUENCE_METRICS)}")
+        cursor = self._parse_int(cursor, 'cursor')
+        top_k = None if top_k is None else self._parse_int(top_k, 'top_k')
+        page_size = None if page_size is None else self._parse_int(page_size, 'page_size', minimum=1)
         
-        if is_directed:
-            G = nx.DiGraph()
-        else:
-            G = nx.Graph()
-        
-        # Add nodes
-        for node in network_data.get('nodes', []):
-            node_id = node.get('id') or node.get('label')
-            G.add_node(node_id)
+        entry = self._resolve_graph(network_data, graph_id)
+        entry, report = self._backbone_graph(entry, backbone)
+        # Results depend on everything except the worker count
+        cache_key = ('influence', mode, k, seed, tuple(seed_nodes or ()), bool(include_strength))
+        # A degraded (fallback) result is returned but not cached, so later requests retry
+        scores = entry.get_or_build(entry.results, cache_key, lambda: self._analyze_influence(
+            entry, mode, k, seed, seed_nodes, include_strength, max_workers
+        ), cacheable=lambda scores: scores.get('method') != 'degree_centrality_fallback')
+        result = self._influence_page(scores, top_k, cursor, page_size, include_metrics)
+        return self._with_backbone(result, report)
+    
+    def _analyze_influence(self, entry: StoredGraph, mode: str, k: Optional[int], seed: int,
+                           seed_nodes: Optional[List[Any]], include_strength: bool,
+                           max_workers: Optional[int]) -> Dict[str, Any]:
+        """
+        Influence analysis on a stored network (cached per graph by analyze_influence).
+        Scores stay as per-node arrays; _influence_page selects and serializes what is returned.
+        """
+        # Determine if directed or undirected
+        is_directed = entry.network_data.get('graph_type') == 'mention_network'
         
-        # Add edges
-        for edge in network_data.get('edges', []):
-            source = edge.get('source')
-            target = edge.get('target')
-            weight = edge.get('weight', 1)
-            if source and target:
-                G.add_edge(source, target, weight=weight)
+        # The payload is converted to CSR arrays once per stored graph; networkx is
+        # only needed for path-based metrics
+        csr, G = self._graph_structures(entry, directed=is_directed)
+        if seed_nodes and not any(node in csr.index for node in seed_nodes):
+            raise ValueError('None of the seed_nodes are in the network')
         
-        if G.number_of_nodes() == 0:
+        if csr.num_nodes == 0:
             return {
-                'influence_scores': [],
-                'top_influencers': []
+                'node_ids': [],
+                'columns': {'influence_score': np.zeros(0)},
+                'graph_id': entry.graph_id
             }
         
         # Calculate various centrality measures
-        influence_scores = []
+        use_approximation = self._use_approximate_centrality(G, mode)
         
         try:
-            # Degree centrality
-            degree_centrality = nx.degree_centrality(G)
-            
-            # PageRank (for influence)
-            pagerank = nx.pagerank(G, weight='weight')
-            
-            # Betweenness centrality
-            betweenness = nx.betweenness_centrality(G, weight='weight')
-            
-            # Closeness centrality
-            closeness = nx.closeness_centrality(G, distance='weight')
+            # Degree, PageRank, betweenness and closeness are independent; run them
+            # (and betweenness/closeness source partitions) on a process pool
+            pivots = self._sample_pivots(G, k, seed) if use_approximation else None
+            workers = self._centrality_workers(G, max_workers)
+            metrics, estimates = self._compute_centralities(csr, G, pivots, seed_nodes, workers)
+            degree_centrality = metrics['degree_centrality']
+            pagerank = metrics['pagerank']
+            betweenness = metrics['betweenness_centrality']
+            closeness = metrics['closeness_centrality']
             
             # Combine scores
-            for node in G.nodes():
-                influence_score = (
-                    pagerank.get(node, 0) * 0.4 +
-                    degree_centrality.get(node, 0) * 0.3 +
-                    betweenness.get(node, 0) * 0.2 +
-                    closeness.get(node, 0) * 0.1
-                )
-                
-                influence_scores.append({
-                    'node': node,
-                    'influence_score': float(influence_score),
-                    'pagerank': float(pagerank.get(node, 0)),
-                    'degree_centrality': float(degree_centrality.get(node, 0)),
-                    'betweenness_centrality': float(betweenness.get(node, 0)),
-                    'closeness_centrality': float(closeness.get(node, 0))
-                })
-            
-            # Sort by influence score
-            influence_scores.sort(key=lambda x: x['influence_score'], reverse=True)
+            combined = pagerank * 0.4 + degree_centrality * 0.3 + betweenness * 0.2 + closeness * 0.1
             
-            # Get top influencers
-            top_influencers = influence_scores[:10]  # Top 10
+            columns = {
+                'influence_score': combined,
+                'pagerank': pagerank,
+                'degree_centrality': degree_centrality,
+                'betweenness_centrality': betweenness,
+                'closeness_centrality': closeness
+            }
+            if seed_nodes:
+                # Personalized PageRank measures influence relative to the seed (brand) accounts
+                columns['personalized_pagerank'] = metrics['personalized_pagerank']
+            if include_strength:
+                columns['in_strength'] = csr.in_strength()
+                columns['out_strength'] = csr.out_strength()
             
-            return {
-                'influence_scores': influence_scores,
-                'top_influencers': top_influencers
+            result = {
+                'node_ids': csr.node_ids,
+                'columns': columns,
+                'centrality_mode': 'approximate' if use_approximation else 'exact',
+                'graph_id': entry.graph_id
             }
+            if use_approximation:
+                result['estimates'] = estimates
+            return result
         except Exception as e:
             # Fallback to simple degree centrality
-            degree_centrality = nx.degree_centrality(G)
-            influence_scores = [
-                {
-                    'node': node,
-                    'influence_score': float(degree_centrality.get(node, 0)),
-                    'degree_centrality': float(degree_centrality.get(node, 0))
-                }
-                for node in G.nodes()
-            ]
-            influence_scores.sort(key=lambda x: x['influence_score'], reverse=True)
-            
+            degree_centrality = csr.degree_centrality()
             return {
-                'influence_scores': influence_scores,
-                'top_influencers': influence_scores[:10],
-                'method': 'degree_centrality_fallback'
+                'node_ids': csr.node_ids,
+                'columns': {
+                    'influence_score': degree_centrality,
+                    'degree_centrality': degree_centrality
+                },
+                'method': 'degree_centrality_fallback',
+                'graph_id': entry.graph_id
+            }
+    
+    def _influence_page(self, scores: Dict[str, Any], top_k: Optional[int], cursor: int,
+                        page_size: Optional[int], include_metrics: Optional[List[str]]) -> Dict[str, Any]:
+        """
+        Serialize the top influencers and one page of nodes ranked by influence_score.
+        Only the requested ranks are selected (partial sort) and converted to dicts.
+        """
+        node_ids = scores['node_ids']
+        columns = scores['columns']
+        total = len(node_ids)
+        names = [name for name in columns
+                 if name == 'influence_score' or include_metrics is None or name in include_metrics]
+        
+        if page_size is None:
+            page_size = total if total <= self.INFLUENCE_PAGE_NODE_THRESHOLD else self.DEFAULT_INFLUENCE_PAGE_SIZE
+        top_k = self.DEFAULT_TOP_INFLUENCERS if top_k is None else top_k
+        
+        # One partial sort covers both the top influencers and the requested page
+        end = min(cursor + page_size, total)
+        ranked = top_k_indices(columns['influence_score'], max(end, top_k))
+        
+        def serialize(indices: np.ndarray) -> List[Dict[str, Any]]:
+            values = {name: columns[name][indices].tolist() for name in names}
+            nodes = []
+            for i, index in enumerate(indices.tolist()):
+                score = {'node': node_ids[index]}
+                for name in names:
+                    score[name] = values[name][i]
+                nodes.append(score)
+            return nodes
+        
+        result = {
+            'influence_scores': serialize(ranked[cursor:end]),
+            'top_influencers': serialize(ranked[:top_k]),
+            'total_nodes': total,
+            'cursor': cursor,
+            'page_size': page_size,
+            'next_cursor': end if end < total else None
+        }
+        for key in ('centrality_mode', 'estimates', 'method', 'graph_id'):
+            if key in scores:
+                result[key] = scores[key]
+        return result
+    
+    def _resolve_graph(self, network_data: Optional[Dict[str, Any]], graph_id: Optional[str]) -> StoredGraph:
+        """Look up a stored network by id, or store an inline payload under its content hash"""
+        if graph_id:
+            return self.graph_store.get(graph_id)
+        return self.graph_store.put(network_data or {})
+    
+    def _graph_structures(self, entry: StoredGraph, directed: bool) -> Tuple[CSRGraph, nx.Graph]:
+        """CSR arrays and networkx graph for a stored network, built once per direction"""
+        def build():
+            csr = CSRGraph.from_network_data(entry.network_data, directed=directed)
+            return csr, csr.to_networkx()
+        return entry.get_or_build(entry.structures, ('graph', directed), build)
+    
+    def _backbone_options(self, backbone: Any) -> Dict[str, Any]:
+        """Validate a backbone spec ('disparity' or {'method': ..., parameter}) and fill defaults"""
+        if isinstance(backbone, str):
+            backbone = {'method': backbone}
+        method = backbone.get('method', 'disparity')
+        if method not in BACKBONE_METHODS:
+            raise ValueError(f"Unknown backbone method '{method}'. Expected one of: {', '.join(BACKBONE_METHODS)}")
+        
+        if method == 'disparity':
+            alpha = float(backbone.get('alpha', 0.05))
+            if not 0 < alpha < 1:
+                raise ValueError('backbone alpha must be between 0 and 1')
+            return {'method': method, 'alpha': alpha}
+        if method == 'threshold':
+            return {'method': method, 'min_weight': float(backbone.get('min_weight', 2))}
+        k = int(backbone.get('k', 5))
+        if k < 1:
+            raise ValueError('backbone k must be at least 1')
+        return {'method': method, 'k': k}
+    
+    def _backbone_edges(self, csr: CSRGraph,
+                        options: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Edge and node masks of the backbone plus a report of what was kept"""
+        mask = csr.backbone_mask(**options)
+        kept_nodes = np.zeros(csr.num_nodes, dtype=bool)
+        kept_nodes[csr.sources[mask]] = True
+        kept_nodes[csr.targets[mask]] = True
+        total_weight = float(csr.weights.sum())
+        
+        report = {
+            **options,
+            'nodes_total': csr.num_nodes,
+            'nodes_kept': int(kept_nodes.sum()),
+            'edges_total': csr.num_edges,
+            'edges_kept': int(mask.sum()),
+            'weight_fraction_kept': float(csr.weights[mask].sum()) / total_weight if total_weight > 0 else 0.0
+        }
+        return mask, kept_nodes, report
+    
+    def _backbone_graph(self, entry: StoredGraph,
+                        backbone: Optional[Dict[str, Any]]) -> Tuple[StoredGraph, Optional[Dict[str, Any]]]:
+        """
+        Stored backbone of a stored network. The filtered payload is cached on the
+        source entry and stored under its own graph_id so its results are cached too.
+        """
+        if not backbone:
+            return entry, None
+        options = self._backbone_options(backbone)
+        
+        def build():
+            is_directed = entry.network_data.get('graph_type') == 'mention_network'
+            csr, _ = self._graph_structures(entry, directed=is_directed)
+            mask, kept, report = self._backbone_edges(csr, options)
+            
+            ids = csr.node_ids
+            payload_nodes = {node.get('id') or node.get('label'): node
+                             for node in entry.network_data.get('nodes', [])}
+            filtered = {
+                'nodes': [payload_nodes.get(ids[i], {'id': ids[i], 'label': ids[i]})
+                          for i in np.flatnonzero(kept).tolist()],
+                'edges': [{'source': ids[u], 'target': ids[v], 'weight': w} for u, v, w in zip(
+                    csr.sources[mask].tolist(), csr.targets[mask].tolist(), csr.weights[mask].tolist()
+                )],
+                'graph_type': entry.network_data.get('graph_type')
+            }
+            return filtered, report
+        
+        filtered, report = entry.get_or_build(entry.results, ('backbone', tuple(options.items())), build)
+        return self.graph_store.put(filtered), report
+    
+    def _with_backbone(self, result: Dict[str, Any], report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Attach the backbone report without touching the cached result"""
+        if report is None:
+            return result
+        return {**result, 'backbone': report}
+    
+    def _use_approximate_centrality(self, G: nx.Graph, mode: str) -> bool:
+        """Decide whether betweenness/closeness should be estimated from samples"""
+        if mode == 'approximate':
+            return True
+        if mode == 'exact':
+            return False
+        return (G.number_of_nodes() > self.APPROXIMATE_NODE_THRESHOLD or
+                G.number_of_edges() > self.APPROXIMATE_EDGE_THRESHOLD)
+    
+    def _sample_pivots(self, G: nx.Graph, k: Optional[int], seed: int) -> List[Any]:
+        """Sample k distinct pivot (source) nodes, reproducibly for a given seed"""
+        nodes = list(G.nodes())
+        k = self.DEFAULT_CENTRALITY_SAMPLES if k is None else int(k)
+        k = max(1, min(k, len(nodes)))
+        return random.Random(seed).sample(nodes, k)
+    
+    def _hoeffding_bound(self, n: int, k: int, value_range: float) -> float:
+        """Additive error bound holding for all n nodes at once with probability 1 - delta"""
+        return value_range * math.sqrt(math.log(2 * n / self.CENTRALITY_ERROR_DELTA) / (2 * k))
+    
+    def _centrality_workers(self, G: nx.Graph, max_workers: Optional[int]) -> int:
+        """Number of worker processes for centrality computation"""
+        available = os.cpu_count() or 1
+        if max_workers is None:
+            # Shipping the graph to workers outweighs the gain on small graphs
+            return available if G.number_of_nodes() >= self.PARALLEL_NODE_THRESHOLD else 1
+        return max(1, min(int(max_workers), available))
+    
+    def _compute_centralities(self, csr: CSRGraph, G: nx.Graph, pivots: Optional[List[Any]],
+                              seed_nodes: Optional[List[Any]], workers: int) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Compute all centrality arrays (in csr.node_ids order). Betweenness is split
+        by source node and closeness by target node into one partition per worker;
+        partial results are merged in partition order so output is deterministic.
+        Pivots switch betweenness/closeness to sampled estimates.
+        """
+        n = csr.num_nodes
+        sources = pivots if pivots is not None else list(G.nodes())
+        source_parts = [part for part in (sources[i::workers] for i in range(workers)) if part]
+        
+        tasks = [('betweenness', part, None) for part in source_parts]
+        if pivots is not None:
+            tasks += [('harmonic', part, None) for part in source_parts]
+        else:
+            nodes = list(G.nodes())
+            tasks += [('closeness', part, None) for part in (nodes[i::workers] for i in range(workers)) if part]
+        tasks += [('degree', None, None), ('pagerank', None, None)]
+        if seed_nodes:
+            tasks.append(('personalized_pagerank', None, dict.fromkeys(seed_nodes, 1.0)))
+        
+        if workers <= 1:
+            results = [_centrality_task((csr, G), *task) for task in tasks]
+        else:
+            results = self._run_centrality_tasks((csr, G), tasks, workers)
+        
+        partials = {}
+        for (metric, _, _), value in zip(tasks, results):
+            partials.setdefault(metric, []).append(value)
+        
+        metrics = {
+            'degree_centrality': partials['degree'][0],
+            'pagerank': partials['pagerank'][0]
+        }
+        if seed_nodes:
+            metrics['personalized_pagerank'] = partials['personalized_pagerank'][0]
+        
+        # Raw betweenness counts ordered (s, t) pairs; normalize like nx.betweenness_centrality
+        # and, when sampling, extrapolate from k sources to n
+        betweenness = np.sum(partials['betweenness'], axis=0)
+        k = len(sources)
+        if n > 2:
+            betweenness = betweenness * (n / k) / ((n - 1) * (n - 2))
+        metrics['betweenness_centrality'] = betweenness
+        
+        estimates = {}
+        if pivots is None:
+            closeness = {}
+            for part in partials['closeness']:
+                closeness.update(part)
+            metrics['closeness_centrality'] = np.array([closeness[node] for node in csr.node_ids])
+        else:
+            # Harmonic closeness averages 1/d over the pivots other than the node itself
+            samples = np.full(n, float(k))
+            samples[[csr.index[node] for node in pivots]] -= 1
+            totals = np.sum(partials['harmonic'], axis=0)
+            metrics['closeness_centrality'] = np.divide(totals, samples, out=np.zeros(n), where=samples > 0)
+            estimates = {
+                'betweenness_centrality': self._betweenness_estimate(n, k),
+                'closeness_centrality': self._harmonic_closeness_estimate(csr, k)
             }
+        
+        return metrics, estimates
+    
+    def _run_centrality_tasks(self, graph: Tuple[CSRGraph, nx.Graph],
+                              tasks: List[Tuple[str, Optional[List[Any]], Any]], workers: int) -> List[Any]:
+        """
+        Run tasks on the shared process pool as one batch per worker. Tasks are dealt
+        round-robin, so each batch gets one betweenness and one closeness partition,
+        and the graph is pickled once and sent once per batch. Results are in task order.
+        """
+        payload = pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL)
+        batches = [tasks[i::workers] for i in range(workers)]
+        pool = _centrality_pool()
+        futures = []
+        try:
+            for batch in batches:
+                if batch:
+                    futures.append(pool.submit(_centrality_batch, payload, batch))
+            batch_results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _discard_centrality_pool(pool)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        
+        results = [None] * len(tasks)
+        for i, values in enumerate(batch_results):
+            results[i::workers] = values
+        return results
+    
+    def _betweenness_estimate(self, n: int, k: int) -> Dict[str, Any]:
+        """
+        Error bound for pivot-sampled (Brandes-Pich) betweenness. Each pivot contributes
+        an unbiased sample of the exact normalized score bounded by n / (n - 1), so
+        Hoeffding's inequality bounds the error.
+        """
+        return {
+            'method': 'pivot_sampling',
+            'sample_size': k,
+            'confidence': 1 - self.CENTRALITY_ERROR_DELTA,
+            'error_bound': 0.0 if k >= n or n <= 2 else self._hoeffding_bound(n, k, n / (n - 1))
+        }
+    
+    def _harmonic_closeness_estimate(self, csr: CSRGraph, k: int) -> Dict[str, Any]:
+        """
+        Error bound for sampled harmonic closeness, the mean of 1/d(u, v) over all
+        other nodes u. Unlike classic closeness it stays well defined on disconnected graphs.
+        """
+        n = csr.num_nodes
+        # 1/d is bounded by the inverse of the lightest edge weight
+        weights = csr.weights[csr.weights > 0]
+        value_range = 1.0 / float(weights.min()) if len(weights) else 1.0
+        return {
+            'method': 'sampled_harmonic',
+            'sample_size': k,
+            'confidence': 1 - self.CENTRALITY_ERROR_DELTA,
+            'error_bound': 0.0 if k >= n else self._hoeffding_bound(n, max(k - 1, 1), value_range)
+        }
+
+
+# Process pool shared by all influence requests, created on first use. Workers
+# come from a fork server (spawn where unavailable) instead of being forked from
+# the threaded web server, which could copy locks held by other request threads.
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def _centrality_pool() -> ProcessPoolExecutor:
+    """The shared centrality pool, with one worker per core"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _shared_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                               mp_context=multiprocessing.get_context(method))
+        return _shared_pool
 
+def _discard_centrality_pool(pool: Optional[ProcessPoolExecutor]):
+    """Drop a broken pool (e.g. a worker was killed) so the next request starts a new one"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+# Shut the workers down while the interpreter is still intact
+atexit.register(lambda: _discard_centrality_pool(_shared_pool))
+
+def _centrality_batch(payload: bytes, tasks: List[Tuple[str, Optional[List[Any]], Any]]) -> List[Any]:
+    """Run a batch of centrality tasks in a pool worker against the pickled graph"""
+    graph = pickle.loads(payload)
+    return [_centrality_task(graph, *task) for task in tasks]
+
+def _centrality_task(graph: Tuple[CSRGraph, nx.Graph], metric: str,
+                     nodes: Optional[List[Any]], options: Any) -> Any:
+    """
+    Compute one metric, or one partition of it, over the shared graph.
+    Returns arrays in csr.node_ids order (closeness partitions return {node: value}).
+    """
+    csr, G = graph
+    
+    if metric == 'degree':
+        return csr.degree_centrality()
+    
+    if metric == 'pagerank':
+        return csr.pagerank()
+    
+    if metric == 'personalized_pagerank':
+        return csr.pagerank(personalization=options)
+    
+    if metric == 'betweenness':
+        # Dependencies accumulated from the given sources only. The subset variant
+        # halves undirected counts, so undo that to count ordered pairs
+        raw = nx.betweenness_centrality_subset(G, nodes, list(G), normalized=False, weight='weight')
+        correction = 1.0 if G.is_directed() else 2.0
+        return np.array([raw[node] for node in csr.node_ids]) * correction
+    
+    if metric == 'harmonic':
+        # Distances from each pivot measure incoming closeness, matching
+        # nx.closeness_centrality on directed graphs
+        totals = np.zeros(csr.num_nodes)
+        for source in nodes:
+            lengths = nx.single_source_dijkstra_path_length(G, source, weight='weight')
+            for node, distance in lengths.items():
+                if node != source and distance > 0:
+                    totals[csr.index[node]] += 1.0 / distance
+        return totals
+    
+    if metric == 'closeness':
+        # Same formula as nx.closeness_centrality (Wasserman-Faust scaling), per node
+        H = G.reverse(copy=False) if G.is_directed() else G
+        n = H.number_of_nodes()
+        closeness = {}
+        for node in nodes:
+            lengths = nx.single_source_dijkstra_path_length(H, node, weight='weight')
+            total = sum(lengths.values())
+            reachable = len(lengths) - 1.0
+            if total > 0.0 and n > 1:
+                closeness[node] = (reachable / total) * (reachable / (n - 1))
+            else:
+                closeness[node] = 0.0
+        return closeness
+    
+    raise ValueError(f"Unknown centrality metric: {metric}")
@@ -0,0 +1,69 @@
+"""
+Online Engagement Learning
+Incremental engagement regressor updated with partial_fit on streamed batches,
+with prequential (test-then-train) rolling error metrics
+"""
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+from typing import Dict, Any
+
+
+class OnlineEngagementModel:
+    """
+    SGD linear regressor on standardized features. Targets are fitted on a log1p scale,
+    which keeps SGD stable on heavy-tailed engagement counts; predictions are mapped back.
+    Each update costs time proportional to the batch.
+    """
+    
+    def __init__(self, error_window: int = 1000, random_state: int = 42):
+        """
+        Args:
+            error_window: Number of most recent observations the rolling metrics cover
+            random_state: Seed for the SGD shuffling
+        """
+        self.scaler = StandardScaler()
+        self.regressor = SGDRegressor(loss='squared_error', penalty='l2', alpha=1e-4,
+                                      learning_rate='invscaling', eta0=0.01, random_state=random_state)
+        self.n_samples = 0
+        self.n_batches = 0
+        # Ring buffer of the latest absolute prediction errors
+        self._errors = np.full(error_window, np.nan)
+        self._position = 0
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicted engagement per row"""
+        return np.maximum(np.expm1(self.regressor.predict(self.scaler.transform(X))), 0)
+    
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+        """
+        Update with one batch. The batch is scored before it is learned from, so the
+        rolling metrics measure error on data the model has not seen yet.
+        Returns:
+            Rolling metrics after the update
+        """
+        if self.n_samples:
+            self._record_errors(np.abs(self.predict(X) - y))
+        
+        self.scaler.partial_fit(X)
+        self.regressor.partial_fit(self.scaler.transform(X), np.log1p(np.maximum(y, 0)))
+        self.n_samples += len(y)
+        self.n_batches += 1
+        return self.metrics()
+    
+    def _record_errors(self, errors: np.ndarray):
+        window = len(self._errors)
+        errors = errors[-window:]
+        self._errors[(self._position + np.arange(len(errors))) % window] = errors
+        self._position = (self._position + len(errors)) % window
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Prequential MAE and RMSE over the most recent observations"""
+        errors = self._errors[~np.isnan(self._errors)]
+        if len(errors) == 0:
+            return {'mae': None, 'rmse': None, 'window': 0}
+        return {
+            'mae': float(errors.mean()),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'window': int(len(errors))
+        }
@@ -0,0 +1,162 @@
+"""
+Posting Time Aggregates
+Per-account engagement moments (count, sum, sum of squares) for every day×hour
+cell of the week, updated incrementally from new posts and mergeable across
+shards. Recent posts weigh more through forward exponential decay, so best-time
+queries are a few vectorized operations on 7×24 arrays
+"""
+import math
+from statistics import NormalDist
+import numpy as np
+from typing import Dict, Any, Optional
+
+# Rescale the accumulated weights before exp() of the squared weights can overflow
+MAX_DECAY_EXPONENT = 300.0
+
+
+class PostingTimeAggregate:
+    """
+    Decayed engagement moments per (day_of_week, hour) cell.
+    Forward decay: a post at time t is added with weight exp(rate * (t - landmark)),
+    so older posts never need to be revisited; means, variances and effective sample
+    sizes are ratios of these sums and do not depend on the query time.
+    """
+    
+    def __init__(self, half_life_days: Optional[float] = 28.0):
+        """
+        Args:
+            half_life_days: Age at which a post counts half as much as a new one
+                (None or 0 weighs all posts equally)
+        """
+        self.half_life_days = float(half_life_days) if half_life_days else None
+        self.decay_rate = math.log(2) / (self.half_life_days * 86400) if self.half_life_days else 0.0
+        self.landmark: Optional[float] = None
+        self.latest: Optional[float] = None
+        self.version = 0
+        self.count = np.zeros((7, 24), dtype=np.int64)
+        self.weight = np.zeros((7, 24))
+        self.weight_sq = np.zeros((7, 24))
+        self.total = np.zeros((7, 24))
+        self.total_sq = np.zeros((7, 24))
+    
+    def _move_landmark(self, landmark: float):
+        """Re-express the decayed sums relative to a later landmark"""
+        if self.landmark is not None and self.decay_rate:
+            factor = math.exp(-self.decay_rate * (landmark - self.landmark))
+            self.weight *= factor
+            self.total *= factor
+            self.total_sq *= factor
+            self.weight_sq *= factor * factor
+        self.landmark = landmark
+    
+    def add(self, days: np.ndarray, hours: np.ndarray, engagement: np.ndarray, times: np.ndarray):
+        """
+        Add a batch of posts
+        Args:
+            days: Day of week per post (0=Monday)
+            hours: Hour of day per post
+            engagement: Engagement per post
+            times: Post times in epoch seconds (only used for decay)
+        """
+        if len(engagement) == 0:
+            return
+        if self.landmark is None:
+            self.landmark = float(times.min())
+        if self.decay_rate * (times.max() - self.landmark) > MAX_DECAY_EXPONENT:
+            self._move_landmark(float(times.max()))
+        
+        weights = np.exp(self.decay_rate * (times - self.landmark))
+        cells = days.astype(np.int64) * 24 + hours.astype(np.int64)
+        self.count += np.bincount(cells, minlength=168).reshape(7, 24)
+        self.weight += np.bincount(cells, weights=weights, minlength=168).reshape(7, 24)
+        self.weight_sq += np.bincount(cells, weights=weights * weights, minlength=168).reshape(7, 24)
+        self.total += np.bincount(cells, weights=weights * engagement, minlength=168).reshape(7, 24)
+        self.total_sq += np.bincount(cells, weights=weights * engagement * engagement, minlength=168).reshape(7, 24)
+        self.latest = max(float(times.max()), self.latest if self.latest is not None else -math.inf)
+        self.version += 1
+    
+    def merge(self, other: 'PostingTimeAggregate'):
+        """Add another aggregate (e.g. from another shard) with the same half-life"""
+        if self.half_life_days != other.half_life_days:
+            raise ValueError('Only aggregates with the same half_life_days can be merged')
+        if other.landmark is None:
+            return
+        other = PostingTimeAggregate.from_dict(other.to_dict())
+        # Align both on the later landmark so the weights stay bounded
+        if self.landmark is None:
+            self.landmark = other.landmark
+        landmark = max(self.landmark, other.landmark)
+        self._move_landmark(landmark)
+        other._move_landmark(landmark)
+        
+        self.count += other.count
+        self.weight += other.weight
+        self.weight_sq += other.weight_sq
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.latest = max(value for value in (self.latest, other.latest) if value is not None)
+        self.version += 1
+    
+    def cell_stats(self, axis: Optional[int] = None, confidence: float = 0.95) -> Dict[str, np.ndarray]:
+        """
+        Weighted mean engagement with a normal confidence interval
+        Args:
+            axis: None for every day×hour cell, 0 to pool days (per hour), 1 to pool hours (per day)
+            confidence: Interval coverage
+        Returns:
+            {'mean', 'lower', 'upper', 'posts', 'effective_posts'} (NaN where undefined)
+        """
+        moments = [self.count, self.weight, self.weight_sq, self.total, self.total_sq]
+        if axis is not None:
+            moments = [moment.sum(axis=axis) for moment in moments]
+        count, weight, weight_sq, total, total_sq = moments
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(weight > 0, total / weight, np.nan)
+            # Kish effective sample size and the unbiased weighted variance
+            effective = np.where(weight_sq > 0, weight * weight / weight_sq, 0.0)
+            variance = np.maximum(total_sq / weight - mean * mean, 0) * effective / (effective - 1)
+            half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(variance / effective)
+        half_width = np.where(effective > 1, half_width, np.nan)
+        return {
+            'mean': mean,
+            'lower': mean - half_width,
+            'upper': mean + half_width,
+            'posts': count,
+            'effective_posts': effective
+        }
+    
+    def summary(self) -> Dict[str, Any]:
+        """Size and configuration of the aggregate"""
+        return {
+            'posts': int(self.count.sum()),
+            'half_life_days': self.half_life_days,
+            'latest_post': self.latest,
+            'version': self.version
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state, e.g. to merge into another shard"""
+        return {
+            'half_life_days': self.half_life_days,
+            'landmark': self.landmark,
+            'latest': self.latest,
+            'count': self.count.tolist(),
+            'weight': self.weight.tolist(),
+            'weight_sq': self.weight_sq.tolist(),
+            'total': self.total.tolist(),
+            'total_sq': self.total_sq.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'PostingTimeAggregate':
+        """Rebuild an aggregate from to_dict() output"""
+        aggregate = cls(state.get('half_life_days'))
+        aggregate.landmark = state.get('landmark')
+        aggregate.latest = state.get('latest')
+        for name in ('count', 'weight', 'weight_sq', 'total', 'total_sq'):
+            values = np.asarray(state.get(name, np.zeros((7, 24))), dtype=np.int64 if name == 'count' else float)
+            if values.shape != (7, 24):
+                raise ValueError(f"Aggregate field '{name}' must be a 7x24 array")
+            setattr(aggregate, name, values)
+        return aggregate
@@ -4,51 +4,171 @@ Implements engagement prediction, best posting time prediction, and trend foreca
 """
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.model_selection import HalvingRandomSearchCV
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Any
+from scipy.stats import loguniform, randint
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
+import copy
+import os
+import time
 import warnings
+from .forecasting import series_frame, pad_series, linear_trend_forecast, holt_winters_forecast
+from .graph_kernels import top_k_indices
+from .model_registry import ModelRegistry
+from .online_learning import OnlineEngagementModel
+from .posting_time_aggregate import PostingTimeAggregate
+from .state_store import StateStore, default_state_directory
 warnings.filterwarnings('ignore')
 
+# Engagement inputs and the value used when a post does not provide them
+ENGAGEMENT_FEATURE_DEFAULTS = {
+    'hour': 12,
+    'day_of_week': 3,
+    'hashtags_count': 0,
+    'has_media': False,
+    'content_length': 0,
+    'follower_count': 1000,
+    'sentiment_score': 0.0
+}
+
+ENGAGEMENT_LEARNERS = ('forest', 'online')
+
+# Model families for hyperparameter search, cheapest first
+MODEL_FAMILIES = ('ridge', 'hist_gradient_boosting', 'random_forest')
+
+FORECAST_METHODS = ('linear', 'holt_winters')
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+DEFAULT_MODEL_DIR = default_state_directory('models')
+
 class PredictiveModelingService:
     def __init__(self):
         """Initialize predictive modeling service"""
-        self.engagement_model = None
         self.posting_time_model = None
         self.scaler = StandardScaler()
+        # Per-account models and aggregates, persisted with joblib and LRU-cached in memory
+        self.state_store = StateStore(
+            directory=os.getenv('MODEL_REGISTRY_DIR', DEFAULT_MODEL_DIR) or None,
+            max_entries=int(os.getenv('MODEL_REGISTRY_MAX_ENTRIES', 32))
+        )
+        self.model_registry = ModelRegistry(
+            self.state_store, max_versions=int(os.getenv('MODEL_REGISTRY_MAX_VERSIONS', 5))
+        )
     
-    def _prepare_engagement_features(self, post_features: Dict[str, Any]) -> np.ndarray:
-        """Prepare features for engagement prediction"""
-        features = []
-        
-        # Extract features
-        hour = post_features.get('hour', 12)
-        day_of_week = post_features.get('day_of_week', 3)  # 0=Monday, 6=Sunday
-        has_hashtags = 1 if post_features.get('hashtags_count', 0) > 0 else 0
-        hashtags_count = post_features.get('hashtags_count', 0)
-        has_media = 1 if post_features.get('has_media', False) else 0
-        content_length = post_features.get('content_length', 0)
-        follower_count = post_features.get('follower_count', 1000)
-        
-        # Sentiment score if available
-        sentiment_score = post_features.get('sentiment_score', 0.0)
-        
-        features = [
-            hour / 24.0,  # Normalize hour
-            day_of_week / 6.0,  # Normalize day
-            has_hashtags,
-            min(hashtags_count / 30.0, 1.0),  # Normalize hashtag count
-            has_media,
-            min(content_length / 500.0, 1.0),  # Normalize content length
-            min(follower_count / 100000.0, 1.0),  # Normalize follower count
-            (sentiment_score + 1) / 2.0  # Normalize sentiment (-1 to 1 -> 0 to 1)
-        ]
-        
-        return np.array(features).reshape(1, -1)
+    def _engagement_frame(self, records: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Engagement inputs of many posts as numeric columns, with defaults for missing values"""
+        df = pd.DataFrame.from_records(records, columns=list(ENGAGEMENT_FEATURE_DEFAULTS) + ['actual_engagement', 'engagement'])
+        frame = pd.DataFrame(index=df.index)
+        for name, default in ENGAGEMENT_FEATURE_DEFAULTS.items():
+            if name == 'has_media':
+                frame[name] = df[name].fillna(False).astype(bool)
+            else:
+                frame[name] = pd.to_numeric(df[name], errors='coerce').fillna(default).astype(float)
+        # Target: 'actual_engagement', or 'engagement' as in posting-time history; NaN when unknown
+        frame['actual_engagement'] = pd.to_numeric(df['actual_engagement'], errors='coerce').fillna(
+            pd.to_numeric(df['engagement'], errors='coerce')).astype(float)
+        return frame
+    
+    def _engagement_training_data(self, frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Feature matrix and targets of the posts whose engagement is known"""
+        labeled = frame[frame['actual_engagement'].notna()]
+        return self._engagement_feature_matrix(labeled), labeled['actual_engagement'].to_numpy()
+    
+    def _engagement_feature_matrix(self, frame: pd.DataFrame) -> np.ndarray:
+        """Normalized feature matrix (one row per post) from an engagement frame"""
+        hashtags_count = frame['hashtags_count'].to_numpy()
+        return np.column_stack([
+            frame['hour'].to_numpy() / 24.0,  # Normalize hour
+            frame['day_of_week'].to_numpy() / 6.0,  # Normalize day (0=Monday, 6=Sunday)
+            (hashtags_count > 0).astype(float),
+            np.minimum(hashtags_count / 30.0, 1.0),  # Normalize hashtag count
+            frame['has_media'].to_numpy(dtype=float),
+            np.minimum(frame['content_length'].to_numpy() / 500.0, 1.0),  # Normalize content length
+            np.minimum(frame['follower_count'].to_numpy() / 100000.0, 1.0),  # Normalize follower count
+            (frame['sentiment_score'].to_numpy() + 1) / 2.0  # Normalize sentiment (-1 to 1 -> 0 to 1)
+        ])
     
-    def predict_engagement(self, post_features: Dict[str, Any]) -> Dict[str, Any]:
+    def _engagement_model_entry(self, account_id: str, historical_data: Optional[List[Dict[str, Any]]],
+                                learner: str = 'forest') -> Optional[Dict[str, Any]]:
+        """
+        Registry entry to predict with: trained on historical_data (or reused if this
+        account already has a model for the same data), else the account's latest model.
+        With learner='online' the account's incrementally trained model is used instead.
+        """
+        if learner not in ENGAGEMENT_LEARNERS:
+            raise ValueError(f"Unknown learner '{learner}'. Expected one of: {', '.join(ENGAGEMENT_LEARNERS)}")
+        
+        if learner == 'online':
+            model = self.model_registry.get(account_id, 'online')
+            if model is None:
+                return None
+            return {
+                'model': model,
+                'account_id': account_id,
+                'kind': 'online_sgd',
+                'n_samples': model.n_samples,
+                'metrics': model.metrics()
+            }
+        
+        if historical_data:
+            X_train, y_train = self._engagement_training_data(self._engagement_frame(historical_data))
+            
+            # Need minimum data; history without engagement values never trains a model
+            if len(y_train) > 10:
+                def train():
+                    model = RandomForestRegressor(n_estimators=100, random_state=42)
+                    model.fit(X_train, y_train)
+                    return model
+                
+                fingerprint = self.model_registry.fingerprint(X_train, y_train, 'random_forest')
+                return self.model_registry.get_or_train(
+                    account_id, fingerprint, train, kind='random_forest', n_samples=len(y_train)
+                )
+        
+        return self.model_registry.latest(account_id)
+    
+    def _heuristic_engagement(self, frame: pd.DataFrame) -> np.ndarray:
+        """Rule-based engagement estimate used when an account has no trained model"""
+        base_engagement = 100
+        
+        # Best posting hours (9-12, 17-20)
+        hour = frame['hour'].to_numpy()
+        hour_factor = np.where(((hour >= 9) & (hour <= 12)) | ((hour >= 17) & (hour <= 20)), 1.5,
+                               np.where((hour >= 13) & (hour <= 16), 0.8, 1.0))
+        
+        # Best posting days (Tuesday-Thursday)
+        day = frame['day_of_week'].to_numpy()
+        day_factor = np.where((day >= 1) & (day <= 3), 1.3, np.where((day == 0) | (day == 4), 1.1, 1.0))
+        
+        predicted = base_engagement * hour_factor * day_factor
+        predicted = predicted * (1 + frame['sentiment_score'].to_numpy() * 0.2)
+        predicted = predicted * (1 + np.minimum(frame['hashtags_count'].to_numpy() / 10, 0.5))
+        return np.where(frame['has_media'].to_numpy(), predicted * 1.5, predicted)
+    
+    def _predict_engagement_frame(self, frame: pd.DataFrame,
+                                  model_entry: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, float]:
+        """Predictions for every row of an engagement frame in one call, plus the confidence"""
+        engagement_model = model_entry['model'] if model_entry else None
+        
+        # If no model trained, use simple heuristic
+        if engagement_model is None:
+            return self._heuristic_engagement(frame), 0.6
+        
+        predicted = engagement_model.predict(self._engagement_feature_matrix(frame))
+        
+        # Calculate confidence (simpler version)
+        confidence = 0.8 if hasattr(engagement_model, 'feature_importances_') else 0.7
+        return predicted, confidence
+    
+    def predict_engagement(self, post_features: Dict[str, Any], account_id: Optional[str] = None,
+                           learner: str = 'forest') -> Dict[str, Any]:
         """
         Predict engagement for a post
         Args:
@@ -62,74 +182,20 @@ class PredictiveModelingService:
                 'sentiment_score': float (-1 to 1),
                 'historical_data': [] (optional, for training)
             }
+            account_id: Account (tenant) whose model is trained and used (default: 'default')
+            learner: 'forest' (trained on historical_data) or 'online' (updated via update_online_model)
         Returns:
             {
                 'predicted_engagement': float,
                 'confidence': float,
-                'factors': {}
+                'factors': {},
+                'model': {} (registry entry used, if any)
             }
         """
-        # If historical data provided, train a model
-        if 'historical_data' in post_features and post_features['historical_data']:
-            historical_data = post_features['historical_data']
-            # Train model (simplified - in production, save/load model)
-            X_train = []
-            y_train = []
-            
-            for item in historical_data:
-                features = self._prepare_engagement_features(item)
-                X_train.append(features[0])
-                y_train.append(item.get('actual_engagement', 0))
-            
-            if len(X_train) > 10:  # Need minimum data
-                X_train = np.array(X_train)
-                y_train = np.array(y_train)
-                
-                # Train model
-                self.engagement_model = RandomForestRegressor(n_estimators=100, random_state=42)
-                self.engagement_model.fit(X_train, y_train)
-        
-        # Prepare features for prediction
-        features = self._prepare_engagement_features(post_features)
-        
-        # If no model trained, use simple heuristic
-        if self.engagement_model is None:
-            # Simple heuristic-based prediction
-            base_engagement = 100
-            hour_factor = 1.0
-            day_factor = 1.0
-            
-            # Best posting hours (9-12, 17-20)
-            hour = post_features.get('hour', 12)
-            if 9 <= hour <= 12 or 17 <= hour <= 20:
-                hour_factor = 1.5
-            elif 13 <= hour <= 16:
-                hour_factor = 0.8
-            
-            # Best posting days (Tuesday-Thursday)
-            day = post_features.get('day_of_week', 3)
-            if 1 <= day <= 3:
-                day_factor = 1.3
-            elif day == 0 or day == 4:
-                day_factor = 1.1
-            
-            predicted = base_engagement * hour_factor * day_factor
-            predicted *= (1 + post_features.get('sentiment_score', 0) * 0.2)
-            predicted *= (1 + min(post_features.get('hashtags_count', 0) / 10, 0.5))
-            
-            if post_features.get('has_media', False):
-                predicted *= 1.5
-            
-            confidence = 0.6
-        else:
-            # Use trained model
-            predicted = self.engagement_model.predict(features)[0]
-            
-            # Calculate confidence (simpler version)
-            if hasattr(self.engagement_model, 'feature_importances_'):
-                confidence = 0.8
-            else:
-                confidence = 0.7
+        account_id = str(account_id or 'default')
+        model_entry = self._engagement_model_entry(account_id, post_features.get('historical_data'), learner)
+        predictions, confidence = self._predict_engagement_frame(self._engagement_frame([post_features]), model_entry)
+        predicted = predictions[0]
         
         # Analyze factors
         factors = {
@@ -139,11 +205,343 @@ class PredictiveModelingService:
             'hashtag_impact': 'positive' if post_features.get('hashtags_count', 0) > 0 else 'neutral'
         }
         
-        return {
+        result = {
             'predicted_engagement': float(max(predicted, 0)),
             'confidence': float(confidence),
             'factors': factors
         }
+        if model_entry:
+            result['model'] = self._model_info(model_entry)
+        return result
+    
+    def predict_engagement_batch(self, posts: List[Dict[str, Any]], account_id: Optional[str] = None,
+                                 historical_data: Optional[List[Dict[str, Any]]] = None,
+                                 top_k: int = 10, learner: str = 'forest') -> Dict[str, Any]:
+        """
+        Predict engagement for many candidate posts (e.g. draft variations) with one
+        feature-matrix build and a single model predict
+        Args:
+            posts: Post feature dicts in the predict_engagement format
+            account_id: Account whose model is trained and used (default: 'default')
+            historical_data: Optional training data, as in predict_engagement
+            top_k: Number of best candidates to list
+            learner: 'forest' or 'online', as in predict_engagement
+        Returns:
+            {
+                'predictions': [float] (aligned with posts),
+                'confidence': float,
+                'top_candidates': [{'index': int, 'predicted_engagement': float}],
+                'model': {} (registry entry used, if any)
+            }
+        """
+        account_id = str(account_id or 'default')
+        model_entry = self._engagement_model_entry(account_id, historical_data, learner)
+        predictions, confidence = self._predict_engagement_frame(self._engagement_frame(posts), model_entry)
+        predictions = np.maximum(predictions, 0)
+        
+        top = np.argsort(-predictions, kind='stable')[:top_k]
+        result = {
+            'predictions': predictions.tolist(),
+            'confidence': float(confidence),
+            'count': len(posts),
+            'top_candidates': [
+                {'index': int(i), 'predicted_engagement': float(predictions[i])} for i in top
+            ]
+        }
+        if model_entry:
+            result['model'] = self._model_info(model_entry)
+        return result
+    
+    def update_online_model(self, observations: List[Dict[str, Any]],
+                            account_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Update an account's incremental engagement model with a batch of new observations
+        Args:
+            observations: Post feature dicts (predict_engagement format) with 'actual_engagement' (or 'engagement')
+            account_id: Account whose model is updated (default: 'default')
+        Returns:
+            {
+                'observations': int,
+                'n_samples': int (total seen),
+                'n_batches': int,
+                'metrics': {'mae', 'rmse', 'window'} (prequential, most recent observations),
+                'elapsed_ms': float
+            }
+        """
+        started = time.perf_counter()
+        account_id = str(account_id or 'default')
+        X, y = self._engagement_training_data(self._engagement_frame(observations))
+        if len(y) == 0:
+            raise ValueError("Observations need 'actual_engagement' (or 'engagement') values")
+        
+        def update(model: OnlineEngagementModel) -> Dict[str, Any]:
+            metrics = model.partial_fit(X, y)
+            return {'n_samples': model.n_samples, 'n_batches': model.n_batches, 'metrics': metrics}
+        
+        result = self.model_registry.update(account_id, 'online', OnlineEngagementModel, update)
+        return {
+            'account_id': account_id,
+            'observations': len(observations),
+            **result,
+            'elapsed_ms': (time.perf_counter() - started) * 1000
+        }
+    
+    def _model_family(self, family: str, seed: int) -> Tuple[Any, Dict[str, Any]]:
+        """Estimator and hyperparameter distributions of one search family"""
+        if family == 'ridge':
+            return make_pipeline(StandardScaler(), Ridge()), {
+                'ridge__alpha': loguniform(1e-3, 1e3)
+            }
+        if family == 'hist_gradient_boosting':
+            return HistGradientBoostingRegressor(random_state=seed), {
+                'learning_rate': loguniform(0.01, 0.3),
+                'max_iter': [100, 200, 300],
+                'max_leaf_nodes': randint(8, 64),
+                'min_samples_leaf': randint(5, 50),
+                'l2_regularization': loguniform(1e-6, 1.0)
+            }
+        # Folds run in parallel, so each forest is single-threaded
+        return RandomForestRegressor(random_state=seed, n_jobs=1), {
+            'n_estimators': [50, 100, 200],
+            'max_depth': [None, 8, 16],
+            'min_samples_leaf': randint(1, 10),
+            'max_features': [1.0, 0.5, 'sqrt']
+        }
+    
+    def tune_engagement_model(self, historical_data: List[Dict[str, Any]], account_id: Optional[str] = None,
+                              families: Optional[List[str]] = None, time_budget_seconds: float = 60,
+                              n_candidates: int = 16, cv: int = 5, n_jobs: Optional[int] = None,
+                              max_inference_ms: Optional[float] = None, seed: int = 42) -> Dict[str, Any]:
+        """
+        Time-budgeted hyperparameter search over engagement model families with
+        successive halving (HalvingRandomSearchCV) and parallel cross-validation folds.
+        The selected model is registered as the account's latest engagement model.
+        Args:
+            historical_data: Training posts (predict_engagement format with 'actual_engagement' or 'engagement')
+            account_id: Account the selected model is registered for (default: 'default')
+            families: Subset of 'ridge', 'hist_gradient_boosting', 'random_forest' (default: all)
+            time_budget_seconds: Families are searched cheapest first. Once the budget is
+                spent no new cross-validation fit starts: fits already running finish, the
+                running search keeps its best completed candidate and later families are
+                skipped. Refitting the selected model runs after the budget.
+            n_candidates: Random configurations per family in the first halving round
+            cv: Cross-validation folds
+            n_jobs: Parallel fits (default: all cores)
+            max_inference_ms: Only select models predicting 1,000 posts within this time
+            seed: Random seed for sampling and models
+        Returns:
+            {
+                'selected': {'family', 'params', 'cv_mae', 'training_seconds', 'inference_ms_per_1k'},
+                'families': [... same per searched family, plus 'search_seconds' and 'interrupted'],
+                'skipped_families': [str],
+                'model': {} (registry entry)
+            }
+        """
+        families = list(families or MODEL_FAMILIES)
+        unknown = [family for family in families if family not in MODEL_FAMILIES]
+        if unknown:
+            raise ValueError(f"Unknown model families: {', '.join(unknown)}. Expected any of: {', '.join(MODEL_FAMILIES)}")
+        
+        X, y = self._engagement_training_data(self._engagement_frame(historical_data))
+        if len(y) < 3 * cv:
+            raise ValueError(f"At least {3 * cv} historical posts with 'actual_engagement' (or 'engagement') "
+                             f"are required for {cv}-fold search")
+        # Small fixed batch for the latency measurement
+        X_latency = X[np.arange(1000) % len(X)]
+        
+        started = time.perf_counter()
+        # Wall-clock deadline, comparable inside the worker processes that run the folds
+        deadline = time.time() + time_budget_seconds
+        
+        class DeadlineRegressor(RegressorMixin, BaseEstimator):
+            """
+            Fits that start after the deadline are skipped; predicting from a skipped fit
+            raises, so the search scores it NaN (error_score) and never selects it.
+            Defined here so worker processes receive it by value instead of importing
+            the services package.
+            """
+            
+            def __init__(self, model=None):
+                self.model = model
+            
+            def fit(self, X, y):
+                self.model_ = clone(self.model).fit(X, y) if time.time() < deadline else None
+                return self
+            
+            def predict(self, X):
+                if self.model_ is None:
+                    raise TimeoutError('Fit skipped: search time budget exhausted')
+                return self.model_.predict(X)
+        
+        results, skipped, models = [], [], {}
+        for family in sorted(families, key=MODEL_FAMILIES.index):
+            if time.time() >= deadline:
+                skipped.append(family)
+                continue
+            
+            estimator, distributions = self._model_family(family, seed)
+            # Past the deadline every remaining fit (and round) is skipped at no cost
+            search = HalvingRandomSearchCV(
+                DeadlineRegressor(estimator), {f"model__{name}": values for name, values in distributions.items()},
+                n_candidates=n_candidates, factor=3, cv=cv, min_resources='exhaust',
+                scoring='neg_mean_absolute_error', refit=False, error_score=np.nan,
+                return_train_score=False, n_jobs=n_jobs or -1, random_state=seed
+            )
+            search_start = time.perf_counter()
+            search.fit(X, y)
+            search_seconds = time.perf_counter() - search_start
+            
+            # Best candidate among those evaluated on the most data
+            scores = np.asarray(search.cv_results_['mean_test_score'], dtype=float)
+            resources = np.asarray(search.cv_results_['n_resources'])
+            completed = np.isfinite(scores)
+            if not completed.any():
+                skipped.append(family)
+                continue
+            candidates = np.flatnonzero(completed & (resources == resources[completed].max()))
+            best = int(candidates[np.argmax(scores[candidates])])
+            params = {name[len('model__'):]: value for name, value in search.cv_results_['params'][best].items()}
+            
+            refit_start = time.perf_counter()
+            model = clone(estimator).set_params(**params).fit(X, y)
+            training_seconds = time.perf_counter() - refit_start
+            
+            latency_start = time.perf_counter()
+            model.predict(X_latency)
+            inference_ms = (time.perf_counter() - latency_start) * 1000
+            
+            models[family] = model
+            results.append({
+                'family': family,
+                'params': {name: value.item() if isinstance(value, np.generic) else value
+                           for name, value in params.items()},
+                'cv_mae': float(-scores[best]),
+                'training_seconds': training_seconds,
+                'inference_ms_per_1k': inference_ms,
+                'search_seconds': search_seconds,
+                'interrupted': bool(not completed.all())
+            })
+        
+        eligible = [result for result in results
+                    if max_inference_ms is None or result['inference_ms_per_1k'] <= max_inference_ms]
+        if not results:
+            raise ValueError('No model family completed a candidate within time_budget_seconds')
+        if not eligible:
+            raise ValueError('No searched model meets max_inference_ms; raise the limit or the time budget')
+        selected = min(eligible, key=lambda result: result['cv_mae'])
+        
+        model = models[selected['family']]
+        fingerprint = self.model_registry.fingerprint(X, y, f"tuned:{selected['family']}")
+        model_entry = self.model_registry.register(
+            str(account_id or 'default'), fingerprint, model,
+            kind=selected['family'], n_samples=len(y), cv_mae=selected['cv_mae']
+        )
+        
+        return {
+            'selected': {key: value for key, value in selected.items() if key not in ('search_seconds', 'interrupted')},
+            'families': results,
+            'skipped_families': skipped,
+            'elapsed_seconds': time.perf_counter() - started,
+            'model': self._model_info(model_entry)
+        }
+    
+    def optimize_posting_slots(self, draft: Dict[str, Any], account_id: Optional[str] = None,
+                               historical_data: Optional[List[Dict[str, Any]]] = None,
+                               num_slots: int = 5, blackout_hours: Optional[List[int]] = None,
+                               blackout_days: Optional[List[int]] = None,
+                               blackout_slots: Optional[List[Dict[str, int]]] = None,
+                               min_spacing_hours: int = 0, max_per_day: Optional[int] = None,
+                               prior_weight: float = 5.0, learner: str = 'forest') -> Dict[str, Any]:
+        """
+        Rank all 168 weekly (day, hour) slots for a draft post and pick a schedule
+        Args:
+            draft: Post features in the predict_engagement format (hour/day are ignored)
+            account_id: Account whose model is trained and used (default: 'default')
+            historical_data: Optional history of {'hour', 'day_of_week', 'engagement' or
+                'actual_engagement', ...}; trains the model and provides the observed heatmap
+            num_slots: Number of slots to schedule
+            blackout_hours: Hours (0-23) never used
+            blackout_days: Days (0=Monday .. 6=Sunday) never used
+            blackout_slots: Specific [{'day_of_week', 'hour'}] slots never used
+            min_spacing_hours: Minimum hours between scheduled posts (wrapping around the week)
+            max_per_day: Maximum scheduled posts per day
+            prior_weight: Pseudo-observations given to the model score when blending it
+                with a slot's observed mean engagement
+            learner: 'forest' or 'online', as in predict_engagement
+        Returns:
+            {
+                'slots': [{'day_of_week', 'day', 'hour', 'score', 'predicted_engagement',
+                           'observed_engagement', 'observations'}],
+                'heatmap': [[float] * 24] * 7 (blended score per day and hour),
+                'model': {} (registry entry used, if any)
+            }
+        """
+        account_id = str(account_id or 'default')
+        available = self._available_slots(blackout_hours, blackout_days, blackout_slots)
+        model_entry = self._engagement_model_entry(account_id, historical_data, learner)
+        
+        # Slot index = day_of_week * 24 + hour; every slot is scored in one predict call
+        hours_of_slot = np.tile(np.arange(24), 7)
+        days_of_slot = np.repeat(np.arange(7), 24)
+        grid = self._engagement_frame([draft]).iloc[np.zeros(168, dtype=int)].reset_index(drop=True)
+        grid['hour'] = hours_of_slot.astype(float)
+        grid['day_of_week'] = days_of_slot.astype(float)
+        predicted, confidence = self._predict_engagement_frame(grid, model_entry)
+        predicted = np.maximum(predicted, 0)
+        
+        # Observed heatmap, shrunk towards the model score where a slot has few observations
+        counts = np.zeros(168)
+        sums = np.zeros(168)
+        if historical_data:
+            history = pd.DataFrame.from_records(historical_data)
+            if {'hour', 'day_of_week'}.issubset(history.columns):
+                engagement = history['engagement'] if 'engagement' in history else history.get('actual_engagement')
+                if engagement is not None:
+                    engagement = pd.to_numeric(engagement, errors='coerce')
+                    hours = pd.to_numeric(history['hour'], errors='coerce')
+                    days = pd.to_numeric(history['day_of_week'], errors='coerce')
+                    valid = (engagement.notna() & hours.between(0, 23) & days.between(0, 6)).to_numpy()
+                    slots = (days.to_numpy()[valid] * 24 + hours.to_numpy()[valid]).astype(int)
+                    counts = np.bincount(slots, minlength=168).astype(float)
+                    sums = np.bincount(slots, weights=engagement.to_numpy()[valid], minlength=168)
+        observed = np.divide(sums, counts, out=np.full(168, np.nan), where=counts > 0)
+        weight = counts + prior_weight
+        score = np.divide(sums + prior_weight * predicted, weight, out=predicted.copy(), where=weight > 0)
+        
+        # Greedy selection by score; each pick blocks its spacing window and, when
+        # the day is full, the rest of the day
+        spacing = max(int(min_spacing_hours), 1)
+        per_day = np.zeros(7, dtype=int)
+        chosen = []
+        while len(chosen) < num_slots and available.any():
+            slot = int(np.argmax(np.where(available, score, -np.inf)))
+            chosen.append(slot)
+            available[(slot + np.arange(-spacing + 1, spacing)) % 168] = False
+            day = slot // 24
+            per_day[day] += 1
+            if max_per_day is not None and per_day[day] >= max_per_day:
+                available[day * 24:(day + 1) * 24] = False
+        
+        result = {
+            'slots': [{
+                'day_of_week': slot // 24,
+                'day': DAY_NAMES[slot // 24],
+                'hour': slot % 24,
+                'score': float(score[slot]),
+                'predicted_engagement': float(predicted[slot]),
+                'observed_engagement': None if np.isnan(observed[slot]) else float(observed[slot]),
+                'observations': int(counts[slot])
+            } for slot in chosen],
+            'heatmap': score.reshape(7, 24).tolist(),
+            'confidence': float(confidence)
+        }
+        if model_entry:
+            result['model'] = self._model_info(model_entry)
+        return result
+    
+    def _model_info(self, model_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Registry metadata of a model entry, without the model itself"""
+        return {key: value for key, value in model_entry.items() if key != 'model'}
     
     def predict_best_posting_time(self, historical_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -199,6 +597,194 @@ class PredictiveModelingService:
             'daily_breakdown': {int(k): float(v) for k, v in daily_engagement.to_dict().items()}
         }
     
+    def _available_slots(self, blackout_hours: Optional[List[int]], blackout_days: Optional[List[int]],
+                         blackout_slots: Optional[List[Dict[str, int]]]) -> np.ndarray:
+        """Mask of the 168 weekly slots left after the blackouts; out-of-range hours or days raise ValueError"""
+        def checked(values: List[Any], upper: int, name: str) -> List[int]:
+            try:
+                values = [int(value) for value in values]
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a list of integers")
+            out_of_range = [value for value in values if not 0 <= value <= upper]
+            if out_of_range:
+                raise ValueError(f"{name} must be between 0 and {upper}, got {out_of_range}")
+            return values
+        
+        available = np.ones(168, dtype=bool)
+        for hour in checked(blackout_hours or [], 23, 'blackout_hours'):
+            available[hour::24] = False
+        for day in checked(blackout_days or [], 6, 'blackout_days'):
+            available[day * 24:(day + 1) * 24] = False
+        for slot in blackout_slots or []:
+            if not isinstance(slot, dict):
+                raise ValueError("blackout_slots must be {'day_of_week', 'hour'} objects")
+            day, = checked([slot.get('day_of_week')], 6, 'blackout_slots day_of_week')
+            hour, = checked([slot.get('hour')], 23, 'blackout_slots hour')
+            available[day * 24 + hour] = False
+        return available
+    
+    def _posting_time_key(self, account_id: Optional[str]) -> str:
+        return f"posting_time:{account_id or 'default'}"
+    
+    def _update_posting_time_aggregate(self, account_id: Optional[str], half_life_days: Optional[float],
+                                       update) -> PostingTimeAggregate:
+        """
+        Load (or create) an account's aggregate, apply update to it and persist it.
+        The update runs on a copy that replaces the stored aggregate only when it succeeds.
+        """
+        key = self._posting_time_key(account_id)
+        with self.state_store.key_lock(key):
+            aggregate = self.state_store.get(key)
+            if aggregate is None:
+                aggregate = PostingTimeAggregate(28.0 if half_life_days is None else half_life_days)
+            elif half_life_days is not None and (half_life_days or None) != aggregate.half_life_days:
+                raise ValueError(f"The account's aggregate uses half_life_days={aggregate.half_life_days}")
+            else:
+                aggregate = copy.deepcopy(aggregate)
+            update(aggregate)
+            self.state_store.put(key, aggregate)
+        return aggregate
+    
+    def ingest_posting_times(self, posts: List[Dict[str, Any]], account_id: Optional[str] = None,
+                             half_life_days: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Add posts to an account's streaming hour×day engagement aggregate
+        Args:
+            posts: List of {'hour': int, 'day_of_week': int, 'engagement': float, 'timestamp': str}.
+                Hour and day are derived from the timestamp (UTC) when missing; the timestamp
+                dates the post for decay (ingest time when missing). 'actual_engagement' is
+                accepted in place of 'engagement'.
+            account_id: Account (default: 'default')
+            half_life_days: Decay half-life for a new aggregate (default 28; 0 disables decay).
+                A value that differs from an existing aggregate's raises ValueError.
+        Returns:
+            {'ingested': int, 'skipped': int, 'aggregate': {summary}}
+        """
+        df = pd.DataFrame.from_records(
+            posts, columns=['hour', 'day_of_week', 'engagement', 'actual_engagement', 'timestamp'])
+        timestamps = pd.to_datetime(df['timestamp'].astype(object), utc=True, errors='coerce', format='mixed')
+        times = ((timestamps - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+                 .fillna(time.time()).to_numpy(dtype=float))
+        hours = pd.to_numeric(df['hour'], errors='coerce').fillna(timestamps.dt.hour)
+        days = pd.to_numeric(df['day_of_week'], errors='coerce').fillna(timestamps.dt.dayofweek)
+        engagement = pd.to_numeric(df['engagement'], errors='coerce').fillna(
+            pd.to_numeric(df['actual_engagement'], errors='coerce'))
+        valid = (engagement.notna() & hours.isin(range(24)) & days.isin(range(7))).to_numpy()
+        
+        aggregate = self._update_posting_time_aggregate(
+            account_id, half_life_days,
+            lambda aggregate: aggregate.add(days.to_numpy(dtype=float)[valid], hours.to_numpy(dtype=float)[valid],
+                                            engagement.to_numpy(dtype=float)[valid], times[valid])
+        )
+        return {
+            'ingested': int(valid.sum()),
+            'skipped': int(len(valid) - valid.sum()),
+            'aggregate': aggregate.summary()
+        }
+    
+    def merge_posting_times(self, account_id: Optional[str] = None,
+                            aggregates: Optional[List[Dict[str, Any]]] = None,
+                            source_account_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Merge aggregates into an account's aggregate
+        Args:
+            account_id: Account receiving the merge
+            aggregates: Serialized aggregates from other shards ('state' of best_posting_time_from_aggregate)
+            source_account_ids: Accounts on this instance whose aggregates are merged in
+        Returns:
+            {'merged': int, 'aggregate': {summary}}
+        """
+        sources = [PostingTimeAggregate.from_dict(state) for state in aggregates or []]
+        for source_id in source_account_ids or []:
+            source = self.state_store.get(self._posting_time_key(source_id))
+            if source is None:
+                raise ValueError(f"No posting time aggregate for account '{source_id}'")
+            sources.append(source)
+        if not sources:
+            raise ValueError('aggregates or source_account_ids are required')
+        if len({source.half_life_days for source in sources}) > 1:
+            raise ValueError('Only aggregates with the same half_life_days can be merged')
+        
+        def merge(aggregate: PostingTimeAggregate):
+            for source in sources:
+                aggregate.merge(source)
+        
+        aggregate = self._update_posting_time_aggregate(account_id, sources[0].half_life_days or 0, merge)
+        return {'merged': len(sources), 'aggregate': aggregate.summary()}
+    
+    def best_posting_time_from_aggregate(self, account_id: Optional[str] = None, confidence: float = 0.95,
+                                         min_posts: int = 3, top_slots: int = 5,
+                                         include_state: bool = False) -> Dict[str, Any]:
+        """
+        Best posting times from an account's streaming aggregate (no historical data needed)
+        Args:
+            account_id: Account (default: 'default')
+            confidence: Confidence interval coverage
+            min_posts: Minimum posts for an hour, day or slot to be recommended
+            top_slots: Number of day×hour slots to return
+            include_state: Include the serialized aggregate (for merging into another shard)
+        Returns:
+            predict_best_posting_time fields (decay-weighted means), plus
+            'best_slots', 'hourly_intervals' and 'daily_intervals' ({key: [lower, upper]})
+            and the aggregate summary. Falls back to the default recommendations
+            with fewer than 5 posts.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError('confidence must be between 0 and 1')
+        aggregate = self.state_store.get(self._posting_time_key(account_id))
+        if aggregate is None or aggregate.count.sum() < 5:
+            result = self.predict_best_posting_time([])
+            result['aggregate'] = aggregate.summary() if aggregate is not None else None
+            return result
+        
+        def ranked(stats: Dict[str, np.ndarray], limit: int) -> np.ndarray:
+            mean = np.where(stats['posts'] >= min_posts, stats['mean'], np.nan)
+            candidates = np.flatnonzero(~np.isnan(mean))
+            return candidates[top_k_indices(mean[candidates], limit)]
+        
+        def intervals(stats: Dict[str, np.ndarray]) -> Dict[int, List[Optional[float]]]:
+            return {int(i): [None if np.isnan(stats['lower'][i]) else float(stats['lower'][i]),
+                             None if np.isnan(stats['upper'][i]) else float(stats['upper'][i])]
+                    for i in np.flatnonzero(stats['posts'] > 0)}
+        
+        hourly = aggregate.cell_stats(axis=0, confidence=confidence)
+        daily = aggregate.cell_stats(axis=1, confidence=confidence)
+        cells = aggregate.cell_stats(confidence=confidence)
+        best_hours = ranked(hourly, 6).tolist()
+        best_days = ranked(daily, 3).tolist()
+        flat = {name: values.ravel() for name, values in cells.items()}
+        
+        recommendations = []
+        if best_hours:
+            recommendations.append(f"Best posting hours: {', '.join(map(str, sorted(best_hours)))}")
+        if best_days:
+            recommendations.append(f"Best posting days: {', '.join(DAY_NAMES[d] for d in sorted(best_days))}")
+        
+        result = {
+            'best_hours': best_hours,
+            'best_days': best_days,
+            'recommendations': recommendations,
+            'hourly_breakdown': {int(h): float(hourly['mean'][h]) for h in np.flatnonzero(hourly['posts'] > 0)},
+            'daily_breakdown': {int(d): float(daily['mean'][d]) for d in np.flatnonzero(daily['posts'] > 0)},
+            'hourly_intervals': intervals(hourly),
+            'daily_intervals': intervals(daily),
+            'best_slots': [{
+                'day_of_week': slot // 24,
+                'day_name': DAY_NAMES[slot // 24],
+                'hour': slot % 24,
+                'mean_engagement': float(flat['mean'][slot]),
+                'confidence_lower': None if np.isnan(flat['lower'][slot]) else float(flat['lower'][slot]),
+                'confidence_upper': None if np.isnan(flat['upper'][slot]) else float(flat['upper'][slot]),
+                'posts': int(flat['posts'][slot]),
+                'effective_posts': float(flat['effective_posts'][slot])
+            } for slot in ranked(flat, top_slots).tolist()],
+            'confidence': confidence,
+            'aggregate': aggregate.summary()
+        }
+        if include_state:
+            result['state'] = aggregate.to_dict()
+        return result
+    
     def forecast_trends(self, time_series: List[Dict[str, Any]], forecast_periods: int = 7) -> Dict[str, Any]:
         """
         Forecast trends using time series analysis
@@ -240,19 +826,18 @@ class PredictiveModelingService:
         trend_strength = abs(slope) / (np.std(values) + 1e-10)
         trend_strength = min(trend_strength, 1.0)
         
+        # Simple confidence interval (using std of residuals)
+        residuals = y - model.predict(X)
+        std_error = np.std(residuals)
+        confidence_range = 1.96 * std_error  # 95% confidence
+        
         # Forecast future values
         last_date = df.index[-1]
+        future_index = np.arange(len(values), len(values) + forecast_periods).reshape(-1, 1)
+        predicted_values = model.predict(future_index) if forecast_periods > 0 else np.zeros(0)
         forecast = []
         
-        for i in range(1, forecast_periods + 1):
-            future_index = len(values) + i - 1
-            predicted_value = model.predict([[future_index]])[0]
-            
-            # Simple confidence interval (using std of residuals)
-            residuals = y - model.predict(X)
-            std_error = np.std(residuals)
-            confidence_range = 1.96 * std_error  # 95% confidence
-            
+        for i, predicted_value in enumerate(predicted_values.tolist(), start=1):
             future_date = last_date + timedelta(days=i)
             forecast.append({
                 'date': future_date.strftime('%Y-%m-%d'),
@@ -267,4 +852,87 @@ class PredictiveModelingService:
             'trend_strength': float(trend_strength),
             'slope': float(slope)
         }
-
+    
+    def forecast_trends_batch(self, series: List[Dict[str, Any]], forecast_periods: int = 7,
+                              methods: Optional[List[str]] = None, season_length: int = 7,
+                              confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Forecast many series at once with a linear trend and additive Holt-Winters
+        (weekly seasonality by default), fitted in one vectorized pass over all series
+        Args:
+            series: List of {'id': str, 'time_series': [{'date': str, 'value': float}]}
+            forecast_periods: Number of daily periods to forecast
+            methods: Subset of 'linear', 'holt_winters' (default: both)
+            season_length: Seasonal period in observations for Holt-Winters
+            confidence: Prediction interval coverage
+        Returns:
+            {
+                'series': [{
+                    'id', 'trend', 'trend_strength', 'slope', 'dates': [str],
+                    'linear': {'forecast', 'lower', 'upper'},
+                    'holt_winters': {'forecast', 'lower', 'upper', 'params', 'rmse'}
+                }],
+                'methods': [str]
+            }
+            Series with fewer than 3 points are returned with trend 'insufficient_data'.
+        """
+        methods = list(methods or FORECAST_METHODS)
+        unknown = [method for method in methods if method not in FORECAST_METHODS]
+        if unknown:
+            raise ValueError(f"Unknown forecast methods: {', '.join(unknown)}. Expected any of: {', '.join(FORECAST_METHODS)}")
+        if not 0 < confidence < 1:
+            raise ValueError('confidence must be between 0 and 1')
+        if season_length < 2:
+            raise ValueError('season_length must be at least 2')
+        forecast_periods = max(int(forecast_periods), 0)
+        
+        # Parse all observations in one frame and split it back into sorted series
+        ids = [entry.get('id', i) for i, entry in enumerate(series)]
+        frame = series_frame(series)
+        counts = np.bincount(frame['series'].to_numpy(), minlength=len(series))
+        values = np.split(frame['value'].to_numpy(dtype=float), np.cumsum(counts)[:-1])
+        last_dates = frame.groupby('series')['date'].last()
+        
+        results = [{'id': series_id, 'trend': 'insufficient_data', 'trend_strength': 0.0}
+                   for series_id in ids]
+        fitted = np.flatnonzero(counts >= 3)
+        if len(fitted) == 0:
+            return {'series': results, 'methods': methods}
+        
+        matrix, fitted_lengths = pad_series([values[i] for i in fitted])
+        linear = linear_trend_forecast(matrix, fitted_lengths, forecast_periods, confidence)
+        slope = linear['slope']
+        trend_strength = np.minimum(np.abs(slope) / (np.nanstd(matrix, axis=1) + 1e-10), 1.0)
+        forecasts = {}
+        if 'linear' in methods:
+            forecasts['linear'] = linear
+        if 'holt_winters' in methods:
+            forecasts['holt_winters'] = holt_winters_forecast(
+                matrix, fitted_lengths, forecast_periods, season_length, confidence)
+        
+        steps = pd.to_timedelta(np.arange(1, forecast_periods + 1), unit='D')
+        for row, i in enumerate(fitted.tolist()):
+            result = results[i]
+            result.update({
+                'trend': 'increasing' if slope[row] > 0 else 'decreasing' if slope[row] < 0 else 'stable',
+                'trend_strength': float(trend_strength[row]),
+                'slope': float(slope[row]),
+                'dates': (last_dates[i] + steps).strftime('%Y-%m-%d').tolist()
+            })
+            for method, forecast in forecasts.items():
+                result[method] = {
+                    'forecast': forecast['forecast'][row].tolist(),
+                    'lower': np.maximum(forecast['lower'][row], 0).tolist(),
+                    'upper': forecast['upper'][row].tolist()
+                }
+            if 'holt_winters' in forecasts:
+                holt_winters = forecasts['holt_winters']
+                result['holt_winters']['params'] = {
+                    'alpha': float(holt_winters['alpha'][row]),
+                    'beta': float(holt_winters['beta'][row]),
+                    'gamma': float(holt_winters['gamma'][row]),
+                    'seasonal': bool(holt_winters['seasonal'][row])
+                }
+                result['holt_winters']['rmse'] = float(holt_winters['rmse'][row])
+        
+        return {'series': results, 'methods': methods}
@@ -0,0 +1,189 @@
+"""
+Rolling Time-Series State
+Incremental per-series features (moving average and standard deviation, EWMA
+mean and volatility, week-over-week deltas). Single points update the state in
+O(1) through a ring buffer and running sums; bulk backfills use cumulative sums
+and linear filters over the whole batch and leave the identical state behind
+"""
+import numpy as np
+from scipy.signal import lfilter
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class RollingSeriesState:
+    """Ring buffer of recent values with running window sums and EWMA accumulators"""
+    
+    def __init__(self, window: int = 7, ewma_spans: Optional[List[int]] = None, season_lag: int = 7):
+        """
+        Args:
+            window: Points in the moving window
+            ewma_spans: EWMA spans in points (alpha = 2 / (span + 1)); default [7, 28]
+            season_lag: Points between a value and its seasonal counterpart (7 = week for daily data)
+        """
+        if window < 1 or season_lag < 1:
+            raise ValueError('window and season_lag must be positive')
+        self.window = int(window)
+        self.ewma_spans = [int(span) for span in (ewma_spans or [7, 28])]
+        if any(span < 1 for span in self.ewma_spans):
+            raise ValueError('ewma_spans must be positive')
+        self.season_lag = int(season_lag)
+        self.alphas = 2.0 / (np.asarray(self.ewma_spans, dtype=float) + 1.0)
+        
+        self.capacity = max(self.window, self.season_lag + 1)
+        self.buffer = np.zeros(self.capacity)
+        self.count = 0
+        self.last_timestamp: Optional[float] = None
+        # Window sums are kept around the first value (shifted data) to avoid cancellation
+        self.shift = 0.0
+        self.window_sum = 0.0
+        self.window_sum_sq = 0.0
+        self.ewma = np.zeros(len(self.alphas))
+        self.ewm_var = np.zeros(len(self.alphas))
+        self._updates_since_refresh = 0
+    
+    def config(self) -> Dict[str, Any]:
+        return {'window': self.window, 'ewma_spans': self.ewma_spans, 'season_lag': self.season_lag}
+    
+    def _recent(self, n: int) -> np.ndarray:
+        """Last n values, oldest first"""
+        n = min(n, self.count, self.capacity)
+        positions = (self.count - n + np.arange(n)) % self.capacity
+        return self.buffer[positions]
+    
+    def update(self, value: float, timestamp: Optional[float] = None):
+        """Add one point in O(1)"""
+        if self.count == 0:
+            self.shift = value
+        if self.count >= self.window:
+            leaving = self.buffer[(self.count - self.window) % self.capacity] - self.shift
+            self.window_sum -= leaving
+            self.window_sum_sq -= leaving * leaving
+        self.buffer[self.count % self.capacity] = value
+        shifted = value - self.shift
+        self.window_sum += shifted
+        self.window_sum_sq += shifted * shifted
+        
+        if self.count == 0:
+            self.ewma[:] = value
+        else:
+            delta = value - self.ewma
+            self.ewma += self.alphas * delta
+            self.ewm_var = (1 - self.alphas) * (self.ewm_var + self.alphas * delta * delta)
+        self.count += 1
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        
+        # Recompute the running sums now and then so rounding errors cannot accumulate
+        self._updates_since_refresh += 1
+        if self._updates_since_refresh >= 1000:
+            self._refresh_window_sums()
+    
+    def score(self, value: float) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Standardized deviation of a new value from the slowest EWMA, in O(1), before it is added
+        Returns:
+            (z-score, baseline); z is None while the EWMA has no variance yet
+        """
+        if self.count == 0:
+            return None, None
+        k = int(np.argmax(self.ewma_spans))
+        baseline = float(self.ewma[k])
+        if self.ewm_var[k] <= 0:
+            return None, baseline
+        return (value - baseline) / float(np.sqrt(self.ewm_var[k])), baseline
+    
+    def _refresh_window_sums(self):
+        recent = self._recent(self.window) - self.shift
+        self.window_sum = float(recent.sum())
+        self.window_sum_sq = float((recent * recent).sum())
+        self._updates_since_refresh = 0
+    
+    def extend(self, values: np.ndarray, timestamp: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Add many points at once (backfill) with vectorized cumulative sums and linear filters
+        Returns:
+            Per-point features after each point: 'rolling_mean', 'rolling_std',
+            'ewma_<span>', 'ewm_std_<span>', 'seasonal_delta'
+        """
+        values = np.asarray(values, dtype=float)
+        m = len(values)
+        if m == 0:
+            return {}
+        if self.count == 0:
+            self.shift = float(values[0])
+        history = self._recent(self.capacity)
+        series = np.concatenate([history, values])
+        offset = len(history)
+        total = self.count + np.arange(1, m + 1)  # points seen after each new point
+        
+        # Moving window from prefix sums of the shifted values
+        centered = series - self.shift
+        prefix = np.concatenate([[0.0], np.cumsum(centered)])
+        prefix_sq = np.concatenate([[0.0], np.cumsum(centered * centered)])
+        end = offset + np.arange(1, m + 1)
+        size = np.minimum(total, self.window)
+        start = end - size
+        window_sum = prefix[end] - prefix[start]
+        window_mean = window_sum / size
+        window_var = np.maximum((prefix_sq[end] - prefix_sq[start]) / size - window_mean ** 2, 0.0)
+        
+        features = {
+            'rolling_mean': window_mean + self.shift,
+            'rolling_std': np.sqrt(window_var)
+        }
+        
+        # EWMA: m_t = a x_t + (1 - a) m_{t-1}; variance: v_t = (1 - a) (v_{t-1} + a d_t^2), d_t = x_t - m_{t-1}
+        first = self.count == 0
+        for k, alpha in enumerate(self.alphas):
+            previous_mean = values[0] if first else self.ewma[k]
+            means = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1 - alpha) * previous_mean])[0]
+            lagged = np.concatenate([[previous_mean], means[:-1]])
+            deviation = values - lagged
+            variances = lfilter([(1 - alpha) * alpha], [1.0, alpha - 1.0], deviation * deviation,
+                                zi=[(1 - alpha) * self.ewm_var[k]])[0]
+            features[f"ewma_{self.ewma_spans[k]}"] = means
+            features[f"ewm_std_{self.ewma_spans[k]}"] = np.sqrt(variances)
+            self.ewma[k] = means[-1]
+            self.ewm_var[k] = variances[-1]
+        
+        seasonal_index = end - 1 - self.season_lag
+        seasonal = np.full(m, np.nan)
+        has_season = (total > self.season_lag) & (seasonal_index >= 0)
+        seasonal[has_season] = series[end[has_season] - 1] - series[seasonal_index[has_season]]
+        features['seasonal_delta'] = seasonal
+        
+        # Carry the tail over as the new ring buffer contents
+        self.count += m
+        tail = series[-self.capacity:]
+        positions = (self.count - len(tail) + np.arange(len(tail))) % self.capacity
+        self.buffer[positions] = tail
+        self._refresh_window_sums()
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return features
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current feature values"""
+        if self.count == 0:
+            return {'count': 0, **self.config()}
+        size = min(self.count, self.window)
+        mean = self.window_sum / size
+        variance = max(self.window_sum_sq / size - mean * mean, 0.0)
+        last = float(self.buffer[(self.count - 1) % self.capacity])
+        result = {
+            'count': self.count,
+            'last_value': last,
+            'last_timestamp': self.last_timestamp,
+            'rolling_mean': mean + self.shift,
+            'rolling_std': float(np.sqrt(variance)),
+            'ewma': {str(span): float(value) for span, value in zip(self.ewma_spans, self.ewma)},
+            'ewm_std': {str(span): float(np.sqrt(value)) for span, value in zip(self.ewma_spans, self.ewm_var)},
+            'seasonal_delta': None,
+            'seasonal_change_pct': None,
+            **self.config()
+        }
+        if self.count > self.season_lag:
+            previous = float(self.buffer[(self.count - 1 - self.season_lag) % self.capacity])
+            result['seasonal_delta'] = last - previous
+            result['seasonal_change_pct'] = (last - previous) / abs(previous) * 100 if previous else None
+        return result
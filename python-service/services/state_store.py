@@ -0,0 +1,158 @@
+"""
+Persistent State Store
+Keyed Python objects (trained models, aggregates, sketches) kept in an in-memory
+LRU cache and persisted to disk with joblib, so they survive restarts and are
+loaded on demand
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import joblib
+
+
+def default_state_directory(name: str) -> str:
+    """
+    Per-user directory for persisted service state, outside the source tree:
+    $PYTHON_SERVICE_STATE_HOME/<name>, by default ~/.local/state/python-service/<name>
+    """
+    root = os.getenv('PYTHON_SERVICE_STATE_HOME') or os.path.join(
+        os.getenv('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state'), 'python-service')
+    return os.path.join(root, name)
+
+
+class StateStore:
+    """Thread-safe LRU cache backed by one joblib file per key"""
+    
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 64,
+                 max_disk_entries: Optional[int] = None):
+        """
+        Args:
+            directory: Where entries are persisted, created on the first write
+                (None keeps them in memory only)
+            max_entries: Entries kept in memory; older ones are reloaded from disk when needed
+            max_disk_entries: Files kept on disk; beyond it the least recently used
+                entries are deleted (None keeps everything)
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._disk_entries: Optional[int] = None
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+    
+    def _path(self, key: str) -> str:
+        # Keys may contain any characters; file names are their hash
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.joblib")
+    
+    def _remember(self, key: str, value: Any):
+        """Insert into the LRU cache (caller holds the lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Value for key from memory, else from disk, else None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._touch(key)
+                return self._entries[key]
+        
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+        value = joblib.load(self._path(key))
+        self._touch(key)
+        with self._lock:
+            self._remember(key, value)
+        return value
+    
+    def _touch(self, key: str):
+        """Mark the file as used; its modification time orders disk eviction"""
+        if self.directory and self.max_disk_entries is not None:
+            try:
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                pass
+    
+    def put(self, key: str, value: Any):
+        """Store a value in memory and on disk"""
+        if self.directory:
+            # Write then rename so readers never see a partial file
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            is_new = not os.path.exists(path)
+            joblib.dump(value, temporary)
+            os.replace(temporary, path)
+        with self._lock:
+            self._remember(key, value)
+        if self.directory and self.max_disk_entries is not None and is_new:
+            self._count_new_file()
+    
+    def _count_new_file(self):
+        """Track the number of files and evict the least recently used ones past the limit"""
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = len(self._files())
+            else:
+                self._disk_entries += 1
+            if self._disk_entries <= self.max_disk_entries:
+                return
+            # Evict down to 90% of the limit so scans stay rare
+            files = sorted(self._files(), key=lambda path: os.stat(path).st_mtime)
+            evicted = files[:max(len(files) - int(self.max_disk_entries * 0.9), 0)]
+            for path in evicted:
+                os.remove(path)
+            evicted = set(evicted)
+            for key in [key for key in self._entries if self._path(key) in evicted]:
+                del self._entries[key]
+            self._disk_entries = len(files) - len(evicted)
+    
+    def _files(self) -> List[str]:
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.joblib')]
+    
+    def key_lock(self, key: str) -> threading.Lock:
+        """Lock serializing read-modify-write cycles on one key"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+    
+    def get_or_create(self, key: str, create: Callable[[], Any]) -> Any:
+        """Return the stored value, creating and storing it once if missing"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Concurrent requests for the same key wait for one creation
+        with self.key_lock(key):
+            value = self.get(key)
+            if value is None:
+                value = create()
+                self.put(key, value)
+            return value
+    
+    def remove(self, key: str) -> bool:
+        """Delete a key from memory and disk; returns whether it existed"""
+        with self._lock:
+            existed = self._entries.pop(key, None) is not None
+        if self.directory and os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+            existed = True
+            with self._lock:
+                if self._disk_entries is not None:
+                    self._disk_entries -= 1
+        return existed
+    
+    def stats(self) -> Dict[str, Any]:
+        """Size and configuration of the store"""
+        with self._lock:
+            return {
+                'cached_entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_entries': self._disk_entries,
+                'max_disk_entries': self.max_disk_entries,
+                'directory': self.directory
+            }
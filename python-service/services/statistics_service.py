@@ -2,15 +2,44 @@
 Advanced Statistics Service using Pandas and NumPy
 Implements descriptive statistics, correlation analysis, time series analysis, and distribution analysis
 """
+import os
 import pandas as pd
 import numpy as np
 from scipy import stats
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple, Union
+from .anomaly_detection import ANOMALY_METHODS, cusum_change_points, robust_z_scores, seasonal_scores
+from .distribution_fit import binned_kde, deterministic_sample, fit_log_normal, fit_power_law
+from .forecasting import pad_series, series_frame
+from .graph_kernels import top_k_indices
+from .rolling_state import RollingSeriesState
+from .state_store import StateStore, default_state_directory
+from .statistics_sketch import MomentSketch, StatisticsSketch, DEFAULT_COMPRESSION
+
+DEFAULT_STATE_DIR = default_state_directory('statistics')
+
+DEFAULT_SKETCH_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+
+ANOMALY_DIRECTIONS = ('both', 'up', 'down')
+
+# Normality tests and distribution fits run on a deterministic subsample of this size
+NORMALITY_SAMPLE_SIZE = 5000
+
+MAX_HISTOGRAM_BINS = 100
 
 class StatisticsService:
+    # Rolling-state batches up to this size are applied point by point (O(1) each) instead of vectorized
+    ROLLING_STREAM_BATCH = 16
+    
     def __init__(self):
         """Initialize statistics service"""
-        pass
+        # Named sketches (e.g. one per account, metric and day), persisted with joblib
+        self.state_store = StateStore(
+            directory=os.getenv('STATISTICS_STATE_DIR', DEFAULT_STATE_DIR) or None,
+            max_entries=int(os.getenv('STATISTICS_STATE_MAX_ENTRIES', 256)),
+            max_disk_entries=int(os.getenv('STATISTICS_STATE_MAX_FILES', 100000))
+        )
     
     def calculate_descriptive_stats(self, values: List[float]) -> Dict[str, Any]:
         """
@@ -85,7 +114,123 @@ class StatisticsService:
             'count': len(values)
         }
     
-    def calculate_correlation(self, variables: Dict[str, List[float]]) -> Dict[str, Any]:
+    def calculate_descriptive_stats_batch(self, series: Optional[Union[Dict[str, List[float]], List[List[float]]]] = None,
+                                          matrix: Optional[List[List[float]]] = None,
+                                          columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Descriptive statistics for many series at once. Series are stacked into one
+        NaN-padded matrix that is sorted once; quantiles are read from the sorted rows,
+        moments come from one centered pass and modes from run lengths of the sorted
+        values, all vectorized across series.
+        Args:
+            series: Ragged series as {name: [values]} or [[values]]
+            matrix: Columnar alternative: rows are observations, columns are series
+                (None or NaN for missing entries)
+            columns: Column names for matrix (default: column indices)
+        Returns:
+            {'results': {name: calculate_descriptive_stats fields}}. Missing and
+            non-numeric values are ignored; series without values get an error entry.
+        """
+        if matrix is not None:
+            table = pd.DataFrame(matrix).apply(pd.to_numeric, errors='coerce')
+            names = [str(name) for name in (columns or table.columns.tolist())]
+            if len(names) != table.shape[1]:
+                raise ValueError(f"{len(names)} column names given for {table.shape[1]} matrix columns")
+            arrays = [table[column].to_numpy(dtype=float) for column in table.columns]
+        elif isinstance(series, dict):
+            names = [str(name) for name in series]
+            arrays = self._numeric_arrays(list(series.values()))
+        elif series:
+            names = [str(i) for i in range(len(series))]
+            arrays = self._numeric_arrays(series)
+        else:
+            raise ValueError('series or matrix is required')
+        
+        arrays = [values[~np.isnan(values)] for values in arrays]
+        values, counts = pad_series(arrays)
+        results = {name: {'error': 'No values provided'} for name in names}
+        rows = np.flatnonzero(counts > 0)
+        if len(rows) == 0:
+            return {'results': results}
+        
+        # One sort per row; NaN padding sorts to the end
+        ordered = np.sort(values[rows], axis=1)
+        n = counts[rows]
+        quantiles = self._sorted_quantiles(ordered, n, np.array([0.25, 0.5, 0.75]))
+        minimum = ordered[:, 0]
+        maximum = np.take_along_axis(ordered, (n - 1)[:, None], axis=1)[:, 0]
+        
+        valid = ~np.isnan(ordered)
+        mean = np.where(valid, ordered, 0.0).sum(axis=1) / n
+        centered = np.where(valid, ordered - mean[:, None], 0.0)
+        squared = centered * centered
+        m2 = squared.sum(axis=1) / n
+        m3 = (squared * centered).sum(axis=1) / n
+        m4 = (squared * squared).sum(axis=1) / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Biased (population) estimators, as scipy.stats.skew/kurtosis by default
+            skewness = np.where(m2 > 0, m3 / m2 ** 1.5, np.nan)
+            kurtosis = np.where(m2 > 0, m4 / (m2 * m2) - 3.0, np.nan)
+        mode = self._sorted_modes(ordered, n)
+        
+        for i, row in enumerate(rows.tolist()):
+            q1, q2, q3 = quantiles[i].tolist()
+            results[names[row]] = {
+                'mean': float(mean[i]),
+                'median': q2,
+                'mode': float(mode[i]),
+                'std_dev': float(np.sqrt(m2[i])),
+                'variance': float(m2[i]),
+                'min': float(minimum[i]),
+                'max': float(maximum[i]),
+                'range': float(maximum[i] - minimum[i]),
+                'quartiles': {
+                    'q1': q1,
+                    'q2': q2,
+                    'q3': q3,
+                    'iqr': q3 - q1
+                },
+                'skewness': float(skewness[i]),
+                'kurtosis': float(kurtosis[i]),
+                'count': int(n[i])
+            }
+        return {'results': results}
+    
+    def _numeric_arrays(self, lists: List[List[Any]]) -> List[np.ndarray]:
+        """Float arrays of ragged lists, converted in one pass (non-numeric entries become NaN)"""
+        lengths = [len(values) for values in lists]
+        flat = [value for values in lists for value in values]
+        try:
+            flat = np.asarray(flat, dtype=float)  # None becomes NaN
+        except (TypeError, ValueError):
+            flat = pd.to_numeric(pd.Series(flat, dtype=object), errors='coerce').to_numpy(dtype=float)
+        return np.split(flat, np.cumsum(lengths)[:-1]) if lists else []
+    
+    def _sorted_quantiles(self, ordered: np.ndarray, counts: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Linearly interpolated quantiles (np.percentile's default) of sorted, NaN-padded rows"""
+        position = (counts[:, None] - 1) * q[None, :]
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, (counts - 1)[:, None])
+        fraction = position - below
+        lower = np.take_along_axis(ordered, below, axis=1)
+        upper = np.take_along_axis(ordered, above, axis=1)
+        return lower + (upper - lower) * fraction
+    
+    def _sorted_modes(self, ordered: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Most frequent value per sorted row (the smallest one on ties, like scipy.stats.mode)"""
+        valid = np.arange(ordered.shape[1]) < counts[:, None]
+        flat = ordered[valid]
+        row_of = np.repeat(np.arange(len(counts)), counts)
+        # Runs of equal values within a row
+        starts = np.flatnonzero(np.r_[True, (row_of[1:] != row_of[:-1]) | (flat[1:] != flat[:-1])])
+        lengths = np.diff(np.r_[starts, len(flat)])
+        run_rows = row_of[starts]
+        order = np.lexsort((starts, -lengths, run_rows))
+        first = order[np.r_[True, run_rows[order][1:] != run_rows[order][:-1]]]
+        return flat[starts[first]]
+    
+    def calculate_correlation(self, variables: Dict[str, List[float]], method: str = 'pearson',
+                              top_k: Optional[int] = None, include_matrix: bool = True) -> Dict[str, Any]:
         """
         Calculate correlation between variables
         Args:
@@ -94,44 +239,129 @@ class StatisticsService:
                 'var2': [values],
                 ...
             }
+            method: 'pearson' or 'spearman'
+            top_k: Only return the k strongest pairs (default: all pairs)
+            include_matrix: Include the full correlation matrix
         Returns:
             {
                 'correlation_matrix': {},
-                'correlations': []
+                'correlations': [],
+                'total_pairs': int
             }
+            Missing values (None/NaN) are handled pairwise: each pair uses the observations
+            where both variables are present. Pairs carry a two-sided p-value.
         """
         if not variables or len(variables) < 2:
             return {
                 'error': 'At least two variables required'
             }
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Unknown method '{method}'. Expected one of: {', '.join(CORRELATION_METHODS)}")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(variables)
-        
-        # Calculate correlation matrix
-        corr_matrix = df.corr()
-        
-        # Get pairwise correlations
-        correlations = []
         var_names = list(variables.keys())
+        lengths = {len(values) for values in variables.values()}
+        if len(lengths) > 1:
+            raise ValueError('All variables must have the same number of observations')
+        X = np.column_stack(self._numeric_arrays(list(variables.values())))
+        observed = ~np.isnan(X)
         
-        for i, var1 in enumerate(var_names):
-            for var2 in var_names[i+1:]:
-                corr_value = corr_matrix.loc[var1, var2]
-                correlations.append({
-                    'variable1': var1,
-                    'variable2': var2,
-                    'correlation': float(corr_value),
-                    'strength': self._correlation_strength(abs(corr_value))
-                })
+        if method == 'spearman':
+            corr, n = self._pairwise_spearman(X, observed)
+        else:
+            corr, n = self._pairwise_pearson(X, observed)
+        p_values = self._correlation_p_values(corr, n)
         
-        # Sort by absolute correlation
-        correlations.sort(key=lambda x: abs(x['correlation']), reverse=True)
+        # Pairs i < j ranked by |r| (ties keep pair order; undefined correlations last)
+        rows, cols = np.triu_indices(len(var_names), k=1)
+        pair_corr = corr[rows, cols]
+        strength = np.where(np.isnan(pair_corr), -np.inf, np.abs(pair_corr))
+        total_pairs = len(pair_corr)
+        top = top_k_indices(strength, total_pairs if top_k is None else top_k)
         
-        return {
-            'correlation_matrix': corr_matrix.to_dict(),
-            'correlations': correlations
+        correlations = [{
+            'variable1': var_names[i],
+            'variable2': var_names[j],
+            'correlation': r,
+            'strength': self._correlation_strength(abs(r)),
+            'p_value': p,
+            'n': count
+        } for i, j, r, p, count in zip(rows[top].tolist(), cols[top].tolist(), pair_corr[top].tolist(),
+                                       p_values[rows[top], cols[top]].tolist(), n[rows[top], cols[top]].tolist())]
+        
+        result = {
+            'correlations': correlations,
+            'method': method,
+            'total_pairs': total_pairs
         }
+        if include_matrix:
+            result['correlation_matrix'] = {
+                name: dict(zip(var_names, column)) for name, column in zip(var_names, corr.T.tolist())
+            }
+        return result
+    
+    def _pairwise_pearson(self, X: np.ndarray, observed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pearson correlation matrix of the columns of X over pairwise-complete rows,
+        computed with matrix products. Returns (correlations, pair counts).
+        """
+        mask = observed.astype(float)
+        n = mask.T @ mask
+        # Centering each column first keeps the sums of products well conditioned
+        counts = observed.sum(axis=0)
+        means = np.divide(np.nansum(X, axis=0), counts, out=np.zeros(X.shape[1]), where=counts > 0)
+        centered = np.where(observed, X - means, 0.0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if observed.all():
+                # Standardize once: the correlation matrix is a single product
+                scale = np.sqrt((centered * centered).sum(axis=0))
+                Z = centered / scale
+                corr = Z.T @ Z
+            else:
+                sum_x = centered.T @ mask  # [i, j]: sum of column i over rows where j is present
+                sum_xx = (centered * centered).T @ mask
+                sum_xy = centered.T @ centered
+                covariance = n * sum_xy - sum_x * sum_x.T
+                variance = n * sum_xx - sum_x * sum_x
+                corr = covariance / np.sqrt(variance * variance.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[n < 2] = np.nan
+        # Like pandas: self-correlation is 1 unless the variable is constant
+        diagonal = np.diag(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return corr, n.astype(np.int64)
+    
+    def _pairwise_spearman(self, X: np.ndarray, observed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Spearman correlation matrix over pairwise-complete rows, as DataFrame.corr.
+        Columns are ranked once and correlated with matrix products; pairs of columns
+        with different missing rows are re-ranked over the rows both have.
+        """
+        ranks = np.where(observed, pd.DataFrame(X).rank(method='average').to_numpy(), np.nan)
+        corr, n = self._pairwise_pearson(ranks, observed)
+        if observed.all():
+            return corr, n
+        
+        # Columns with the same missing rows share their ranks; only mixed pairs are re-ranked
+        _, pattern = np.unique(observed.T, axis=0, return_inverse=True)
+        pattern = pattern.ravel()
+        rows, cols = np.nonzero(np.triu(pattern[:, None] != pattern[None, :]))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            both = observed[:, i] & observed[:, j]
+            if both.sum() < 2:
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = np.corrcoef(stats.rankdata(X[both, i]), stats.rankdata(X[both, j]))[0, 1]
+            corr[i, j] = corr[j, i] = np.clip(r, -1.0, 1.0)
+        return corr, n
+    
+    def _correlation_p_values(self, corr: np.ndarray, n: np.ndarray) -> np.ndarray:
+        """Two-sided p-values of correlations from the t distribution with n - 2 df"""
+        df = n - 2.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_stat = corr * np.sqrt(df / np.maximum(1.0 - corr * corr, 0.0))
+            p_values = 2 * stats.t.sf(np.abs(t_stat), df)
+        return np.where(df > 0, p_values, np.nan)
     
     def _correlation_strength(self, abs_corr: float) -> str:
         """Determine correlation strength"""
@@ -213,16 +443,227 @@ class StatisticsService:
             'std_dev': float(np.std(values))
         }
     
-    def analyze_distribution(self, values: List[float]) -> Dict[str, Any]:
+    def analyze_time_series_batch(self, series: List[Dict[str, Any]],
+                                  lags: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        analyze_time_series for many series at once. Dates are parsed once and mapped
+        onto a shared date index; trend regressions, autocorrelations, volatility and
+        weekday profiles are computed with masked matrix operations over all series.
+        Args:
+            series: List of {'id': str, 'time_series': [{'date': str, 'value': float}]}
+            lags: Autocorrelation lags in observations (default: [1, 7])
+        Returns:
+            {'series': [{'id', ...analyze_time_series fields, 'autocorrelations': {lag: float}}],
+             'dates': int (size of the shared date index)}
+            Series with fewer than 3 points get an error entry.
+        """
+        lags = [1, 7] if lags is None else [int(lag) for lag in lags]
+        if any(lag < 1 for lag in lags):
+            raise ValueError('lags must be positive')
+        
+        ids = [entry.get('id', i) for i, entry in enumerate(series)]
+        frame = series_frame(series)
+        # Shared date index: every distinct date is converted to a weekday once
+        dates, date_codes = np.unique(frame['date'].to_numpy(), return_inverse=True)
+        weekday_of_date = pd.DatetimeIndex(dates).dayofweek.to_numpy()
+        
+        counts = np.bincount(frame['series'].to_numpy(), minlength=len(series))
+        splits = np.cumsum(counts)[:-1]
+        fitted = np.flatnonzero(counts >= 3)
+        results = [{'id': series_id, 'error': 'Insufficient data for time series analysis'} for series_id in ids]
+        if len(fitted) == 0:
+            return {'series': results, 'dates': len(dates)}
+        
+        series_values = np.split(frame['value'].to_numpy(dtype=float), splits)
+        series_weekdays = np.split(weekday_of_date[date_codes.ravel()].astype(float), splits)
+        values, n = pad_series([series_values[i] for i in fitted])
+        weekdays, _ = pad_series([series_weekdays[i] for i in fitted])
+        mask = np.arange(values.shape[1]) < n[:, None]
+        y = np.where(mask, values, 0.0)
+        
+        # Trend: regression on observation position, as stats.linregress
+        t = np.where(mask, np.arange(values.shape[1], dtype=float), 0.0)
+        t_centered = np.where(mask, t - (t.sum(axis=1) / n)[:, None], 0.0)
+        mean = y.sum(axis=1) / n
+        y_centered = np.where(mask, y - mean[:, None], 0.0)
+        sxx = (t_centered ** 2).sum(axis=1)
+        syy = (y_centered ** 2).sum(axis=1)
+        sxy = (t_centered * y_centered).sum(axis=1)
+        slope = sxy / sxx
+        intercept = mean - slope * (t.sum(axis=1) / n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(syy > 0, sxy / np.sqrt(sxx * syy), 0.0)
+        p_values = self._correlation_p_values(r, n)
+        
+        # Volatility: standard deviation of consecutive returns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(values, axis=1) / values[:, :-1]
+            return_mask = mask[:, 1:]
+            return_mean = np.where(return_mask, returns, 0.0).sum(axis=1) / (n - 1)
+            volatility = np.sqrt(np.where(return_mask, (returns - return_mean[:, None]) ** 2, 0.0).sum(axis=1) / (n - 1))
+        
+        autocorrelations = {lag: self._lagged_correlation(y_centered, mask, lag) for lag in lags}
+        lag_one = autocorrelations[1] if 1 in autocorrelations else self._lagged_correlation(y_centered, mask, 1)
+        
+        # Weekday profile: per-series sums and counts for each weekday
+        cells = (np.arange(len(fitted))[:, None] * 7 + np.where(mask, weekdays, 0).astype(np.int64))[mask]
+        weekday_sums = np.bincount(cells, weights=values[mask], minlength=7 * len(fitted)).reshape(-1, 7)
+        weekday_counts = np.bincount(cells, minlength=7 * len(fitted)).reshape(-1, 7)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            daily_avg = np.where(weekday_counts > 0, weekday_sums / weekday_counts, np.nan)
+            variation = np.nanstd(daily_avg, axis=1, ddof=1) / np.nanmean(daily_avg, axis=1)
+        
+        for row, i in enumerate(fitted.tolist()):
+            present = np.flatnonzero(weekday_counts[row] > 0)
+            seasonality = {'has_seasonality': False}
+            if n[row] > 7:
+                seasonality = {
+                    'has_seasonality': bool(variation[row] > 0.1),
+                    'daily_pattern': {int(day): float(daily_avg[row, day]) for day in present}
+                }
+            results[i] = {
+                'id': ids[i],
+                'trend': {
+                    'slope': float(slope[row]),
+                    'intercept': float(intercept[row]),
+                    'direction': 'increasing' if slope[row] > 0 else 'decreasing' if slope[row] < 0 else 'stable',
+                    'r_squared': float(r[row] ** 2),
+                    'p_value': float(p_values[row])
+                },
+                'seasonality': seasonality,
+                'autocorrelation': float(lag_one[row]),
+                'autocorrelations': {str(lag): float(values_[row]) for lag, values_ in autocorrelations.items()},
+                'volatility': float(volatility[row]),
+                'mean': float(mean[row]),
+                'std_dev': float(np.sqrt(syy[row] / n[row]))
+            }
+        return {'series': results, 'dates': len(dates)}
+    
+    def _lagged_correlation(self, centered: np.ndarray, mask: np.ndarray, lag: int) -> np.ndarray:
+        """Per-row Pearson correlation of x[t] and x[t + lag] (NaN when undefined)"""
+        if lag >= centered.shape[1]:
+            return np.full(centered.shape[0], np.nan)
+        pair_mask = mask[:, :-lag] & mask[:, lag:]
+        a = np.where(pair_mask, centered[:, :-lag], 0.0)
+        b = np.where(pair_mask, centered[:, lag:], 0.0)
+        count = pair_mask.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a_mean = a.sum(axis=1) / count
+            b_mean = b.sum(axis=1) / count
+            a = np.where(pair_mask, a - a_mean[:, None], 0.0)
+            b = np.where(pair_mask, b - b_mean[:, None], 0.0)
+            corr = (a * b).sum(axis=1) / np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+        return np.where(count >= 2, corr, np.nan)
+    
+    def detect_anomalies(self, series: List[Dict[str, Any]], methods: Optional[List[str]] = None,
+                         threshold: float = 3.5, season_length: int = 7, direction: str = 'both',
+                         cusum_drift: float = 0.5, cusum_threshold: float = 8.0,
+                         max_records: int = 1000) -> Dict[str, Any]:
+        """
+        Flag anomalous points of many series at once. All series are stacked into one
+        padded matrix and every method scores all of them with vectorized operations.
+        Args:
+            series: List of {'id': str, 'time_series': [{'date': str, 'value': float}]}
+            methods: Any of 'robust_z' (median/MAD), 'seasonal' (residuals after the
+                per-phase median profile) and 'change_point' (two-sided CUSUM, one record
+                per level shift, dated at its onset); default all
+            threshold: |score| above which robust_z/seasonal points are flagged
+            season_length: Observations per season for the seasonal method
+            direction: Deviations to flag: 'both', 'up' or 'down'
+            cusum_drift, cusum_threshold: CUSUM slack and alarm level in units of the series' noise
+            max_records: Largest number of records returned (highest |score| first)
+        Returns:
+            {'anomalies': [{'series_id', 'date', 'value', 'score', 'baseline', 'method', 'direction'}],
+             'counts': {series_id: int}, 'total': int, 'truncated': bool}
+        """
+        methods = list(ANOMALY_METHODS) if methods is None else list(methods)
+        unknown = [method for method in methods if method not in ANOMALY_METHODS]
+        if unknown:
+            raise ValueError(f"Unknown anomaly methods: {', '.join(map(str, unknown))}")
+        if direction not in ANOMALY_DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(ANOMALY_DIRECTIONS)}")
+        if season_length < 1:
+            raise ValueError('season_length must be positive')
+        
+        ids = [entry.get('id', i) for i, entry in enumerate(series)]
+        frame = series_frame(series)
+        dates, date_codes = np.unique(frame['date'].to_numpy(), return_inverse=True)
+        date_labels = pd.DatetimeIndex(dates).strftime('%Y-%m-%dT%H:%M:%S').to_numpy()
+        counts = np.bincount(frame['series'].to_numpy(), minlength=len(series))
+        splits = np.cumsum(counts)[:-1]
+        values, _ = pad_series(np.split(frame['value'].to_numpy(dtype=float), splits))
+        codes, _ = pad_series(np.split(date_codes.ravel().astype(float), splits))
+        
+        scored = []
+        if 'robust_z' in methods:
+            result = robust_z_scores(values)
+            with np.errstate(invalid='ignore'):
+                scored.append(('robust_z', self._is_anomalous(result['score'], threshold, direction), result))
+        if 'seasonal' in methods:
+            result = seasonal_scores(values, season_length)
+            with np.errstate(invalid='ignore'):
+                scored.append(('seasonal', self._is_anomalous(result['score'], threshold, direction), result))
+        if 'change_point' in methods:
+            result = cusum_change_points(values, cusum_drift, cusum_threshold)
+            scored.append(('change_point', result['alarm'] & self._is_anomalous(result['score'], 0.0, direction), result))
+        
+        # Flat arrays of (series row, column, score, baseline, method) over all methods
+        rows, columns, scores, baselines, names = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], \
+            [np.zeros(0)], [np.zeros(0)], [np.zeros(0, dtype=object)]
+        for name, flagged, result in scored:
+            row, column = np.nonzero(flagged)
+            rows.append(row)
+            columns.append(column)
+            scores.append(result['score'][row, column])
+            baselines.append(result['baseline'][row, column])
+            names.append(np.full(len(row), name, dtype=object))
+        rows, columns, scores, baselines, names = (np.concatenate(parts) for parts in (rows, columns, scores, baselines, names))
+        per_series = np.bincount(rows, minlength=len(series))
+        keep = top_k_indices(np.abs(scores), max_records)
+        
+        anomalies = [{
+            'series_id': ids[row],
+            'date': date_labels[int(code)],
+            'value': value,
+            'score': score,
+            'baseline': baseline,
+            'method': name,
+            'direction': 'up' if score > 0 else 'down'
+        } for row, code, value, score, baseline, name in zip(
+            rows[keep].tolist(), codes[rows[keep], columns[keep]].tolist(), values[rows[keep], columns[keep]].tolist(),
+            scores[keep].tolist(), baselines[keep].tolist(), names[keep].tolist())]
+        return {
+            'anomalies': anomalies,
+            'counts': {ids[i]: int(per_series[i]) for i in np.flatnonzero(per_series).tolist()},
+            'total': int(len(scores)),
+            'truncated': bool(len(scores) > max_records)
+        }
+    
+    def _is_anomalous(self, score: Union[float, np.ndarray], threshold: float,
+                      direction: str) -> Union[bool, np.ndarray]:
+        """Whether scores exceed the threshold in the requested direction"""
+        if direction == 'up':
+            return score > threshold
+        if direction == 'down':
+            return score < -threshold
+        return np.abs(score) > threshold
+    
+    def analyze_distribution(self, values: List[float], bins: Optional[int] = None,
+                             include_fits: bool = True) -> Dict[str, Any]:
         """
         Analyze distribution of data
         Args:
-            values: List of numeric values
+            values: List of numeric values (non-finite values are ignored)
+            bins: Histogram bins (default: Freedman-Diaconis, at most MAX_HISTOGRAM_BINS)
+            include_fits: Also fit log-normal and power-law models
         Returns:
             {
                 'distribution_type': str,
                 'normality_test': {},
-                'percentiles': {}
+                'percentiles': {},
+                'histogram': {'edges', 'counts'},
+                'density': {'x', 'y', 'bandwidth'},
+                'fits': {'log_normal': {}, 'power_law': {}}
             }
         """
         if not values or len(values) < 3:
@@ -230,31 +671,29 @@ class StatisticsService:
                 'error': 'Insufficient data for distribution analysis'
             }
         
-        arr = np.array(values)
+        arr = np.asarray(values, dtype=float)
+        arr = arr[np.isfinite(arr)]
+        if len(arr) < 3:
+            return {
+                'error': 'Insufficient data for distribution analysis'
+            }
         
-        # Normality test (Shapiro-Wilk for small samples, otherwise Kolmogorov-Smirnov)
-        if len(arr) <= 5000:
-            stat, p_value = stats.shapiro(arr)
-            test_name = 'shapiro_wilk'
-        else:
-            stat, p_value = stats.kstest(arr, 'norm', args=(np.mean(arr), np.std(arr)))
-            test_name = 'kolmogorov_smirnov'
-        
-        is_normal = p_value > 0.05
-        
-        # Percentiles
-        percentiles = {
-            'p5': float(np.percentile(arr, 5)),
-            'p10': float(np.percentile(arr, 10)),
-            'p25': float(np.percentile(arr, 25)),
-            'p50': float(np.percentile(arr, 50)),
-            'p75': float(np.percentile(arr, 75)),
-            'p90': float(np.percentile(arr, 90)),
-            'p95': float(np.percentile(arr, 95))
-        }
+        # Shapiro-Wilk on a deterministic subsample, so large inputs cost the same
+        sample = deterministic_sample(arr, NORMALITY_SAMPLE_SIZE)
+        stat, p_value = stats.shapiro(sample)
+        is_normal = bool(p_value > 0.05)
+        
+        # One partition for all percentiles
+        percentiles = {f"p{level}": value for level, value in
+                       zip(DEFAULT_SKETCH_PERCENTILES, np.percentile(arr, DEFAULT_SKETCH_PERCENTILES).tolist())}
+        
+        # Skewness and kurtosis from one pass over the central moments
+        moments = MomentSketch()
+        moments.update(arr)
+        moment_stats = moments.statistics()
+        skewness = moment_stats['skewness'] or 0.0
         
         # Determine distribution type based on skewness
-        skewness = stats.skew(arr)
         if abs(skewness) < 0.5 and is_normal:
             dist_type = 'normal'
         elif skewness > 0.5:
@@ -264,16 +703,231 @@ class StatisticsService:
         else:
             dist_type = 'approximately_normal'
         
-        return {
+        n = len(arr)
+        iqr = percentiles['p75'] - percentiles['p25']
+        if bins is None:
+            # Freedman-Diaconis bin width, Sturges when the IQR is zero
+            width = 2 * iqr / n ** (1 / 3)
+            value_range = moment_stats['max'] - moment_stats['min']
+            bins = int(np.ceil(value_range / width)) if width > 0 else int(np.ceil(np.log2(n))) + 1
+            bins = int(np.clip(bins, 1, MAX_HISTOGRAM_BINS))
+        counts, edges = np.histogram(arr, bins=bins, range=(moment_stats['min'], moment_stats['max']))
+        
+        # Silverman's rule of thumb
+        spread = min(moment_stats['std_dev'], iqr / 1.34) if iqr > 0 else moment_stats['std_dev']
+        bandwidth = 0.9 * spread * n ** -0.2
+        
+        result = {
             'distribution_type': dist_type,
             'normality_test': {
-                'test': test_name,
+                'test': 'shapiro_wilk',
                 'statistic': float(stat),
                 'p_value': float(p_value),
-                'is_normal': is_normal
+                'is_normal': is_normal,
+                'sample_size': len(sample)
             },
             'percentiles': percentiles,
-            'skewness': float(skewness),
-            'kurtosis': float(stats.kurtosis(arr))
+            'skewness': moment_stats['skewness'],
+            'kurtosis': moment_stats['kurtosis'],
+            'count': n,
+            'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()},
+            'density': binned_kde(arr, bandwidth) if bandwidth > 0 else None
         }
-
+        if include_fits:
+            result['fits'] = {
+                'log_normal': fit_log_normal(sample),
+                'power_law': fit_power_law(sample)
+            }
+        return result
+    
+    def _sketch_key(self, sketch_id: str) -> str:
+        return f"sketch:{sketch_id}"
+    
+    def _load_sketches(self, sketch_ids: Optional[List[str]],
+                       sketches: Optional[List[Dict[str, Any]]]) -> List[StatisticsSketch]:
+        """Stored sketches by id plus serialized sketches from the request"""
+        loaded = [StatisticsSketch.from_dict(state) for state in sketches or []]
+        for sketch_id in sketch_ids or []:
+            sketch = self.state_store.get(self._sketch_key(sketch_id))
+            if sketch is None:
+                raise ValueError(f"Unknown sketch '{sketch_id}'")
+            loaded.append(sketch)
+        return loaded
+    
+    def update_sketch(self, values: List[float], sketch_id: Optional[str] = None,
+                      sketch: Optional[Dict[str, Any]] = None,
+                      compression: float = DEFAULT_COMPRESSION) -> Dict[str, Any]:
+        """
+        Add a chunk of values to a statistics sketch
+        Args:
+            values: Raw values (non-finite values are skipped)
+            sketch_id: Stored sketch to update (created if missing), e.g. 'account:metric:2024-06-01'
+            sketch: Without sketch_id, a serialized sketch to continue from (stateless mode)
+            compression: t-digest compression of a new sketch (more centroids, more accuracy)
+        Returns:
+            {'added': int, 'count': int, 'sketch': {} (stateless mode only)}
+        """
+        if compression < 20:
+            raise ValueError('compression must be at least 20')
+        if sketch_id is None:
+            current = StatisticsSketch.from_dict(sketch) if sketch else StatisticsSketch(compression)
+            added = current.update(values)
+            return {'added': added, 'count': current.moments.count, 'sketch': current.to_dict()}
+        
+        key = self._sketch_key(sketch_id)
+        with self.state_store.key_lock(key):
+            current = self.state_store.get(key) or StatisticsSketch(compression)
+            added = current.update(values)
+            self.state_store.put(key, current)
+        return {'sketch_id': sketch_id, 'added': added, 'count': current.moments.count}
+    
+    def merge_sketches(self, sketch_id: str, source_ids: Optional[List[str]] = None,
+                       sketches: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Merge stored and/or serialized sketches into a stored sketch (e.g. roll daily
+        sketches up into a monthly one, or combine accounts)
+        Returns:
+            {'sketch_id': str, 'merged': int, 'count': int}
+        """
+        sources = self._load_sketches(source_ids, sketches)
+        if not sources:
+            raise ValueError('source_ids or sketches are required')
+        
+        key = self._sketch_key(sketch_id)
+        with self.state_store.key_lock(key):
+            target = self.state_store.get(key) or StatisticsSketch(sources[0].digest.compression)
+            target.merge(*sources)
+            self.state_store.put(key, target)
+        return {'sketch_id': sketch_id, 'merged': len(sources), 'count': target.moments.count}
+    
+    def query_sketches(self, sketch_ids: Optional[List[str]] = None,
+                       sketches: Optional[List[Dict[str, Any]]] = None,
+                       percentiles: Optional[List[float]] = None,
+                       include_sketch: bool = False) -> Dict[str, Any]:
+        """
+        Statistics of the union of several sketches, without raw values
+        Args:
+            sketch_ids: Stored sketches to combine (e.g. 365 daily sketches)
+            sketches: Serialized sketches to combine
+            percentiles: Percentiles in [0, 100] (default: p5, p10, p25, p50, p75, p90, p95)
+            include_sketch: Include the combined sketch, serialized
+        Returns:
+            {'count', 'mean', 'variance', 'std_dev', 'sample_variance', 'skewness',
+             'kurtosis', 'min', 'max', 'percentiles': {'p50': float, ...}, 'sketches': int}
+            Moments, min and max are exact; percentiles are t-digest estimates.
+        """
+        percentiles = DEFAULT_SKETCH_PERCENTILES if percentiles is None else percentiles
+        if any(not 0 <= p <= 100 for p in percentiles):
+            raise ValueError('percentiles must be between 0 and 100')
+        sources = self._load_sketches(sketch_ids, sketches)
+        if not sources:
+            raise ValueError('sketch_ids or sketches are required')
+        
+        combined = StatisticsSketch(sources[0].digest.compression)
+        combined.merge(*sources)
+        result = combined.statistics(percentiles)
+        result['sketches'] = len(sources)
+        if include_sketch:
+            result['sketch'] = combined.to_dict()
+        return result
+    
+    def _rolling_key(self, series_id: str) -> str:
+        return f"rolling:{series_id}"
+    
+    def ingest_rolling(self, series_id: str, points: List[Any], window: Optional[int] = None,
+                       ewma_spans: Optional[List[int]] = None, season_lag: Optional[int] = None,
+                       return_features: bool = False, anomaly_threshold: Optional[float] = None,
+                       direction: str = 'both', min_history: int = 10) -> Dict[str, Any]:
+        """
+        Append points to a series' rolling state (moving average/std, EWMA, seasonal delta)
+        Args:
+            series_id: Series to update (state is created on first use)
+            points: Values or {'value': float, 'timestamp': str}; points not newer than
+                the last ingested timestamp are skipped
+            window, ewma_spans, season_lag: Configuration of a new state
+                (defaults 7, [7, 28], 7); must match an existing state when given
+            return_features: Also return the features after every ingested point (not while scoring)
+            anomaly_threshold: When given, every point is scored against the slowest EWMA
+                before it is added (O(1) per point) and flagged when |z| exceeds the threshold
+            direction: Deviations to flag: 'both', 'up' or 'down'
+            min_history: Points the state must hold before new points are scored
+        Returns:
+            {'series_id', 'ingested', 'skipped', 'state': snapshot, 'features': {name: [float]},
+             'anomalies': [{'timestamp', 'value', 'score', 'baseline', 'method', 'direction'}]}
+        """
+        if direction not in ANOMALY_DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(ANOMALY_DIRECTIONS)}")
+        records = [point if isinstance(point, dict) else {'value': point} for point in points]
+        values = self._numeric_arrays([[record.get('value') for record in records]])[0]
+        timestamps = pd.to_datetime(pd.Series([record.get('timestamp', record.get('date')) for record in records],
+                                              dtype=object), utc=True, errors='coerce', format='mixed')
+        times = ((timestamps - pd.Timestamp(0, tz='UTC')).dt.total_seconds()).to_numpy(dtype=float)
+        # Points without a timestamp keep their position ahead of timestamped ones
+        order = np.argsort(np.nan_to_num(times, nan=-np.inf), kind='stable')
+        values, times = values[order], times[order]
+        
+        key = self._rolling_key(series_id)
+        with self.state_store.key_lock(key):
+            state = self.state_store.get(key)
+            requested = {'window': window, 'ewma_spans': ewma_spans, 'season_lag': season_lag}
+            if state is None:
+                state = RollingSeriesState(**{name: value for name, value in requested.items() if value is not None})
+            elif any(value is not None and value != state.config()[name] for name, value in requested.items()):
+                raise ValueError(f"Series '{series_id}' uses {state.config()}")
+            
+            valid = ~np.isnan(values)
+            if state.last_timestamp is not None:
+                # Re-delivered and late points are dropped
+                valid &= ~(times <= state.last_timestamp)
+            values, times = values[valid], times[valid]
+            last_time = float(np.nanmax(times)) if len(times) and not np.isnan(times).all() else None
+            
+            features, anomalies = {}, []
+            if anomaly_threshold is not None:
+                for value, timestamp in zip(values.tolist(), times.tolist()):
+                    score, baseline = state.score(value) if state.count >= min_history else (None, None)
+                    if score is not None and self._is_anomalous(score, anomaly_threshold, direction):
+                        anomalies.append({
+                            'timestamp': None if np.isnan(timestamp) else pd.Timestamp(timestamp, unit='s', tz='UTC').isoformat(),
+                            'value': value,
+                            'score': score,
+                            'baseline': baseline,
+                            'method': 'ewma_z',
+                            'direction': 'up' if score > 0 else 'down'
+                        })
+                    state.update(value, None if np.isnan(timestamp) else timestamp)
+            elif return_features or len(values) > self.ROLLING_STREAM_BATCH:
+                features = state.extend(values, last_time)
+            else:
+                for value, timestamp in zip(values.tolist(), times.tolist()):
+                    state.update(value, None if np.isnan(timestamp) else timestamp)
+            if len(values):
+                self.state_store.put(key, state)
+        
+        result = {
+            'series_id': series_id,
+            'ingested': int(len(values)),
+            'skipped': int(len(records) - len(values)),
+            'state': state.snapshot()
+        }
+        if return_features and anomaly_threshold is None:
+            result['features'] = {name: [None if np.isnan(value) else value for value in array.tolist()]
+                                  for name, array in features.items()}
+        if anomaly_threshold is not None:
+            result['anomalies'] = anomalies
+        return result
+    
+    def query_rolling(self, series_ids: List[str]) -> Dict[str, Any]:
+        """
+        Current rolling features of several series
+        Returns:
+            {'series': {series_id: snapshot}, 'missing': [series_id]}
+        """
+        snapshots, missing = {}, []
+        for series_id in series_ids:
+            state = self.state_store.get(self._rolling_key(series_id))
+            if state is None:
+                missing.append(series_id)
+            else:
+                snapshots[series_id] = state.snapshot()
+        return {'series': snapshots, 'missing': missing}
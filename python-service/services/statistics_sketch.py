@@ -0,0 +1,238 @@
+"""
+Mergeable Statistics Sketches
+Fixed-size summaries of a value stream: exact moments (count, mean, variance,
+skewness, kurtosis, min, max) combined with the Chan/Pébay pairwise formulas, and
+a merging t-digest for quantiles. Sketches are built from chunks, merged across
+time buckets or accounts, and serialized as plain JSON
+"""
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+DEFAULT_COMPRESSION = 200
+
+
+class MomentSketch:
+    """Count, mean, central moment sums (M2-M4), min and max of a stream"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+    
+    def update(self, values: np.ndarray):
+        """Add a chunk: its moments are computed in one vectorized pass and merged in"""
+        if len(values) == 0:
+            return
+        chunk = MomentSketch()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        centered = values - chunk.mean
+        squared = centered * centered
+        chunk.m2 = float(squared.sum())
+        chunk.m3 = float((squared * centered).sum())
+        chunk.m4 = float((squared * squared).sum())
+        chunk.minimum = float(values.min())
+        chunk.maximum = float(values.max())
+        self.merge(chunk)
+    
+    def merge(self, other: 'MomentSketch'):
+        """Combine with another sketch (Chan et al. / Pébay pairwise update)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        na, nb = float(self.count), float(other.count)
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+        m3 = (self.m3 + other.m3 + delta * delta_n * delta_n * na * nb * (na - nb)
+              + 3 * delta_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4
+              + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * delta_n * delta_n * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * delta_n * (na * other.m3 - nb * self.m3))
+        self.mean += delta_n * nb
+        self.count += other.count
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+    
+    def statistics(self) -> Dict[str, Optional[float]]:
+        """Population moments, matching np.var and scipy.stats.skew/kurtosis defaults"""
+        if self.count == 0:
+            return {'count': 0}
+        n = self.count
+        variance = self.m2 / n
+        has_spread = self.m2 > 0
+        return {
+            'count': n,
+            'mean': self.mean,
+            'variance': variance,
+            'std_dev': float(np.sqrt(variance)),
+            'sample_variance': self.m2 / (n - 1) if n > 1 else None,
+            'skewness': float(np.sqrt(n) * self.m3 / self.m2 ** 1.5) if has_spread else None,
+            'kurtosis': float(n * self.m4 / (self.m2 * self.m2) - 3.0) if has_spread else None,
+            'min': self.minimum,
+            'max': self.maximum
+        }
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) with the arcsine scale function: centroids are
+    small near the tails and large near the median, so extreme quantiles stay
+    accurate with about `compression` centroids. Incoming values are buffered and
+    compressed together with the centroids by one sort and a bincount.
+    """
+    
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = float(compression)
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+    
+    @property
+    def total_weight(self) -> float:
+        return float(self.weights.sum()) + self._buffered
+    
+    def update(self, values: np.ndarray):
+        """Add a chunk of values (compressed once enough values are buffered)"""
+        if len(values) == 0:
+            return
+        self._buffer.append(np.asarray(values, dtype=float))
+        self._buffered += len(values)
+        if self._buffered >= 10 * self.compression:
+            self._compress()
+    
+    def merge(self, *others: 'TDigest'):
+        """Absorb the centroids of other digests (one compression for all of them)"""
+        if not others:
+            return
+        for other in others:
+            other._compress()
+        self._compress(np.concatenate([other.means for other in others]),
+                       np.concatenate([other.weights for other in others]))
+    
+    def _compress(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None):
+        buffered = np.concatenate(self._buffer) if self._buffer else np.zeros(0)
+        means = np.concatenate([self.means, buffered] + ([means] if means is not None else []))
+        weights = np.concatenate([self.weights, np.ones(len(buffered))] + ([weights] if weights is not None else []))
+        self._buffer, self._buffered = [], 0
+        if len(means) == 0:
+            return
+        
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        cumulative = np.cumsum(weights)
+        # Each centroid spans at most one unit of k(q) = compression / (2 pi) * asin(2q - 1)
+        center = np.clip((cumulative - weights / 2) / total, 0.0, 1.0)
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * center - 1)
+        group = np.floor(k).astype(np.int64)
+        # Groups are contiguous because k is monotonic in the sorted order
+        group = np.r_[0, np.cumsum(group[1:] != group[:-1])]
+        merged_weights = np.bincount(group, weights=weights)
+        self.means = np.bincount(group, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+    
+    def quantiles(self, q: np.ndarray, minimum: float, maximum: float) -> np.ndarray:
+        """Quantiles (q in [0, 1]) by interpolating between centroid centers"""
+        self._compress()
+        if len(self.means) == 0:
+            return np.full(len(q), np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Centroids of weight one are exact values; the extremes anchor the ends
+        positions = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[minimum], self.means, [maximum]])
+        return np.interp(np.asarray(q) * total, positions, values)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'TDigest':
+        digest = cls(state.get('compression', DEFAULT_COMPRESSION))
+        digest.means = np.asarray(state.get('means', []), dtype=float)
+        digest.weights = np.asarray(state.get('weights', []), dtype=float)
+        if digest.means.shape != digest.weights.shape:
+            raise ValueError('t-digest means and weights must have the same length')
+        return digest
+
+
+class StatisticsSketch:
+    """Moments plus quantile digest of one metric stream"""
+    
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.moments = MomentSketch()
+        self.digest = TDigest(compression)
+    
+    def update(self, values: List[Any]) -> int:
+        """Add a chunk of raw values; non-finite values are skipped. Returns values added."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        self.moments.update(values)
+        self.digest.update(values)
+        return len(values)
+    
+    def merge(self, *others: 'StatisticsSketch'):
+        """Combine with other sketches (e.g. other days or accounts)"""
+        for other in others:
+            self.moments.merge(other.moments)
+        self.digest.merge(*(other.digest for other in others))
+    
+    def statistics(self, percentiles: List[float]) -> Dict[str, Any]:
+        """Moments, min/max and the requested percentiles ({'p50': ...})"""
+        result = self.moments.statistics()
+        if self.moments.count:
+            values = self.digest.quantiles(np.asarray(percentiles, dtype=float) / 100,
+                                           self.moments.minimum, self.moments.maximum)
+            result['percentiles'] = {f"p{p:g}": float(v) for p, v in zip(percentiles, values.tolist())}
+            result['centroids'] = len(self.digest.means)
+        return result
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state"""
+        moments = self.moments
+        return {
+            'moments': {
+                'count': moments.count,
+                'mean': moments.mean,
+                'm2': moments.m2,
+                'm3': moments.m3,
+                'm4': moments.m4,
+                'min': moments.minimum if moments.count else None,
+                'max': moments.maximum if moments.count else None
+            },
+            'digest': self.digest.to_dict()
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'StatisticsSketch':
+        """Rebuild a sketch from to_dict() output"""
+        sketch = cls()
+        sketch.digest = TDigest.from_dict(state.get('digest', {}))
+        moments = state.get('moments', {})
+        sketch.moments.count = int(moments.get('count', 0))
+        if sketch.moments.count:
+            sketch.moments.mean = float(moments['mean'])
+            sketch.moments.m2 = float(moments['m2'])
+            sketch.moments.m3 = float(moments['m3'])
+            sketch.moments.m4 = float(moments['m4'])
+            sketch.moments.minimum = float(moments['min'])
+            sketch.moments.maximum = float(moments['max'])
+        if abs(sketch.digest.weights.sum() - sketch.moments.count) > 1e-6 * max(sketch.moments.count, 1):
+            raise ValueError('Sketch moments and digest disagree on the number of values')
+        return sketch
@@ -0,0 +1,17 @@
+"""
+Shared fixtures for the Python service tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def state_dirs(tmp_path, monkeypatch):
+    """Keep persisted models and statistics state out of the source tree"""
+    monkeypatch.setenv('MODEL_REGISTRY_DIR', str(tmp_path / 'models'))
+    monkeypatch.setenv('STATISTICS_STATE_DIR', str(tmp_path / 'state'))
+    return tmp_path
@@ -0,0 +1,57 @@
+"""
+Tests for the vectorized anomaly detectors
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.anomaly_detection import cusum_change_points
+from services.statistics_service import StatisticsService
+
+
+def noisy_series(length: int = 60, seed: int = 0) -> np.ndarray:
+    return 100 + np.random.default_rng(seed).normal(0, 2, length)
+
+
+@pytest.mark.parametrize('step', [15, 30, 45])
+def test_cusum_dates_a_step_at_its_onset(step):
+    values = noisy_series()
+    values[step:] += 20
+    result = cusum_change_points(values[None, :])
+    
+    assert np.flatnonzero(result['alarm'][0]).tolist() == [step]
+    assert result['score'][0, step] > 0
+    assert result['baseline'][0, step] == pytest.approx(100, abs=2)
+
+
+def test_cusum_detects_downward_and_repeated_shifts():
+    down = noisy_series(seed=1)
+    down[30:] -= 15
+    up_then_down = noisy_series(seed=2)
+    up_then_down[20:] += 20
+    up_then_down[40:] -= 20
+    result = cusum_change_points(np.vstack([down, up_then_down]))
+    
+    assert np.flatnonzero(result['alarm'][0]).tolist() == [30]
+    assert result['score'][0, 30] < 0
+    assert np.flatnonzero(result['alarm'][1]).tolist() == [20, 40]
+    assert np.sign(result['score'][1, [20, 40]]).tolist() == [1, -1]
+
+
+def test_cusum_ignores_single_outliers_and_padding():
+    spike = noisy_series(seed=3)
+    spike[20] += 60
+    short = np.concatenate([noisy_series(25, seed=4), np.full(35, np.nan)])
+    result = cusum_change_points(np.vstack([spike, short]))
+    assert not result['alarm'].any()
+
+
+def test_detect_anomalies_reports_one_change_point_per_shift():
+    values = noisy_series(seed=5)
+    values[30:] += 20
+    dates = pd.date_range('2024-01-01', periods=len(values))
+    series = [{'id': 'a', 'time_series': [{'date': str(date.date()), 'value': float(value)}
+                                          for date, value in zip(dates, values)]}]
+    
+    result = StatisticsService().detect_anomalies(series, methods=['change_point'])
+    assert [(record['date'][:10], record['direction']) for record in result['anomalies']] == [('2024-01-31', 'up')]
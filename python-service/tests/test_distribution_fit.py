@@ -0,0 +1,58 @@
+"""
+Tests for the distribution fitting helpers
+"""
+import numpy as np
+import pytest
+from scipy import stats
+
+from services.distribution_fit import binned_kde, deterministic_sample, fit_log_normal, fit_power_law
+
+
+def test_log_normal_fit_recovers_its_parameters():
+    sample = np.random.default_rng(8).lognormal(mean=2.0, sigma=0.5, size=20000)
+    fit = fit_log_normal(np.concatenate([sample, [0.0, -1.0]]))
+    
+    assert fit['mu'] == pytest.approx(2.0, abs=0.02)
+    assert fit['sigma'] == pytest.approx(0.5, abs=0.01)
+    assert fit['p_value'] > 0.01
+    assert fit['positive_fraction'] == pytest.approx(20000 / 20002)
+    assert fit_log_normal(np.array([1.0, 1.0, 1.0])) is None
+
+
+def test_power_law_fit_recovers_alpha_and_xmin():
+    rng = np.random.default_rng(9)
+    alpha, xmin = 2.5, 10.0
+    tail = xmin * (1 - rng.random(5000)) ** (-1 / (alpha - 1))
+    body = rng.uniform(1, xmin, 5000)
+    fit = fit_power_law(np.concatenate([body, tail]))
+    
+    assert fit['alpha'] == pytest.approx(alpha, abs=0.1)
+    assert fit['xmin'] == pytest.approx(xmin, rel=0.2)
+    assert fit['tail_fraction'] == pytest.approx(0.5, abs=0.1)
+    assert fit['p_value'] > 0.01
+    assert fit_power_law(tail[:10]) is None
+
+
+def test_power_law_fit_rejects_an_exponential_tail():
+    sample = np.random.default_rng(10).exponential(1.0, 5000)
+    fit = fit_power_law(sample)
+    # At most the far end of an exponential tail passes for a (steep) power law
+    assert fit is None or (fit['tail_fraction'] < 0.1 and fit['alpha'] > 3)
+
+
+def test_binned_kde_is_a_density_close_to_scipy():
+    values = np.random.default_rng(11).normal(0, 1, 5000)
+    bandwidth = 0.3
+    kde = binned_kde(values, bandwidth, grid_size=512)
+    x, y = np.array(kde['x']), np.array(kde['y'])
+    
+    assert (y * (x[1] - x[0])).sum() == pytest.approx(1.0, abs=1e-6)
+    exact = stats.gaussian_kde(values, bw_method=bandwidth / values.std(ddof=1))(x)
+    assert np.abs(y - exact).max() < 0.01
+
+
+def test_deterministic_sample_is_reproducible():
+    values = np.arange(1000.0)
+    assert np.array_equal(deterministic_sample(values, 100), deterministic_sample(values, 100))
+    assert len(np.unique(deterministic_sample(values, 100))) == 100
+    assert deterministic_sample(values, 5000) is values
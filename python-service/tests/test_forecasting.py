@@ -0,0 +1,69 @@
+"""
+Tests for the vectorized forecasting helpers and forecast_trends_batch
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.forecasting import holt_winters_forecast, pad_series
+from services.predictive_modeling_service import PredictiveModelingService
+
+
+def daily_series(values, start: str = '2024-01-01'):
+    dates = pd.date_range(start, periods=len(values), freq='D').strftime('%Y-%m-%d')
+    return [{'date': date, 'value': float(value)} for date, value in zip(dates, values)]
+
+
+def test_batch_matches_forecast_trends_per_series():
+    rng = np.random.default_rng(0)
+    series = []
+    for i, length in enumerate([3, 10, 30, 45]):
+        points = daily_series(100 + (i - 1.5) * np.arange(length) + rng.normal(0, 5, length), start=f"2024-0{i + 1}-01")
+        rng.shuffle(points)
+        series.append({'id': f"s{i}", 'time_series': points})
+    series.append({'id': 'flat', 'time_series': daily_series([5.0] * 8)})
+    
+    service = PredictiveModelingService()
+    batch = service.forecast_trends_batch(series, forecast_periods=5)
+    
+    assert [result['id'] for result in batch['series']] == [entry['id'] for entry in series]
+    for entry, result in zip(series, batch['series']):
+        single = service.forecast_trends(entry['time_series'], forecast_periods=5)
+        assert result['trend'] == single['trend']
+        assert result['trend_strength'] == pytest.approx(single['trend_strength'], abs=1e-9)
+        assert result['slope'] == pytest.approx(single['slope'], abs=1e-9)
+        assert result['dates'] == [point['date'] for point in single['forecast']]
+        np.testing.assert_allclose(result['linear']['forecast'], [point['value'] for point in single['forecast']])
+        assert np.all(np.array(result['linear']['lower']) <= result['linear']['forecast'])
+        assert np.all(np.array(result['linear']['upper']) >= result['linear']['forecast'])
+
+
+def test_short_series_are_insufficient_data():
+    service = PredictiveModelingService()
+    series = [
+        {'id': 'empty', 'time_series': []},
+        {'id': 'one', 'time_series': daily_series([1])},
+        {'id': 'two', 'time_series': daily_series([1, 2])},
+        {'id': 'missing'},
+        {'id': 'ok', 'time_series': daily_series([1, 2, 3])}
+    ]
+    results = service.forecast_trends_batch(series)['series']
+    
+    for entry, result in zip(series, results):
+        assert result['trend'] == service.forecast_trends(entry.get('time_series'))['trend']
+    assert [result['trend'] for result in results] == ['insufficient_data'] * 4 + ['increasing']
+    assert 'linear' not in results[0] and 'holt_winters' in results[-1]
+    
+    only_short = service.forecast_trends_batch(series[:3])['series']
+    assert all(result == {'id': entry['id'], 'trend': 'insufficient_data', 'trend_strength': 0.0}
+               for entry, result in zip(series, only_short))
+
+
+def test_holt_winters_continues_an_exact_seasonal_pattern():
+    pattern = np.array([10.0, 12, 15, 11, 9, 20, 25])
+    values, lengths = pad_series([np.tile(pattern, 4), np.tile(pattern, 3)[:10]])
+    result = holt_winters_forecast(values, lengths, horizon=7, season_length=7)
+    
+    assert result['seasonal'].tolist() == [True, False]
+    np.testing.assert_allclose(result['forecast'][0], pattern, atol=1e-9)
+    assert result['rmse'][0] == pytest.approx(0.0, abs=1e-9)
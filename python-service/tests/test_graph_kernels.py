@@ -0,0 +1,103 @@
+"""
+Tests for the CSR graph kernels against networkx
+"""
+import networkx as nx
+import numpy as np
+import pytest
+
+from services.graph_kernels import CSRGraph, top_k_indices
+
+
+def random_network(seed: int = 0):
+    """Weighted payload with duplicate edges, a self-loop, dangling and isolated nodes"""
+    rng = np.random.default_rng(seed)
+    nodes = [{'id': f"n{i}"} for i in range(30)]
+    edges = [{'source': f"n{u}", 'target': f"n{v}", 'weight': float(w)}
+             for u, v, w in zip(rng.integers(0, 25, 80), rng.integers(0, 25, 80), rng.integers(1, 5, 80))]
+    edges.append({'source': 'n3', 'target': 'n3', 'weight': 2.0})
+    return {'nodes': nodes, 'edges': edges}
+
+
+def networkx_graph(network, directed: bool):
+    G = nx.DiGraph() if directed else nx.Graph()
+    G.add_nodes_from(node['id'] for node in network['nodes'])
+    for edge in network['edges']:
+        G.add_edge(edge['source'], edge['target'], weight=edge['weight'])
+    return G
+
+
+def as_array(csr: CSRGraph, values):
+    return np.array([values[node] for node in csr.node_ids])
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_degree_and_pagerank_match_networkx(directed):
+    network = random_network()
+    csr = CSRGraph.from_network_data(network, directed=directed)
+    G = networkx_graph(network, directed)
+    
+    assert csr.node_ids == list(G.nodes)
+    assert csr.num_edges == G.number_of_edges()
+    np.testing.assert_allclose(csr.degree_centrality(), as_array(csr, nx.degree_centrality(G)))
+    np.testing.assert_allclose(csr.pagerank(), as_array(csr, nx.pagerank(G)), atol=1e-6)
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_personalized_pagerank_matches_networkx(directed):
+    network = random_network(seed=1)
+    csr = CSRGraph.from_network_data(network, directed=directed)
+    G = networkx_graph(network, directed)
+    personalization = {'n1': 1.0, 'n2': 3.0, 'missing': 5.0}
+    
+    expected = nx.pagerank(G, personalization={node: personalization.get(node, 0) for node in G})
+    np.testing.assert_allclose(csr.pagerank(personalization=personalization), as_array(csr, expected), atol=1e-6)
+    with pytest.raises(ValueError):
+        csr.personalization_vector({'missing': 1.0})
+
+
+def test_top_k_indices_matches_a_stable_sort():
+    values = np.array([3.0, 1.0, 3.0, 2.0, 3.0, 0.0])
+    for k in range(len(values) + 2):
+        np.testing.assert_array_equal(top_k_indices(values, k), np.argsort(-values, kind='stable')[:k])
+
+
+def naive_backbone(csr: CSRGraph, method: str, alpha: float = 0.05, min_weight: float = 2, k: int = 5):
+    """Per-edge loop over the definitions in CSRGraph.backbone_mask"""
+    edges = list(zip(csr.sources.tolist(), csr.targets.tolist(), csr.weights.tolist()))
+    incident = {}
+    for i, (u, v, w) in enumerate(edges):
+        incident.setdefault(('out' if csr.directed else 'all', u), []).append((i, w))
+        incident.setdefault(('in' if csr.directed else 'all', v), []).append((i, w))
+        if csr.directed:
+            incident.setdefault(('all', u), []).append((i, w))
+            incident.setdefault(('all', v), []).append((i, w))
+    
+    def p_value(side, node, w):
+        weights = [weight for _, weight in incident[(side, node)]]
+        return (1 - w / sum(weights)) ** (len(weights) - 1)
+    
+    if method == 'threshold':
+        return [w >= min_weight for _, _, w in edges]
+    if method == 'disparity':
+        source_side, target_side = ('out', 'in') if csr.directed else ('all', 'all')
+        return [min(p_value(source_side, u, w), p_value(target_side, v, w)) < alpha for u, v, w in edges]
+    # top_k ranks all edges at a node, incoming and outgoing alike
+    kept = set()
+    for (side, _), node_edges in incident.items():
+        if side == 'all':
+            kept.update(i for i, _ in sorted(node_edges, key=lambda edge: (-edge[1], edge[0]))[:k])
+    return [i in kept for i in range(len(edges))]
+
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('method, options', [
+    ('disparity', {'alpha': 0.3}), ('threshold', {'min_weight': 3}), ('top_k', {'k': 2})
+])
+def test_backbone_mask_matches_per_edge_definitions(directed, method, options):
+    network = random_network(seed=2)
+    network['edges'] = [edge for edge in network['edges'] if edge['source'] != edge['target']]
+    csr = CSRGraph.from_network_data(network, directed=directed)
+    
+    mask = csr.backbone_mask(method, **options)
+    assert 0 < mask.sum() < csr.num_edges
+    assert mask.tolist() == naive_backbone(csr, method, **options)
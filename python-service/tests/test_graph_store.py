@@ -0,0 +1,66 @@
+"""
+Tests for GraphStore and graph_id lookups
+"""
+import time
+
+import pytest
+
+from services.graph_store import GraphNotFoundError, GraphStore
+from services.network_analysis_service import NetworkAnalysisService
+
+POSTS = [
+    {'author': 'ann', 'hashtags': ['ai', 'ml', 'data']},
+    {'author': 'bob', 'hashtags': ['ml', 'data'], 'mentions': ['ann']},
+    {'author': 'cat', 'content': 'Reading about #ai and #ethics with @bob'}
+]
+
+
+def network(edges):
+    return {'nodes': [], 'edges': [{'source': u, 'target': v} for u, v in edges]}
+
+
+def test_graph_id_depends_on_content_only():
+    first = {'graph_type': 'x', 'nodes': [{'id': 'a'}], 'edges': [], 'stats': {'density': 0}}
+    second = {'edges': [], 'nodes': [{'id': 'a'}], 'graph_type': 'x'}
+    assert GraphStore.compute_graph_id(first) == GraphStore.compute_graph_id(second)
+    assert GraphStore.compute_graph_id(first) != GraphStore.compute_graph_id({**second, 'graph_type': 'y'})
+
+
+def test_store_evicts_least_recently_used_and_expired_entries(monkeypatch):
+    store = GraphStore(max_entries=2, ttl_seconds=60)
+    a = store.put(network([('a', 'b')])).graph_id
+    b = store.put(network([('b', 'c')])).graph_id
+    store.get(a)
+    c = store.put(network([('c', 'd')])).graph_id
+    
+    assert store.get(a) and store.get(c)
+    with pytest.raises(GraphNotFoundError):
+        store.get(b)
+    
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    with pytest.raises(GraphNotFoundError):
+        store.get(a)
+    assert store.stats()['entries'] == 0
+
+
+def test_results_are_built_once_per_stored_graph():
+    entry = GraphStore().put(network([('a', 'b')]))
+    calls = []
+    for _ in range(3):
+        assert entry.get_or_build(entry.results, 'key', lambda: calls.append(1) or len(calls)) == 1
+    assert len(calls) == 1
+
+
+def test_analysis_by_graph_id_matches_inline_payload():
+    service = NetworkAnalysisService()
+    built = service.build_hashtag_network(POSTS)
+    payload = {key: value for key, value in built.items() if key != 'graph_id'}
+    
+    by_id = service.analyze_influence(graph_id=built['graph_id'])
+    inline = NetworkAnalysisService().analyze_influence(payload)
+    assert by_id['influence_scores'] == inline['influence_scores']
+    assert by_id['graph_id'] == inline['graph_id'] == built['graph_id']
+    
+    with pytest.raises(GraphNotFoundError):
+        service.analyze_influence(graph_id='unknown')
@@ -0,0 +1,97 @@
+"""
+Tests for IncrementalNetwork
+"""
+import networkx as nx
+import numpy as np
+import pytest
+
+from services.incremental_network import GRAPH_TYPES, IncrementalNetwork
+
+
+def random_posts(count: int, seed: int = 0):
+    """Posts with explicit hashtags/mentions or only content, from a small vocabulary"""
+    rng = np.random.default_rng(seed)
+    posts = []
+    for i in range(count):
+        hashtags = [f"tag{t}" for t in rng.choice(15, size=rng.integers(0, 5), replace=False)]
+        mentions = [f"user{u}" for u in rng.choice(10, size=rng.integers(0, 3), replace=False)]
+        author = f"user{rng.integers(0, 10)}"
+        if i % 3 == 0:
+            content = ' '.join([f"#{tag}" for tag in hashtags] + [f"@{mention}" for mention in mentions])
+            posts.append({'author': author, 'content': f"post {i} {content}"})
+        else:
+            posts.append({'author': author, 'hashtags': hashtags, 'mentions': mentions})
+    return posts
+
+
+def snapshot(network: IncrementalNetwork):
+    """Nodes with attributes, weighted edges and component count of a network"""
+    G = network.G
+    edges = {(tuple(sorted((u, v))) if not network.directed else (u, v)): w for u, v, w in G.edges(data='weight')}
+    components = nx.number_weakly_connected_components(G) if network.directed else nx.number_connected_components(G)
+    return dict(G.nodes(data=True)), edges, components
+
+
+@pytest.mark.parametrize('graph_type', GRAPH_TYPES)
+def test_expiring_batches_matches_a_full_rebuild(graph_type):
+    posts = random_posts(300)
+    batches = [posts[i:i + 50] for i in range(0, len(posts), 50)]
+    
+    network = IncrementalNetwork(graph_type)
+    for batch in batches:
+        network.add_posts(batch)
+        # Components are tracked incrementally while posts are only added
+        assert network.number_of_components() == snapshot(network)[2]
+    
+    # Slide the window: expire the two oldest batches, then add one more
+    network.remove_posts(batches[0])
+    network.remove_posts(batches[1])
+    extra = random_posts(50, seed=1)
+    network.add_posts(extra)
+    
+    rebuilt = IncrementalNetwork(graph_type)
+    rebuilt.add_posts([post for batch in batches[2:] for post in batch] + extra)
+    
+    assert snapshot(network) == snapshot(rebuilt)
+    assert network.num_edges == rebuilt.G.number_of_edges()
+    assert network.number_of_components() == snapshot(rebuilt)[2]
+    assert network.stats() == rebuilt.stats()
+
+
+@pytest.mark.parametrize('graph_type', GRAPH_TYPES)
+def test_expiring_every_post_empties_the_network(graph_type):
+    posts = random_posts(100, seed=2)
+    network = IncrementalNetwork(graph_type)
+    network.add_posts(posts)
+    network.remove_posts(posts)
+    
+    assert network.G.number_of_nodes() == 0
+    assert network.num_edges == 0
+    assert network.num_posts == 0
+    assert network.number_of_components() == 0
+
+
+def test_sampled_clustering_brackets_the_exact_value():
+    network = IncrementalNetwork('hashtag_cooccurrence')
+    network.add_posts(random_posts(400, seed=3))
+    exact = nx.average_clustering(network.G)
+    assert network.stats(['average_clustering']) == {'average_clustering': exact}
+    
+    # Force the sampled estimate on this (small) graph
+    network.EXACT_CLUSTERING_MAX_NODES = 10
+    stats = network.stats(['average_clustering'], sample_size=20000)
+    estimate = stats['average_clustering_estimate']
+    assert estimate['method'] == 'wedge_sampling'
+    assert estimate['ci_lower'] <= exact <= estimate['ci_upper']
+    assert abs(stats['average_clustering'] - exact) < 0.02
+    assert network.stats(['average_clustering'], sample_size=20000) == stats
+
+
+def test_stats_fields_select_what_is_computed():
+    network = IncrementalNetwork('mention_network')
+    network.add_posts(random_posts(50))
+    
+    assert network.stats([]) == {}
+    assert set(network.stats(['total_nodes', 'is_strongly_connected'])) == {'total_nodes', 'is_strongly_connected'}
+    with pytest.raises(ValueError):
+        network.stats(['average_clustering'])
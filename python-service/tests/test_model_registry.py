@@ -0,0 +1,88 @@
+"""
+Tests for ModelRegistry and StateStore persistence
+"""
+import os
+
+import pytest
+
+from services.model_registry import ModelRegistry
+from services.state_store import StateStore
+
+
+def test_store_creates_its_directory_on_first_write(tmp_path):
+    directory = tmp_path / 'models'
+    store = StateStore(str(directory))
+    assert not directory.exists()
+    
+    store.put('key', {'value': 1})
+    assert directory.exists()
+    assert StateStore(str(directory)).get('key') == {'value': 1}
+
+
+def test_registry_keeps_the_most_recent_versions_per_account(tmp_path):
+    store = StateStore(str(tmp_path), max_entries=2)
+    registry = ModelRegistry(store, max_versions=2)
+    for version in ('v1', 'v2', 'v3'):
+        registry.register('acct', version, {'name': version})
+    registry.register('other', 'v1', {'name': 'other'})
+    
+    assert registry.latest('acct')['fingerprint'] == 'v3'
+    assert store.get('model:acct:v1') is None
+    assert store.get('model:acct:v2')['model'] == {'name': 'v2'}
+    assert store.get('model:other:v1')['model'] == {'name': 'other'}
+    # acct: v2, v3, versions list, latest pointer; other: v1, versions list, latest pointer
+    assert len(os.listdir(tmp_path)) == 7
+
+
+def test_reusing_a_version_keeps_it_from_being_pruned(tmp_path):
+    registry = ModelRegistry(StateStore(str(tmp_path)), max_versions=2)
+    registry.get_or_train('acct', 'v1', lambda: 'model 1')
+    registry.get_or_train('acct', 'v2', lambda: 'model 2')
+    registry.get_or_train('acct', 'v1', lambda: 'retrained')
+    registry.get_or_train('acct', 'v3', lambda: 'model 3')
+    
+    assert registry.get_or_train('acct', 'v1', lambda: 'retrained')['model'] == 'model 1'
+    assert registry.store.get('model:acct:v2') is None
+
+
+def test_store_evicts_least_recently_used_files(tmp_path):
+    store = StateStore(str(tmp_path), max_entries=64, max_disk_entries=10)
+    for index in range(10):
+        store.put(f'key{index}', index)
+        os.utime(store._path(f'key{index}'), (1000 + index, 1000 + index))
+    assert store.get('key0') == 0
+    
+    store.put('key10', 10)
+    assert len(os.listdir(tmp_path)) == 9
+    assert store.get('key0') == 0
+    assert store.get('key1') is None
+    assert store.get('key2') is None
+    assert store.get('key3') == 3
+
+
+def test_statistics_state_defaults_outside_the_tree(monkeypatch, tmp_path):
+    monkeypatch.setenv('PYTHON_SERVICE_STATE_HOME', str(tmp_path))
+    from services.state_store import default_state_directory
+    
+    directory = default_state_directory('statistics')
+    assert directory == os.path.join(str(tmp_path), 'statistics')
+    assert not directory.startswith(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_failed_update_leaves_the_stored_model_unchanged(tmp_path):
+    registry = ModelRegistry(StateStore(str(tmp_path)))
+    registry.update('acct', 'online', lambda: {'steps': 0}, lambda model: model.update(steps=1))
+    served = registry.get('acct', 'online')
+    
+    def fail_halfway(model):
+        model['steps'] += 1
+        raise ValueError('bad batch')
+    
+    with pytest.raises(ValueError):
+        registry.update('acct', 'online', dict, fail_halfway)
+    assert registry.get('acct', 'online') == {'steps': 1}
+    
+    registry.update('acct', 'online', dict, lambda model: model.update(steps=2))
+    # A model handed out before the update is never modified in place
+    assert served == {'steps': 1}
+    assert registry.get('acct', 'online') == {'steps': 2}
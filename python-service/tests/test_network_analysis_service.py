@@ -0,0 +1,228 @@
+"""
+Tests for NetworkAnalysisService
+"""
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from services.incremental_network import (IncrementalNetwork, extract_hashtags, extract_mentions,
+                                          parse_post, post_author)
+from services import network_analysis_service
+from services.network_analysis_service import NetworkAnalysisService
+
+NETWORK = {
+    'nodes': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}],
+    'edges': [{'source': 'a', 'target': 'b', 'weight': 2}, {'source': 'b', 'target': 'c', 'weight': 1}]
+}
+
+
+def random_network(nodes: int = 40, edges: int = 120, seed: int = 0, graph_type: str = 'hashtag_network'):
+    """Weighted payload plus the equivalent networkx graph"""
+    rng = np.random.default_rng(seed)
+    network = {
+        'graph_type': graph_type,
+        'nodes': [{'id': f"n{i}"} for i in range(nodes)],
+        'edges': [{'source': f"n{u}", 'target': f"n{v}", 'weight': int(w)}
+                  for u, v, w in zip(rng.integers(0, nodes, edges), rng.integers(0, nodes, edges),
+                                     rng.integers(1, 4, edges)) if u != v]
+    }
+    G = nx.DiGraph() if graph_type == 'mention_network' else nx.Graph()
+    G.add_nodes_from(node['id'] for node in network['nodes'])
+    G.add_weighted_edges_from((edge['source'], edge['target'], edge['weight']) for edge in network['edges'])
+    return network, G
+
+
+def scores_by_node(result, metric):
+    return {score['node']: score[metric] for score in result['influence_scores']}
+
+
+def assert_matches(result, metric, expected, atol=1e-9):
+    actual = scores_by_node(result, metric)
+    np.testing.assert_allclose([actual[node] for node in expected], list(expected.values()), atol=atol)
+
+
+def test_unknown_seed_nodes_are_rejected_and_not_cached():
+    service = NetworkAnalysisService()
+    with pytest.raises(ValueError):
+        service.analyze_influence(NETWORK, seed_nodes=['zzz'])
+    
+    entry = service._resolve_graph(NETWORK, None)
+    assert not any(key[0] == 'influence' for key in entry.results)
+    
+    result = service.analyze_influence(NETWORK, seed_nodes=['a'])
+    assert 'method' not in result
+    assert 'personalized_pagerank' in result['influence_scores'][0]
+
+
+def test_fallback_influence_results_are_not_cached(monkeypatch):
+    service = NetworkAnalysisService()
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError('worker crashed')
+    
+    monkeypatch.setattr(service, '_compute_centralities', fail)
+    assert service.analyze_influence(NETWORK)['method'] == 'degree_centrality_fallback'
+    
+    monkeypatch.undo()
+    assert 'method' not in service.analyze_influence(NETWORK)
+
+
+def test_influence_pages_cover_the_full_ranking():
+    network, G = random_network()
+    service = NetworkAnalysisService()
+    full = service.analyze_influence(network)
+    expected = sorted((score['influence_score'] for score in full['influence_scores']), reverse=True)
+    
+    pages, cursor = [], 0
+    while cursor is not None:
+        page = service.analyze_influence(network, cursor=cursor, page_size='7', top_k='3')
+        assert len(page['influence_scores']) <= 7 and page['total_nodes'] == G.number_of_nodes()
+        pages.extend(page['influence_scores'])
+        cursor = page['next_cursor']
+    
+    assert [score['influence_score'] for score in pages] == expected
+    assert {score['node'] for score in pages} == set(G.nodes)
+    assert [score['influence_score'] for score in page['top_influencers']] == expected[:3]
+
+
+@pytest.mark.parametrize('params', [{'page_size': 'five'}, {'page_size': 0}, {'top_k': -1},
+                                    {'cursor': None}, {'top_k': 2.5}, {'page_size': [5]}])
+def test_invalid_influence_paging_is_rejected(params):
+    with pytest.raises(ValueError):
+        NetworkAnalysisService().analyze_influence(NETWORK, **params)
+
+
+@pytest.mark.parametrize('graph_type', ['hashtag_network', 'mention_network'])
+def test_exact_centralities_match_networkx(graph_type):
+    network, G = random_network(graph_type=graph_type)
+    result = NetworkAnalysisService().analyze_influence(network, mode='exact')
+    
+    assert result['centrality_mode'] == 'exact'
+    assert_matches(result, 'betweenness_centrality', nx.betweenness_centrality(G, weight='weight'))
+    assert_matches(result, 'closeness_centrality', nx.closeness_centrality(G, distance='weight'))
+
+
+@pytest.mark.parametrize('graph_type,mode', [('hashtag_network', 'exact'), ('mention_network', 'approximate')])
+def test_pooled_centralities_match_in_process(graph_type, mode, monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)  # Worker counts are capped at the core count
+    network, G = random_network(graph_type=graph_type)
+    options = {'mode': mode, 'k': 10, 'seed_nodes': ['n0', 'n1'], 'include_strength': True}
+    in_process = NetworkAnalysisService().analyze_influence(network, max_workers=1, **options)
+    pooled = NetworkAnalysisService().analyze_influence(network, max_workers=2, **options)
+    
+    assert 'method' not in pooled
+    expected = {score['node']: score for score in in_process['influence_scores']}
+    for score in pooled['influence_scores']:
+        assert score == pytest.approx(expected[score['node']])
+
+
+def test_centrality_pool_is_reused_and_replaced_when_broken(monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    network, _ = random_network()
+    NetworkAnalysisService().analyze_influence(network, max_workers=2)
+    pool = network_analysis_service._centrality_pool()
+    NetworkAnalysisService().analyze_influence(network, mode='approximate', max_workers=2)
+    assert network_analysis_service._centrality_pool() is pool
+    
+    for process in list(pool._processes.values()):
+        process.kill()
+        process.join()
+    # The request with the broken pool falls back; the next one gets a new pool
+    assert NetworkAnalysisService().analyze_influence(network, max_workers=2)['method'] == 'degree_centrality_fallback'
+    assert 'method' not in NetworkAnalysisService().analyze_influence(network, max_workers=2)
+    assert network_analysis_service._centrality_pool() is not pool
+
+
+def test_approximate_centralities_with_every_pivot_are_exact():
+    network, G = random_network()
+    n = G.number_of_nodes()
+    result = NetworkAnalysisService().analyze_influence(network, mode='approximate', k=n)
+    
+    assert result['centrality_mode'] == 'approximate'
+    assert result['estimates']['betweenness_centrality']['error_bound'] == 0.0
+    assert_matches(result, 'betweenness_centrality', nx.betweenness_centrality(G, weight='weight'))
+    harmonic = nx.harmonic_centrality(G, distance='weight')
+    assert_matches(result, 'closeness_centrality', {node: value / (n - 1) for node, value in harmonic.items()})
+
+
+def test_sampled_betweenness_stays_within_its_error_bound():
+    network, G = random_network(nodes=200, edges=600)
+    result = NetworkAnalysisService().analyze_influence(network, mode='approximate', k=50, seed=3)
+    # A fresh service (no cached result) samples the same pivots for the same seed
+    again = NetworkAnalysisService().analyze_influence(network, mode='approximate', k=50, seed=3)
+    
+    bound = result['estimates']['betweenness_centrality']['error_bound']
+    assert 0 < bound < 1
+    assert_matches(result, 'betweenness_centrality', nx.betweenness_centrality(G, weight='weight'), atol=bound)
+    assert scores_by_node(result, 'betweenness_centrality') == scores_by_node(again, 'betweenness_centrality')
+
+
+def test_backbone_filters_before_analysis():
+    network, G = random_network(edges=200)
+    result = NetworkAnalysisService().analyze_influence(network, backbone={'method': 'threshold', 'min_weight': 3})
+    
+    report = result['backbone']
+    kept = [(u, v) for u, v, w in G.edges(data='weight') if w >= 3]
+    assert report['edges_total'] == G.number_of_edges()
+    assert report['edges_kept'] == len(kept)
+    nodes = {node for edge in kept for node in edge}
+    assert report['nodes_kept'] == len(nodes) == len(result['influence_scores'])
+    assert {score['node'] for score in result['influence_scores']} == nodes
+
+
+def test_temporal_windows_match_a_rebuild_per_window():
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2024-01-01T00:00:00')
+    posts = [{'timestamp': str(start + np.timedelta64(int(rng.integers(0, 10 * 86400)), 's')),
+              'hashtags': [f"tag{t}" for t in rng.choice(12, size=rng.integers(1, 4), replace=False)]}
+             for _ in range(200)]
+    posts.append({'timestamp': 'not a date', 'hashtags': ['tag0']})
+    records = list(NetworkAnalysisService().temporal_network_windows(
+        posts, window='3D', step='1D', top_k='5', include_communities=False
+    ))
+    
+    meta, windows, summary = records[0], records[1:-1], records[-1]
+    assert meta['skipped_posts'] == 1 and meta['windows'] == len(windows) == summary['windows']
+    times = np.array([np.datetime64(post['timestamp']) for post in posts[:-1]])
+    for window in windows:
+        begin = np.datetime64(window['start'][:19])
+        inside = [post for post, t in zip(posts, times) if begin <= t < begin + np.timedelta64(3, 'D')]
+        rebuilt = IncrementalNetwork('hashtag_cooccurrence')
+        rebuilt.add_posts(inside)
+        strengths = sorted((strength for _, strength in rebuilt.G.degree(weight='weight')), reverse=True)
+        
+        assert window['posts'] == len(inside)
+        assert window['stats'] == pytest.approx(rebuilt.stats())
+        assert [node['strength'] for node in window['top_nodes']] == strengths[:5]
+
+
+@pytest.mark.parametrize('params', [{'top_k': 'ten'}, {'top_k': -1}, {'seed': 1.5}, {'window': '0D'}])
+def test_invalid_temporal_parameters_are_rejected_before_streaming(params):
+    posts = [{'timestamp': '2024-01-01T00:00:00Z', 'hashtags': ['a', 'b']}]
+    with pytest.raises(ValueError):
+        NetworkAnalysisService().temporal_network_windows(posts, **params)
+
+
+def test_combined_build_matches_the_separate_builders():
+    posts = [
+        {'author': 'ann', 'hashtags': ['AI', 'ml'], 'content': 'ignored #x @y'},
+        {'author': 'bob', 'content': 'Talking #ML and #data with @ann and @cat'},
+        {'author': 'cat', 'mentions': ['bob'], 'content': 'More #ai #data'},
+        {'author': 'ann', 'hashtags': ['data', 'ai'], 'mentions': ['@Bob']}
+    ]
+    service = NetworkAnalysisService()
+    combined = service.build_networks(posts, include_author_hashtag=True)
+    
+    for name, builder in (('hashtag_network', service.build_hashtag_network),
+                          ('mention_network', service.build_mention_network)):
+        assert combined[name] == builder(posts)
+    
+    author_hashtag = IncrementalNetwork('author_hashtag')
+    author_hashtag.add_posts(posts)
+    assert {key: value for key, value in combined['author_hashtag_network'].items() if key != 'graph_id'} == \
+        author_hashtag.to_json()
+    assert [parse_post(post) for post in posts] == [
+        (post_author(post), extract_hashtags(post), extract_mentions(post)) for post in posts
+    ]
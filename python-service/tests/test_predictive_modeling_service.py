@@ -0,0 +1,121 @@
+"""
+Tests for PredictiveModelingService
+"""
+import time
+
+import numpy as np
+import pytest
+
+from services.predictive_modeling_service import PredictiveModelingService
+
+
+def engagement_history(key: str, posts: int = 200, seed: int = 0):
+    """Posting history whose engagement averages about 160"""
+    rng = np.random.default_rng(seed)
+    return [{
+        'hour': int(hour),
+        'day_of_week': int(day),
+        key: float(160 + 40 * np.sin(hour / 24 * 2 * np.pi) + rng.normal(0, 10))
+    } for hour, day in zip(rng.integers(0, 24, posts), rng.integers(0, 7, posts))]
+
+
+def test_posting_slots_train_on_engagement_key():
+    service = PredictiveModelingService()
+    result = service.optimize_posting_slots({'has_media': True}, account_id='acct',
+                                            historical_data=engagement_history('engagement'))
+    
+    predicted = [slot['predicted_engagement'] for slot in result['slots']]
+    assert result['model']['kind'] == 'random_forest'
+    assert min(predicted) > 100
+    
+    # The registered model keeps predicting real engagement afterwards
+    prediction = service.predict_engagement({'hour': 10, 'day_of_week': 2}, account_id='acct')
+    assert prediction['predicted_engagement'] > 100
+
+
+def test_engagement_and_actual_engagement_train_the_same_model():
+    service = PredictiveModelingService()
+    first = service.optimize_posting_slots({}, account_id='acct', historical_data=engagement_history('engagement'))
+    second = service.optimize_posting_slots({}, account_id='acct',
+                                            historical_data=engagement_history('actual_engagement'))
+    assert first['model']['fingerprint'] == second['model']['fingerprint']
+    assert second['model']['cached']
+
+
+def test_history_without_engagement_does_not_register_a_model():
+    service = PredictiveModelingService()
+    history = [{'hour': hour % 24, 'day_of_week': hour % 7} for hour in range(50)]
+    result = service.optimize_posting_slots({}, account_id='acct', historical_data=history)
+    
+    assert 'model' not in result
+    assert service.model_registry.latest('acct') is None
+    assert service.predict_engagement({'hour': 10}, account_id='acct')['predicted_engagement'] > 0
+
+
+def test_failed_posting_time_merge_leaves_the_aggregate_unchanged():
+    service = PredictiveModelingService()
+    posts = engagement_history('engagement', posts=50)
+    service.ingest_posting_times(posts, account_id='target')
+    service.ingest_posting_times(posts, account_id='same', half_life_days=28)
+    service.ingest_posting_times(posts, account_id='faster', half_life_days=7)
+    
+    with pytest.raises(ValueError):
+        service.merge_posting_times('target', source_account_ids=['same', 'faster'])
+    
+    def merge_then_fail(aggregate):
+        aggregate.merge(service.state_store.get(service._posting_time_key('same')))
+        aggregate.merge(service.state_store.get(service._posting_time_key('faster')))
+    
+    with pytest.raises(ValueError):
+        service._update_posting_time_aggregate('target', None, merge_then_fail)
+    assert service.merge_posting_times('target', source_account_ids=['same'])['aggregate']['posts'] == 100
+
+
+@pytest.mark.parametrize('blackouts', [
+    {'blackout_slots': [{'day_of_week': 9, 'hour': 30}]},
+    {'blackout_slots': [{'day_of_week': 0, 'hour': 30}]},
+    {'blackout_slots': [{'hour': 3}]},
+    {'blackout_hours': [24]},
+    {'blackout_hours': [-1]},
+    {'blackout_days': [7]},
+])
+def test_out_of_range_blackouts_are_rejected(blackouts):
+    service = PredictiveModelingService()
+    with pytest.raises(ValueError):
+        service.optimize_posting_slots({}, account_id='acct', **blackouts)
+
+
+def test_blackouts_remove_their_slots():
+    service = PredictiveModelingService()
+    result = service.optimize_posting_slots({}, account_id='acct', num_slots=168,
+                                            historical_data=engagement_history('engagement'),
+                                            blackout_hours=[0, 23], blackout_days=[6],
+                                            blackout_slots=[{'day_of_week': 1, 'hour': 6}])
+    
+    slots = {(slot['day_of_week'], slot['hour']) for slot in result['slots']}
+    assert len(slots) == 6 * 22 - 1
+    assert (1, 6) not in slots
+    assert not any(day == 6 or hour in (0, 23) for day, hour in slots)
+
+
+def test_tuning_stops_searching_at_the_time_budget():
+    service = PredictiveModelingService()
+    history = engagement_history('engagement', posts=3000)
+    
+    started = time.perf_counter()
+    result = service.tune_engagement_model(history, account_id='acct', families=['random_forest', 'ridge'],
+                                           time_budget_seconds=1, n_candidates=64, n_jobs=1)
+    elapsed = time.perf_counter() - started
+    
+    # Ridge is searched first; the forest search never starts or is cut short
+    assert result['families'][0]['family'] == 'ridge'
+    forest = [family for family in result['families'] if family['family'] == 'random_forest']
+    assert 'random_forest' in result['skipped_families'] or forest[0]['interrupted']
+    assert elapsed < 15
+    assert service.model_registry.latest('acct')['fingerprint'] == result['model']['fingerprint']
+
+
+def test_tuning_without_budget_left_raises():
+    service = PredictiveModelingService()
+    with pytest.raises(ValueError):
+        service.tune_engagement_model(engagement_history('engagement'), time_budget_seconds=0)
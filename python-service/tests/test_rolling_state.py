@@ -0,0 +1,61 @@
+"""
+Tests for RollingSeriesState
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.rolling_state import RollingSeriesState
+
+
+def assert_same_snapshot(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-9)
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-9), key
+
+
+@pytest.mark.parametrize('chunks', [[200], [1, 5, 194], [3, 3, 3, 191], [50, 1, 149]])
+def test_extend_matches_repeated_update(chunks):
+    values = 1000 + np.random.default_rng(6).normal(0, 20, sum(chunks)).cumsum()
+    stepped = RollingSeriesState(window=5, ewma_spans=[3, 10], season_lag=7)
+    batched = RollingSeriesState(window=5, ewma_spans=[3, 10], season_lag=7)
+    
+    snapshots = []
+    for value in values:
+        stepped.update(float(value))
+        snapshots.append(stepped.snapshot())
+    
+    start = 0
+    for size in chunks:
+        features = batched.extend(values[start:start + size])
+        for i in range(size):
+            snapshot = snapshots[start + i]
+            assert features['rolling_mean'][i] == pytest.approx(snapshot['rolling_mean'], rel=1e-9)
+            assert features['rolling_std'][i] == pytest.approx(snapshot['rolling_std'], rel=1e-6, abs=1e-9)
+            for span in ('3', '10'):
+                assert features[f"ewma_{span}"][i] == pytest.approx(snapshot['ewma'][span], rel=1e-9)
+                assert features[f"ewm_std_{span}"][i] == pytest.approx(snapshot['ewm_std'][span], rel=1e-9)
+            delta = features['seasonal_delta'][i]
+            assert (np.isnan(delta) and snapshot['seasonal_delta'] is None) or \
+                delta == pytest.approx(snapshot['seasonal_delta'], rel=1e-9)
+        start += size
+        assert_same_snapshot(batched.snapshot(), snapshots[start - 1])
+    
+    # Both states keep updating identically afterwards
+    for state in (stepped, batched):
+        state.update(990.0)
+    assert_same_snapshot(batched.snapshot(), stepped.snapshot())
+
+
+def test_features_match_pandas():
+    values = np.random.default_rng(7).normal(50, 10, 100)
+    features = RollingSeriesState(window=7, ewma_spans=[7]).extend(values)
+    series = pd.Series(values)
+    
+    np.testing.assert_allclose(features['rolling_mean'], series.rolling(7, min_periods=1).mean())
+    np.testing.assert_allclose(features['rolling_std'], series.rolling(7, min_periods=1).std(ddof=0), atol=1e-9)
+    np.testing.assert_allclose(features['ewma_7'], series.ewm(span=7, adjust=False).mean())
+    np.testing.assert_allclose(features['seasonal_delta'], series.diff(7))
@@ -0,0 +1,103 @@
+"""
+Tests for StatisticsService
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from services.statistics_service import StatisticsService
+
+
+def variables_with_gaps(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.normal(size=(60, 4)), columns=['a', 'b', 'c', 'd'])
+    frame['b'] += frame['a']
+    frame['c'] = np.exp(frame['c'] - frame['a'])
+    # Different missing rows per column, and 'd' shares the gaps of 'a'
+    frame.loc[rng.choice(60, 8, replace=False), 'a'] = np.nan
+    frame.loc[rng.choice(60, 5, replace=False), 'b'] = np.nan
+    frame.loc[rng.choice(60, 12, replace=False), 'c'] = np.nan
+    frame.loc[frame['a'].isna(), 'd'] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_with_missing_values_matches_pandas(method):
+    frame = variables_with_gaps()
+    variables = {name: [None if np.isnan(value) else value for value in frame[name]] for name in frame}
+    result = StatisticsService().calculate_correlation(variables, method=method)
+    
+    expected = frame.corr(method=method)
+    matrix = pd.DataFrame(result['correlation_matrix']).loc[expected.index, expected.columns]
+    np.testing.assert_allclose(matrix.to_numpy(), expected.to_numpy(), atol=1e-12)
+    
+    for pair in result['correlations']:
+        both = frame[[pair['variable1'], pair['variable2']]].dropna()
+        test = stats.spearmanr if method == 'spearman' else stats.pearsonr
+        r, p_value = test(both.iloc[:, 0], both.iloc[:, 1])
+        assert pair['n'] == len(both)
+        assert pair['correlation'] == pytest.approx(r, abs=1e-12)
+        assert pair['p_value'] == pytest.approx(p_value, rel=1e-6)
+
+
+def assert_same_stats(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_same_stats(actual[key], value)
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-9, nan_ok=True), key
+
+
+def test_batch_descriptive_stats_match_the_single_series_version():
+    rng = np.random.default_rng(4)
+    series = {
+        'counts': rng.integers(0, 6, 50).tolist(),
+        'skewed': rng.lognormal(0, 1, 200).tolist(),
+        'single': [3.5],
+        'constant': [2.0] * 10,
+        'tied_modes': [3, 1, 3, 1, 2],
+        'empty': []
+    }
+    service = StatisticsService()
+    results = service.calculate_descriptive_stats_batch(series)['results']
+    
+    for name, values in series.items():
+        assert_same_stats(results[name], service.calculate_descriptive_stats(values))
+    
+    # Missing entries are ignored, in ragged lists and in the columnar form
+    gappy = [1.0, None, 4.0, 'n/a', 4.0, 9.0]
+    matrix = [[value, float(i)] for i, value in enumerate(gappy)]
+    expected = service.calculate_descriptive_stats([1.0, 4.0, 4.0, 9.0])
+    assert_same_stats(service.calculate_descriptive_stats_batch([gappy])['results']['0'], expected)
+    batch = service.calculate_descriptive_stats_batch(matrix=matrix, columns=['gappy', 'index'])['results']
+    assert_same_stats(batch['gappy'], expected)
+    assert_same_stats(batch['index'], service.calculate_descriptive_stats([float(i) for i in range(6)]))
+
+
+def test_batch_time_series_analysis_matches_the_single_series_version():
+    rng = np.random.default_rng(5)
+    series = []
+    for i, length in enumerate([3, 5, 8, 21, 60]):
+        dates = pd.date_range(f"2024-0{i + 1}-03", periods=length, freq='D').strftime('%Y-%m-%d')
+        weekly = 20 * (pd.DatetimeIndex(dates).dayofweek >= 5)
+        values = 100 + i * np.arange(length) + weekly + rng.normal(0, 5, length)
+        points = [{'date': date, 'value': float(value)} for date, value in zip(dates, values)]
+        rng.shuffle(points)
+        series.append({'id': f"s{i}", 'time_series': points})
+    series.append({'id': 'short', 'time_series': series[0]['time_series'][:2]})
+    
+    service = StatisticsService()
+    results = service.analyze_time_series_batch(series, lags=[1, 7])['series']
+    
+    for entry, result in zip(series, results):
+        single = service.analyze_time_series(entry['time_series'])
+        assert result.pop('id') == entry['id']
+        autocorrelations = result.pop('autocorrelations', None)
+        assert_same_stats(result, single)
+        if autocorrelations is not None:
+            ordered = pd.DataFrame(entry['time_series']).sort_values('date')['value'].to_numpy()
+            expected = np.corrcoef(ordered[:-7], ordered[7:])[0, 1] if len(ordered) > 8 else np.nan
+            assert autocorrelations['7'] == pytest.approx(expected, nan_ok=True)
+            assert autocorrelations['1'] == pytest.approx(single['autocorrelation'])